@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from collections import defaultdict
 from datetime import date, datetime
-from typing import Dict, Optional, List, Set
+from typing import Dict, Optional
 
 from fastapi import APIRouter, Query, HTTPException
 
@@ -12,13 +12,21 @@ from app.schemas.dashboard import (
     DashboardKpis,
     DashboardTimeSeriesPoint,
 )
+from app.core.aggregation import DistinctCounter, top_k, top_k_indices
+from app.core.settings import settings
 from app.services.database_service import get_status
-from app.storage.dataset import Filters, query_dataset
+from app.storage.dataset import (
+    Filters,
+    MONEY_COLUMNS,
+    dataset_exists,
+    iter_dataset_batches,
+    query_cube,
+    suggest_terms,
+)
+from app.storage.term_index import TERM_RANKS
 from app.services.tax_params_service import get_rate
-from app.core.number import parse_money  # <-- USE UM ÚNICO PARSER
-import csv
 
-from app.core.dataset import DATASET_PATH, ensure_data_dir
+from app.core.dataset import ensure_data_dir
 
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
@@ -32,56 +40,116 @@ def _default_period():
     return date(2000, 1, 1), date(2100, 12, 31)
 
 
-def _parse_row_date(raw: str) -> Optional[date]:
-    if not raw:
-        return None
-    s = str(raw).strip()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y%m%d"):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except Exception:
-            continue
-    return None
-
-
-def _num(v: Optional[str]) -> float:
-    try:
-        return float(parse_money(v))
-    except Exception:
-        return 0.0
-
-
-def _build_timeseries_by_month(rows: list[dict]) -> list[DashboardTimeSeriesPoint]:
-    acc: Dict[str, Dict[str, float]] = defaultdict(
-        lambda: {"receita": 0.0, "icms": 0.0, "pis": 0.0, "cofins": 0.0}
-    )
-
-    for row in rows:
-        dt = _parse_row_date(row.get("dhemi", ""))
-        if not dt:
-            continue
-
-        key = f"{dt.year:04d}-{dt.month:02d}"
+def _monthly_money(frame: "pd.DataFrame") -> "pd.DataFrame":
+    """Soma das colunas monetárias por mês (__month), em ordem cronológica."""
+    cols = [c for c in MONEY_COLUMNS if c in frame.columns]
+    if frame.empty:
+        return frame[cols].iloc[0:0]
+    return frame.groupby("__month", observed=True, sort=True)[cols].sum()
 
-        acc[key]["receita"] += _num(row.get("vprod"))
-        acc[key]["icms"] += _num(row.get("vicms_icms"))
-        acc[key]["pis"] += _num(row.get("vpis"))
-        acc[key]["cofins"] += _num(row.get("vcofins"))
 
+def _build_timeseries_by_month(monthly: "pd.DataFrame") -> list[DashboardTimeSeriesPoint]:
     points: list[DashboardTimeSeriesPoint] = []
-    for k in sorted(acc.keys()):
+    for k, m in monthly.iterrows():
         points.append(
             DashboardTimeSeriesPoint(
-                period=k,
-                receita=float(acc[k]["receita"]),
-                icms=float(acc[k]["icms"]),
-                pis=float(acc[k]["pis"]),
-                cofins=float(acc[k]["cofins"]),
+                period=str(k),
+                receita=float(m.get("vprod", 0.0)),
+                icms=float(m.get("vicms_icms", 0.0)),
+                pis=float(m.get("vpis", 0.0)),
+                cofins=float(m.get("vcofins", 0.0)),
             )
         )
     return points
 
 
+def _money_total(frame: "pd.DataFrame", col: str) -> float:
+    return float(frame[col].sum()) if col in frame.columns else 0.0
+
+
+def _distinct_upper(frame: "pd.DataFrame", col: str) -> list[str]:
+    if col not in frame.columns:
+        return []
+    vals = frame[col].dropna().astype(str).str.strip().str.upper().unique()
+    return sorted(v for v in vals if v)
+
+
+class _BatchTotals:
+    """Agregação incremental dos lotes de iter_dataset_batches (memória limitada ao lote).
+
+    Também soma células do cubo mensal (add_cells): mesmas medidas, já agregadas.
+    """
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.money: Dict[str, float] = {c: 0.0 for c in MONEY_COLUMNS}
+        self.min_dt = None
+        self.max_dt = None
+        self.ufs_origem: set[str] = set()
+        self.ufs_destino: set[str] = set()
+        self._monthly: list = []
+
+    def add(self, frame: "pd.DataFrame") -> None:
+        self.rows += int(len(frame))
+        for c in MONEY_COLUMNS:
+            self.money[c] += _money_total(frame, c)
+
+        self._monthly.append(_monthly_money(frame))
+
+        if "__dt" in frame.columns:
+            lo, hi = frame["__dt"].min(), frame["__dt"].max()
+            self.min_dt = lo if self.min_dt is None else min(self.min_dt, lo)
+            self.max_dt = hi if self.max_dt is None else max(self.max_dt, hi)
+
+        self.ufs_origem.update(_distinct_upper(frame, "uf"))
+        self.ufs_destino.update(_distinct_upper(frame, "uf_dest"))
+
+    def add_cells(self, cells: "pd.DataFrame") -> None:
+        """Soma células de query_cube (rows, somas, dt_min/dt_max por célula)."""
+        if cells.empty:
+            return
+
+        self.rows += int(cells["rows"].sum())
+        for c in MONEY_COLUMNS:
+            self.money[c] += _money_total(cells, c)
+
+        self._monthly.append(_monthly_money(cells))
+
+        lo, hi = cells["dt_min"].min(), cells["dt_max"].max()
+        self.min_dt = lo if self.min_dt is None else min(self.min_dt, lo)
+        self.max_dt = hi if self.max_dt is None else max(self.max_dt, hi)
+
+        self.ufs_origem.update(_distinct_upper(cells, "uf"))
+        self.ufs_destino.update(_distinct_upper(cells, "uf_dest"))
+
+    def monthly(self) -> "pd.DataFrame":
+        """Somas monetárias por mês, reunindo os parciais dos lotes."""
+        import pandas as pd
+
+        if not self._monthly:
+            return pd.DataFrame(columns=list(MONEY_COLUMNS), dtype="float64")
+        if len(self._monthly) == 1:
+            return self._monthly[0]
+        return pd.concat(self._monthly).groupby(level=0, sort=True).sum()
+
+
+def _scan(filters: Filters, columns: Optional[tuple] = None) -> _BatchTotals:
+    """Totais do recorte: cubo mensal quando possível; linhas nas bordas do período e no filtro produto."""
+    totals = _BatchTotals()
+
+    plan = query_cube(filters)
+    if plan is None:
+        ranges = [filters]
+    else:
+        cells, ranges = plan
+        totals.add_cells(cells)
+
+    for f in ranges:
+        for batch in iter_dataset_batches(f, columns):
+            totals.add(batch)
+    return totals
+
+
 # =========================
 # NEW: SUGGEST (autocomplete)
 # =========================
@@ -90,6 +158,7 @@ def suggest(
     field: str = Query(..., description="produto|ncm|cfop"),
     q: str = Query("", description="texto digitado"),
     limit: int = Query(10, ge=1, le=50),
+    rank: str = Query("receita", description="receita|ocorrencias"),
 
     # opcionais para sugerir dentro do recorte atual
     periodo_inicio: Optional[str] = Query(default=None),
@@ -102,11 +171,14 @@ def suggest(
         return {"items": []}
 
     field = (field or "").strip().lower()
-    q_norm = (q or "").strip().lower()
 
     if field not in {"produto", "ncm", "cfop"}:
         raise HTTPException(status_code=400, detail="field inválido. Use: produto|ncm|cfop")
 
+    rank = (rank or "").strip().lower()
+    if rank not in TERM_RANKS:
+        raise HTTPException(status_code=400, detail="rank inválido. Use: receita|ocorrencias")
+
     # Recorte de período (default amplo)
     d0, d1 = _default_period()
     if periodo_inicio:
@@ -118,52 +190,17 @@ def suggest(
     ufd = (uf_destino or "").strip().upper()
 
     ensure_data_dir()
-    if not DATASET_PATH.exists():
+    if not dataset_exists():
         return {"items": []}
 
-    def pick_value(row: dict) -> str:
-        if field == "produto":
-            return (row.get("produto") or "").strip()
-        if field == "ncm":
-            return (row.get("ncm") or "").strip()
-        return (row.get("cfop") or "").strip()
-
-    seen = set()
-    items: List[str] = []
-
-    # STREAMING: lê e para ao atingir o limit
-    with open(DATASET_PATH, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f, delimiter=";")
-        for row in reader:
-            # período
-            dt = _parse_row_date(row.get("dhemi", ""))
-            if not dt:
-                continue
-            if dt < d0 or dt > d1:
-                continue
-
-            # UF origem/destino (match exato como seu dataset.py)
-            if ufo and (row.get("uf", "") or "").strip().upper() != ufo:
-                continue
-            if ufd and (row.get("uf_dest", "") or "").strip().upper() != ufd:
-                continue
-
-            v = pick_value(row)
-            if not v:
-                continue
-
-            vn = v.lower()
-            if q_norm and q_norm not in vn:
-                continue
-
-            if vn in seen:
-                continue
-
-            seen.add(vn)
-            items.append(v)
-
-            if len(items) >= limit:
-                break
+    # índice de termos: prefixo antes de "contém", ranking por receita/ocorrências no recorte
+    items = suggest_terms(
+        field,
+        q,
+        Filters(periodo_inicio=d0, periodo_fim=d1, uf_origem=ufo, uf_destino=ufd),
+        limit=limit,
+        rank=rank,
+    )
 
     return {"items": items}
 
@@ -179,11 +216,6 @@ def _norm(s: Optional[str]) -> str:
 def _upper(s: Optional[str]) -> str:
     return _norm(s).upper()
 
-def _contains(hay: str, needle: str) -> bool:
-    if not needle:
-        return True
-    return needle.upper() in (hay or "").strip().upper()
-
 def _match_exact(value: str, expected: str) -> bool:
     if not expected:
         return True
@@ -203,8 +235,168 @@ def _parse_movimento(v: str) -> str:
     return x or "N/I"
 
 def _topn_from_dict(d: Dict[str, float], n: int = 10) -> list[dict]:
-    items = sorted(d.items(), key=lambda kv: kv[1], reverse=True)[:n]
-    return [{"key": k, "value": float(v)} for k, v in items]
+    return [{"key": k, "value": float(v)} for k, v in top_k(d.items(), n)]
+
+
+# Dimensões do group-by único de /breakdowns (cada ranking é um recorte dele)
+_BREAKDOWN_KEYS = ("produto", "ncm", "cfop", "uf", "uf_dest", "movimento")
+
+
+# Lotes cujos group-bys parciais são reagrupados de uma vez com o acumulado
+_GROUP_FOLD_BATCHES = 8
+
+
+class _RunningGroups:
+    """Receita por combinação de `keys`, reagrupada ao longo dos lotes de iter_dataset_batches.
+
+    A cada _GROUP_FOLD_BATCHES lotes os parciais (_group_batch) entram no
+    acumulado: a memória fica em ~um group-by consolidado mais os parciais
+    pendentes, não em um parcial por lote até o fim da leitura.
+    """
+
+    def __init__(self, keys: Tuple[str, ...] = _BREAKDOWN_KEYS) -> None:
+        self.keys = tuple(keys)
+        self._groups: Optional["pd.DataFrame"] = None
+        self._parts: list = []
+
+    def add(self, batch: "pd.DataFrame") -> None:
+        self._parts.append(_group_batch(batch, self.keys))
+        if len(self._parts) >= _GROUP_FOLD_BATCHES:
+            self._fold()
+
+    def _fold(self) -> None:
+        parts = self._parts if self._groups is None else [self._groups, *self._parts]
+        self._groups = _merge_groups(parts, self.keys)
+        self._parts = []
+
+    def result(self) -> "pd.DataFrame":
+        if self._parts or self._groups is None:
+            self._fold()
+        return self._groups
+
+
+# Cards de distintos de /breakdowns: nome -> (coluna, compara em maiúsculas)
+_DISTINCT_FIELDS = {"produtos": ("produto", True), "ncm": ("ncm", False), "cfop": ("cfop", False)}
+
+
+class _BreakdownScan:
+    """Group-by e contagens de distintos de /breakdowns, alimentados lote a lote.
+
+    Cada card de distintos tem o seu DistinctCounter, somado a cada lote. Com
+    settings.dashboard_distinct_approx (HyperLogLog, memória fixa), produto sai da
+    chave do group-by combinado e ganha um group-by só seu para o ranking: os
+    grupos deixam de multiplicar produtos pelas demais dimensões.
+    """
+
+    def __init__(self) -> None:
+        approx = bool(settings.dashboard_distinct_approx)
+        self.groups = _RunningGroups(tuple(c for c in _BREAKDOWN_KEYS if not (approx and c == "produto")))
+        self.produtos = _RunningGroups(("produto",)) if approx else None
+        self.distinct = {name: DistinctCounter(approx=approx) for name in _DISTINCT_FIELDS}
+
+    def add(self, batch: "pd.DataFrame") -> None:
+        self.groups.add(batch)
+        if self.produtos is not None:
+            self.produtos.add(batch)
+        for name, (col, upper) in _DISTINCT_FIELDS.items():
+            self.distinct[name].add(_batch_distinct(batch, col, upper))
+
+
+def _batch_distinct(batch: "pd.DataFrame", col: str, upper: bool = False) -> "pd.Series":
+    """Valores distintos não vazios de `col` no lote (mesma normalização do group-by)."""
+    import pandas as pd
+
+    if col not in batch.columns:
+        return pd.Series([], dtype=object)
+    values = pd.Series(batch[col].dropna().unique(), dtype=object).astype(str).str.strip()
+    if upper:
+        values = values.str.upper()
+    return values[values != ""]
+
+
+def _breakdown_scan(filters: Filters) -> _BreakdownScan:
+    """Group-by de receita por _BREAKDOWN_KEYS e distintos do recorte.
+
+    Group-by vetorizado sobre os códigos das categories, um por lote de
+    iter_dataset_batches, reagrupado aos poucos (_RunningGroups). Os grupos saem
+    na ordem da 1ª ocorrência (ordem canônica), então empates nos rankings mantêm
+    a ordem da leitura linha a linha. Dimensões ausentes na base valem "".
+    """
+    scan = _BreakdownScan()
+    for batch in iter_dataset_batches(filters, _BREAKDOWN_KEYS + ("vprod",)):
+        scan.add(batch)
+    return scan
+
+
+def _group_batch(batch: "pd.DataFrame", keys: Tuple[str, ...] = _BREAKDOWN_KEYS) -> "pd.DataFrame":
+    """Group-by parcial de um lote (receita por combinação de `keys`)."""
+    import pandas as pd
+
+    by = [batch[c] if c in batch.columns else pd.Series("", index=batch.index, name=c) for c in keys]
+    receita = batch["vprod"] if "vprod" in batch.columns else pd.Series(0.0, index=batch.index, name="vprod")
+    return receita.groupby(by, observed=True, sort=False, dropna=False).sum().reset_index()
+
+
+def _merge_groups(parts: list, keys: Tuple[str, ...] = _BREAKDOWN_KEYS) -> "pd.DataFrame":
+    """Reagrupa parciais de _group_batch (e o acumulado), na ordem dos lotes."""
+    import pandas as pd
+
+    if not parts:
+        return pd.DataFrame({**{c: pd.Series([], dtype=str) for c in keys}, "vprod": pd.Series([], dtype="float64")})
+
+    groups = pd.concat(parts, ignore_index=True)
+    for c in keys:
+        groups[c] = groups[c].astype(object).fillna("").astype(str).str.strip()
+    if len(parts) > 1:
+        groups = groups.groupby(list(keys), sort=False)["vprod"].sum().reset_index()
+    return groups
+
+
+def _nonempty(groups: "pd.DataFrame", col: str) -> "pd.DataFrame":
+    return groups[groups[col] != ""]
+
+
+def _top_revenue(groups: "pd.DataFrame", col: str, n: int) -> list[dict]:
+    """Top-N de receita por `col` (mesma ordem/empates de _topn_from_dict), sem montar dict."""
+    totals = groups["vprod"].groupby(groups[col], sort=False).sum()
+    keys = totals.index.to_numpy()
+    values = totals.to_numpy()
+    return [{"key": keys[i], "value": float(values[i])} for i in top_k_indices(values, n).tolist()]
+
+
+def _empty_breakdowns() -> dict:
+    return {
+        "distinct": {"produtos": 0, "ncm": 0, "cfop": 0},
+        "movimento": [],
+        "top_produtos": [],
+        "top_ncm": [],
+        "top_cfop": [],
+        "top_uf_origem": [],
+        "top_uf_destino": [],
+    }
+
+
+def _breakdowns_payload(scan: _BreakdownScan, limit: int) -> dict:
+    """Cards e rankings de /breakdowns a partir da leitura do recorte (_breakdown_scan)."""
+    # cada ranking é um reagrupamento do resultado (pequeno) do group-by
+    groups = scan.groups.result()
+    produtos = _nonempty(scan.produtos.result() if scan.produtos is not None else groups, "produto")
+    ncms = _nonempty(groups, "ncm")
+    cfops = _nonempty(groups, "cfop")
+
+    movimento = groups["movimento"].map(_parse_movimento)
+    mov_map = groups["vprod"].groupby(movimento, sort=False).sum().to_dict()
+
+    return {
+        "distinct": {name: counter.count() for name, counter in scan.distinct.items()},
+        "movimento": _topn_from_dict(mov_map, n=10),
+        "top_produtos": _top_revenue(produtos, "produto", limit),
+        "top_ncm": _top_revenue(ncms, "ncm", limit),
+        "top_cfop": _top_revenue(cfops, "cfop", limit),
+        "top_uf_origem": _top_revenue(_nonempty(groups, "uf"), "uf", limit),
+        "top_uf_destino": _top_revenue(_nonempty(groups, "uf_dest"), "uf_dest", limit),
+    }
+
 
 @router.get("/breakdowns")
 def breakdowns(
@@ -220,15 +412,7 @@ def breakdowns(
 ):
     st = get_status()
     if not st.get("exists"):
-        return {
-            "distinct": {"produtos": 0, "ncm": 0, "cfop": 0},
-            "movimento": [],
-            "top_produtos": [],
-            "top_ncm": [],
-            "top_cfop": [],
-            "top_uf_origem": [],
-            "top_uf_destino": [],
-        }
+        return _empty_breakdowns()
 
     # período
     d0, d1 = _default_period()
@@ -244,189 +428,63 @@ def breakdowns(
     cfop_f = _norm(cfop)
 
     ensure_data_dir()
-    if not DATASET_PATH.exists():
-        return {
-            "distinct": {"produtos": 0, "ncm": 0, "cfop": 0},
-            "movimento": [],
-            "top_produtos": [],
-            "top_ncm": [],
-            "top_cfop": [],
-            "top_uf_origem": [],
-            "top_uf_destino": [],
-        }
-
-    # acumuladores
-    distinct_prod: Set[str] = set()
-    distinct_ncm: Set[str] = set()
-    distinct_cfop: Set[str] = set()
-
-    top_prod: Dict[str, float] = defaultdict(float)
-    top_ncm_map: Dict[str, float] = defaultdict(float)
-    top_cfop_map: Dict[str, float] = defaultdict(float)
-    top_ufo_map: Dict[str, float] = defaultdict(float)
-    top_ufd_map: Dict[str, float] = defaultdict(float)
-    mov_map: Dict[str, float] = defaultdict(float)
-
-    # leitura streaming do CSV (rápido e consistente com /suggest)
-    with open(DATASET_PATH, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f, delimiter=";")
-        for row in reader:
-            dt = _parse_row_date(row.get("dhemi", ""))
-            if not dt:
-                continue
-            if dt < d0 or dt > d1:
-                continue
-
-            # filtros UF origem/destino (exato)
-            if ufo and (row.get("uf", "") or "").strip().upper() != ufo:
-                continue
-            if ufd and (row.get("uf_dest", "") or "").strip().upper() != ufd:
-                continue
-
-            # NCM / CFOP (exato)
-            if ncm_f and (row.get("ncm", "") or "").strip() != ncm_f:
-                continue
-            if cfop_f and (row.get("cfop", "") or "").strip() != cfop_f:
-                continue
-
-            # Produto (contains)
-            if produto_f and not _contains(row.get("produto", ""), produto_f):
-                continue
-
-            receita = _num(row.get("vprod"))
-            if receita == 0:
-                # ainda assim conta distincts
-                pass
-
-            prod = (row.get("produto") or "").strip()
-            ncm_v = (row.get("ncm") or "").strip()
-            cfop_v = (row.get("cfop") or "").strip()
-            uf_o = (row.get("uf") or "").strip().upper()
-            uf_d = (row.get("uf_dest") or "").strip().upper()
-            mov = _parse_movimento(row.get("movimento", ""))
-
-            if prod:
-                distinct_prod.add(prod.upper())
-                top_prod[prod] += receita
-
-            if ncm_v:
-                distinct_ncm.add(ncm_v)
-                top_ncm_map[ncm_v] += receita
-
-            if cfop_v:
-                distinct_cfop.add(cfop_v)
-                top_cfop_map[cfop_v] += receita
-
-            if uf_o:
-                top_ufo_map[uf_o] += receita
-
-            if uf_d:
-                top_ufd_map[uf_d] += receita
-
-            mov_map[mov] += receita
-
-    return {
-        "distinct": {
-            "produtos": len(distinct_prod),
-            "ncm": len(distinct_ncm),
-            "cfop": len(distinct_cfop),
-        },
-        "movimento": _topn_from_dict(mov_map, n=10),
-        "top_produtos": _topn_from_dict(top_prod, n=limit),
-        "top_ncm": _topn_from_dict(top_ncm_map, n=limit),
-        "top_cfop": _topn_from_dict(top_cfop_map, n=limit),
-        "top_uf_origem": _topn_from_dict(top_ufo_map, n=limit),
-        "top_uf_destino": _topn_from_dict(top_ufd_map, n=limit),
-    }
-
+    if not dataset_exists():
+        return _empty_breakdowns()
 
-@router.get("/overview", response_model=DashboardResponse)
-def overview(
-    periodo_inicio: Optional[str] = Query(default=None),
-    periodo_fim: Optional[str] = Query(default=None),
-    uf_origem: Optional[str] = Query(default=None),
-    uf_destino: Optional[str] = Query(default=None),
-    ncm: Optional[str] = Query(default=None),
-    produto: Optional[str] = Query(default=None),
-    cfop: Optional[str] = Query(default=None),
-):
-    st = get_status()
-
-    if not st.get("exists"):
-        return DashboardResponse(
-            status=st,
-            summary={
-                "exists": False,
-                "path": st.get("path", ""),
-                "rows": 0,
-                "min_date": None,
-                "max_date": None,
-                "ufs_origem": [],
-                "ufs_destino": [],
-                "receita_total": 0.0,
-                "icms_total": 0.0,
-                "pis_total": 0.0,
-                "cofins_total": 0.0,
-            },
-            kpis=DashboardKpis(),
-            timeseries=[],
-        )
-
-    d0, d1 = _default_period()
-    if periodo_inicio:
-        d0 = _to_date(periodo_inicio)
-    if periodo_fim:
-        d1 = _to_date(periodo_fim)
-
-    rows = query_dataset(
+    scan = _breakdown_scan(
         Filters(
             periodo_inicio=d0,
             periodo_fim=d1,
-            uf_origem=uf_origem,
-            uf_destino=uf_destino,
-            ncm=ncm,
-            produto=produto,
-            cfop=cfop,
+            uf_origem=ufo,
+            uf_destino=ufd,
+            ncm=ncm_f,
+            produto=produto_f,
+            cfop=cfop_f,
         )
     )
 
-    receita_total = 0.0
-    icms_total = 0.0
-    pis_total = 0.0
-    cofins_total = 0.0
+    return _breakdowns_payload(scan, limit)
 
-    ufs_o = set()
-    ufs_d = set()
-    dates: list[date] = []
 
-    for r in rows:
-        receita_total += _num(r.get("vprod"))
-        icms_total += _num(r.get("vicms_icms"))
-        pis_total += _num(r.get("vpis"))
-        cofins_total += _num(r.get("vcofins"))
+def _empty_overview(st: dict) -> DashboardResponse:
+    return DashboardResponse(
+        status=st,
+        summary={
+            "exists": False,
+            "path": st.get("path", ""),
+            "rows": 0,
+            "min_date": None,
+            "max_date": None,
+            "ufs_origem": [],
+            "ufs_destino": [],
+            "receita_total": 0.0,
+            "icms_total": 0.0,
+            "pis_total": 0.0,
+            "cofins_total": 0.0,
+        },
+        kpis=DashboardKpis(),
+        timeseries=[],
+    )
 
-        ufo = (r.get("uf") or "").strip().upper()
-        ufd = (r.get("uf_dest") or "").strip().upper()
-        if ufo:
-            ufs_o.add(ufo)
-        if ufd:
-            ufs_d.add(ufd)
 
-        dt = _parse_row_date(r.get("dhemi", ""))
-        if dt:
-            dates.append(dt)
+def _overview_response(st: dict, totals: _BatchTotals) -> DashboardResponse:
+    """KPIs, resumo e série mensal do recorte a partir dos totais (_scan)."""
+    receita_total = totals.money["vprod"]
+    icms_total = totals.money["vicms_icms"]
+    pis_total = totals.money["vpis"]
+    cofins_total = totals.money["vcofins"]
 
-    min_date = min(dates).isoformat() if dates else None
-    max_date = max(dates).isoformat() if dates else None
+    min_date = totals.min_dt.date().isoformat() if totals.rows else None
+    max_date = totals.max_dt.date().isoformat() if totals.rows else None
 
     summary = {
         "exists": True,
         "path": st.get("path", ""),
-        "rows": len(rows),
+        "rows": int(totals.rows),
         "min_date": min_date,
         "max_date": max_date,
-        "ufs_origem": sorted(ufs_o),
-        "ufs_destino": sorted(ufs_d),
+        "ufs_origem": sorted(totals.ufs_origem),
+        "ufs_destino": sorted(totals.ufs_destino),
         "receita_total": float(receita_total),
         "icms_total": float(icms_total),
         "pis_total": float(pis_total),
@@ -441,7 +499,7 @@ def overview(
         carga_atual_total=float(icms_total + pis_total + cofins_total),
     )
 
-    ts = _build_timeseries_by_month(rows)
+    ts = _build_timeseries_by_month(totals.monthly())
 
     return DashboardResponse(
         status=st,
@@ -451,60 +509,27 @@ def overview(
     )
 
 
-@router.get("/compare")
-def compare(
-    ano_reforma: int = Query(..., ge=2026, le=2033),
-    periodo_inicio: Optional[str] = Query(default=None),
-    periodo_fim: Optional[str] = Query(default=None),
-    uf_origem: Optional[str] = Query(default=None),
-    uf_destino: Optional[str] = Query(default=None),
-    ncm: Optional[str] = Query(default=None),
-    produto: Optional[str] = Query(default=None),
-    cfop: Optional[str] = Query(default=None),
-):
-    st = get_status()
-    if not st.get("exists"):
-        return {
-            "kpis": {
-                "ano_reforma": ano_reforma,
-                "receita_total": 0.0,
-                "carga_atual_total": 0.0,
-                "carga_reforma_total": 0.0,
-                "diferenca_absoluta": 0.0,
-                "diferenca_percentual": 0.0,
-            },
-            "detalhes": [],
-            "timeseries": [],
-        }
-
-    d0, d1 = _default_period()
-    if periodo_inicio:
-        d0 = _to_date(periodo_inicio)
-    if periodo_fim:
-        d1 = _to_date(periodo_fim)
-
-    rows = query_dataset(
-        Filters(
-            periodo_inicio=d0,
-            periodo_fim=d1,
-            uf_origem=uf_origem,
-            uf_destino=uf_destino,
-            ncm=ncm,
-            produto=produto,
-            cfop=cfop,
-        )
-    )
+def _empty_compare(ano_reforma: int) -> dict:
+    return {
+        "kpis": {
+            "ano_reforma": ano_reforma,
+            "receita_total": 0.0,
+            "carga_atual_total": 0.0,
+            "carga_reforma_total": 0.0,
+            "diferenca_absoluta": 0.0,
+            "diferenca_percentual": 0.0,
+        },
+        "detalhes": [],
+        "timeseries": [],
+    }
 
-    receita_total = 0.0
-    icms_atual = 0.0
-    pis_atual = 0.0
-    cofins_atual = 0.0
 
-    for r in rows:
-        receita_total += _num(r.get("vprod"))
-        icms_atual += _num(r.get("vicms_icms"))
-        pis_atual += _num(r.get("vpis"))
-        cofins_atual += _num(r.get("vcofins"))
+def _compare_payload(totals: _BatchTotals, ano_reforma: int, uf_origem: Optional[str]) -> dict:
+    """Comparativo atual x reforma (KPIs, tributos e série mensal) a partir dos totais."""
+    receita_total = totals.money["vprod"]
+    icms_atual = totals.money["vicms_icms"]
+    pis_atual = totals.money["vpis"]
+    cofins_atual = totals.money["vcofins"]
 
     carga_atual = icms_atual + pis_atual + cofins_atual
 
@@ -538,21 +563,12 @@ def compare(
         lambda: {"receita": 0.0, "icms": 0.0, "pis": 0.0, "cofins": 0.0, "atual": 0.0, "reforma": 0.0}
     )
 
-    for r in rows:
-        dt = _parse_row_date(r.get("dhemi", ""))
-        if not dt:
-            continue
-        key = f"{dt.year:04d}-{dt.month:02d}"
-
-        receita = _num(r.get("vprod"))
-        icms = _num(r.get("vicms_icms"))
-        pis = _num(r.get("vpis"))
-        cofins = _num(r.get("vcofins"))
-
-        monthly[key]["receita"] += receita
-        monthly[key]["icms"] += icms
-        monthly[key]["pis"] += pis
-        monthly[key]["cofins"] += cofins
+    for key, m in totals.monthly().iterrows():
+        key = str(key)
+        monthly[key]["receita"] += float(m.get("vprod", 0.0))
+        monthly[key]["icms"] += float(m.get("vicms_icms", 0.0))
+        monthly[key]["pis"] += float(m.get("vpis", 0.0))
+        monthly[key]["cofins"] += float(m.get("vcofins", 0.0))
 
     for key in list(monthly.keys()):
         receita_m = monthly[key]["receita"]
@@ -604,3 +620,180 @@ def compare(
         "detalhes": detalhes,
         "timeseries": timeseries,
     }
+
+
+@router.get("/overview", response_model=DashboardResponse)
+def overview(
+    periodo_inicio: Optional[str] = Query(default=None),
+    periodo_fim: Optional[str] = Query(default=None),
+    uf_origem: Optional[str] = Query(default=None),
+    uf_destino: Optional[str] = Query(default=None),
+    ncm: Optional[str] = Query(default=None),
+    produto: Optional[str] = Query(default=None),
+    cfop: Optional[str] = Query(default=None),
+):
+    st = get_status()
+
+    if not st.get("exists"):
+        return _empty_overview(st)
+
+    d0, d1 = _default_period()
+    if periodo_inicio:
+        d0 = _to_date(periodo_inicio)
+    if periodo_fim:
+        d1 = _to_date(periodo_fim)
+
+    totals = _scan(
+        Filters(
+            periodo_inicio=d0,
+            periodo_fim=d1,
+            uf_origem=uf_origem,
+            uf_destino=uf_destino,
+            ncm=ncm,
+            produto=produto,
+            cfop=cfop,
+        )
+    )
+
+    return _overview_response(st, totals)
+
+
+@router.get("/compare")
+def compare(
+    ano_reforma: int = Query(..., ge=2026, le=2033),
+    periodo_inicio: Optional[str] = Query(default=None),
+    periodo_fim: Optional[str] = Query(default=None),
+    uf_origem: Optional[str] = Query(default=None),
+    uf_destino: Optional[str] = Query(default=None),
+    ncm: Optional[str] = Query(default=None),
+    produto: Optional[str] = Query(default=None),
+    cfop: Optional[str] = Query(default=None),
+):
+    st = get_status()
+    if not st.get("exists"):
+        return _empty_compare(ano_reforma)
+
+    d0, d1 = _default_period()
+    if periodo_inicio:
+        d0 = _to_date(periodo_inicio)
+    if periodo_fim:
+        d1 = _to_date(periodo_fim)
+
+    totals = _scan(
+        Filters(
+            periodo_inicio=d0,
+            periodo_fim=d1,
+            uf_origem=uf_origem,
+            uf_destino=uf_destino,
+            ncm=ncm,
+            produto=produto,
+            cfop=cfop,
+        ),
+        columns=("__month",) + MONEY_COLUMNS,
+    )
+
+    return _compare_payload(totals, ano_reforma, uf_origem)
+
+
+# =========================
+# BUNDLE (overview + breakdowns + compare numa leitura)
+# =========================
+_BUNDLE_SECTIONS = ("overview", "timeseries", "breakdowns", "compare")
+
+# Colunas lidas pelo bundle com breakdowns: totais (_BatchTotals) + group-by
+_BUNDLE_COLUMNS = tuple(dict.fromkeys(("__dt", "__month") + MONEY_COLUMNS + _BREAKDOWN_KEYS))
+
+
+def _bundle_sections(include: Optional[str]) -> list[str]:
+    """Seções pedidas em include= (separadas por vírgula); vazio = todas."""
+    wanted = [x.strip().lower() for x in (include or "").split(",") if x.strip()]
+    if not wanted:
+        return list(_BUNDLE_SECTIONS)
+
+    invalid = [x for x in wanted if x not in _BUNDLE_SECTIONS]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"include inválido: {', '.join(invalid)}. Use: {','.join(_BUNDLE_SECTIONS)}",
+        )
+    return [x for x in _BUNDLE_SECTIONS if x in wanted]
+
+
+def _bundle_scan(filters: Filters, with_groups: bool) -> Tuple[_BatchTotals, Optional[_BreakdownScan]]:
+    """Uma leitura do recorte para todas as seções do bundle.
+
+    Sem breakdowns, os totais saem de _scan (cubo mensal + bordas do período). Com
+    breakdowns, cada lote de iter_dataset_batches alimenta os totais e o group-by.
+    """
+    if not with_groups:
+        return _scan(filters), None
+
+    totals = _BatchTotals()
+    scan = _BreakdownScan()
+    for batch in iter_dataset_batches(filters, _BUNDLE_COLUMNS):
+        totals.add(batch)
+        scan.add(batch)
+    return totals, scan
+
+
+@router.get("/bundle")
+def bundle(
+    include: Optional[str] = Query(default=None, description="overview,timeseries,breakdowns,compare (default: todas)"),
+    ano_reforma: int = Query(2027, ge=2026, le=2033),
+    limit: int = Query(10, ge=5, le=50),
+
+    # mesmos filtros do dashboard
+    periodo_inicio: Optional[str] = Query(default=None),
+    periodo_fim: Optional[str] = Query(default=None),
+    uf_origem: Optional[str] = Query(default=None),
+    uf_destino: Optional[str] = Query(default=None),
+    ncm: Optional[str] = Query(default=None),
+    produto: Optional[str] = Query(default=None),
+    cfop: Optional[str] = Query(default=None),
+):
+    """overview, timeseries, breakdowns e compare do mesmo recorte numa resposta.
+
+    Cada seção é igual à do endpoint correspondente (overview sem a série, que vem
+    em "timeseries"); o filtro é avaliado uma vez e as linhas lidas uma só vez.
+    """
+    sections = _bundle_sections(include)
+    st = get_status()
+
+    ensure_data_dir()
+    if not st.get("exists") or not dataset_exists():
+        ov = _empty_overview(st)
+        groups_out = _empty_breakdowns()
+        compare_out = _empty_compare(ano_reforma)
+    else:
+        d0, d1 = _default_period()
+        if periodo_inicio:
+            d0 = _to_date(periodo_inicio)
+        if periodo_fim:
+            d1 = _to_date(periodo_fim)
+
+        totals, scan = _bundle_scan(
+            Filters(
+                periodo_inicio=d0,
+                periodo_fim=d1,
+                uf_origem=uf_origem,
+                uf_destino=uf_destino,
+                ncm=ncm,
+                produto=produto,
+                cfop=cfop,
+            ),
+            with_groups="breakdowns" in sections,
+        )
+        ov = _overview_response(st, totals)
+        groups_out = _breakdowns_payload(scan, limit) if scan is not None else None
+        compare_out = _compare_payload(totals, ano_reforma, uf_origem)
+
+    out: Dict[str, Any] = {}
+    if "overview" in sections:
+        out["overview"] = ov.model_dump(exclude={"timeseries"})
+    if "timeseries" in sections:
+        out["timeseries"] = [p.model_dump() for p in ov.timeseries]
+    if "breakdowns" in sections:
+        out["breakdowns"] = groups_out
+    if "compare" in sections:
+        out["compare"] = compare_out
+    return out
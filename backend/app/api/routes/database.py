@@ -2,18 +2,34 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
 
 from fastapi import APIRouter, HTTPException
 from app.services.database_service import clear_dataset
 
-from app.schemas.database import DatabaseStatus, DatabaseSummary, ImportCsvResponse
+from app.core.dataset import DATASET_PATH
+from app.schemas.database import (
+    DatabaseQuality,
+    DatabaseStatus,
+    DatabaseSummary,
+    ImportCsvResponse,
+    ImportJob,
+    ImportNfeXmlResponse,
+)
+from app.services.dataset_warmup_service import schedule_warmup
+from app.services.import_job_service import describe_job, submit_import_job
 from app.services.database_service import (
+    get_quality,
     get_status,
     get_summary,
-    import_csv_bytes,
+    import_csv_stream,
+    import_nfe_xml_stream,
     get_template_csv_bytes,
+    is_supported_upload,
 )
+from app.storage.dataset import dataset_exists, export_dataset_csv
+from app.storage.import_jobs import get_job
 
 router = APIRouter(prefix="/database", tags=["Database"])
 
@@ -36,6 +52,12 @@ def database_summary():
     return get_summary()
 
 
+@router.get("/quality", response_model=DatabaseQuality)
+def database_quality():
+    # contadores/amostra gravados no manifesto durante o import (sem nova varredura)
+    return get_quality()
+
+
 @router.get("/template-csv")
 def template_csv():
     content = get_template_csv_bytes()
@@ -46,18 +68,85 @@ def template_csv():
     )
 
 
+@router.get("/export-csv")
+def export_csv():
+    # o import grava direto no cache colunar; o CSV é gerado sob demanda
+    if not dataset_exists():
+        raise HTTPException(status_code=404, detail="Nenhuma base importada")
+    try:
+        path = export_dataset_csv()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FileResponse(
+        path,
+        media_type="text/csv; charset=utf-8",
+        filename="dataset_nfe_itens.csv",
+    )
+
+
 @router.post("/import-csv", response_model=ImportCsvResponse)
-async def import_csv(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Envie um arquivo .csv")
+async def import_csv(
+    response: Response,
+    file: UploadFile = File(...),
+    append: bool = False,
+    background: bool = False,
+):
+    if not is_supported_upload(file.filename):
+        raise HTTPException(status_code=400, detail="Envie um arquivo .csv (ou compactado: .csv.gz, .zip, .zst)")
+
+    # background=true: responde já com o job_id; o parse segue numa worker thread
+    if background:
+        job = await run_in_threadpool(submit_import_job, file.file, file.filename, append)
+        response.status_code = 202
+        return {"imported_rows": 0, "path": str(DATASET_PATH), "job_id": job["id"]}
 
-    raw = await file.read()
+    # upload já está em arquivo temporário (multipart); lido em streaming numa
+    # worker thread para não travar o event loop
+    # append=true: acrescenta à base atual, ignorando linhas já importadas
     try:
-        imported = import_csv_bytes(raw)
+        result = await run_in_threadpool(import_csv_stream, file.file, append)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="Falha interna ao importar CSV")
 
+    # reconstrói o cache em background; /database/status expõe "indexing"
+    schedule_warmup()
+
     st = get_status()
-    return {"imported_rows": imported, "path": st["path"]}
+    return {**result, "path": st["path"]}
+
+
+@router.post("/import-nfe-xml", response_model=ImportNfeXmlResponse)
+async def import_nfe_xml(
+    response: Response,
+    file: UploadFile = File(...),
+    append: bool = False,
+    background: bool = False,
+):
+    # .zip com os XMLs (procNFe) ou um único .xml
+    if not file.filename.lower().endswith((".zip", ".xml")):
+        raise HTTPException(status_code=400, detail="Envie um .zip com os XMLs de NF-e (ou um .xml)")
+
+    if background:
+        job = await run_in_threadpool(submit_import_job, file.file, file.filename, append, "nfe_xml")
+        response.status_code = 202
+        return {"imported_rows": 0, "path": str(DATASET_PATH), "job_id": job["id"]}
+
+    try:
+        result = await run_in_threadpool(import_nfe_xml_stream, file.file, append)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Falha interna ao importar XMLs")
+
+    schedule_warmup()
+    return {**result, "path": str(DATASET_PATH)}
+
+
+@router.get("/import-jobs/{job_id}", response_model=ImportJob)
+def import_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job de import não encontrado")
+    return describe_job(job)
@@ -1,15 +1,11 @@
 # backend/app/api/routes/database_summary.py
-from pathlib import Path
-
 from fastapi import APIRouter
 
+from app.core.dataset import DATASET_PATH
 from app.services.database_summary_service import build_summary
 
 router = APIRouter(prefix="/database", tags=["Base de Dados"])
 
-# Ajuste aqui para o mesmo local onde você salva o CSV no import.
-DATASET_PATH = Path("storage") / "nfe_itens.csv"
-
 
 @router.get("/summary")
 def get_summary():
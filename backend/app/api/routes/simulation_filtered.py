@@ -7,7 +7,7 @@ from app.schemas.simulation_filtered import (
     SimulationFilteredResponse,
     TributoDetalhe,
 )
-from app.storage.dataset import Filters, query_dataset, sum_field
+from app.storage.dataset import Filters, query_dataset_frame, sum_money
 from app.services.tax_params_service import get_rate
 
 router = APIRouter(tags=["Simulação (base histórica)"])
@@ -25,7 +25,7 @@ def _to_date(s: str):
 def simular(payload: SimulationFilteredRequest):
     # valida se existe base
     try:
-        rows = query_dataset(
+        frame = query_dataset_frame(
             Filters(
                 periodo_inicio=_to_date(payload.periodo_inicio),
                 periodo_fim=_to_date(payload.periodo_fim),
@@ -38,10 +38,10 @@ def simular(payload: SimulationFilteredRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    receita_total = sum_field(rows, "vprod")
-    icms_atual = sum_field(rows, "vicms_icms")
-    pis_atual = sum_field(rows, "vpis")
-    cofins_atual = sum_field(rows, "vcofins")
+    receita_total = sum_money(frame, "vprod")
+    icms_atual = sum_money(frame, "vicms_icms")
+    pis_atual = sum_money(frame, "vpis")
+    cofins_atual = sum_money(frame, "vcofins")
 
     carga_atual = icms_atual + pis_atual + cofins_atual
 
@@ -8,8 +8,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
 from app.services.database_service import get_status
-from app.storage.dataset import Filters, query_dataset
-from app.core.number import parse_money
+from app.storage.dataset import Filters, query_dataset_frame, sum_money
 
 
 router = APIRouter(tags=["Simulação"])
@@ -23,13 +22,6 @@ def _to_date(s: str) -> date:
         raise ValueError(f"Data inválida: {s}")
 
 
-def _num(v: Optional[str]) -> float:
-    try:
-        return float(parse_money(v))
-    except Exception:
-        return 0.0
-
-
 class SimulacaoDetalhadaRequest(BaseModel):
     # obrigatórios no seu Simulator.tsx
     periodo_inicio: str = Field(..., description="YYYY-MM-DD")
@@ -83,7 +75,7 @@ def simulacao_detalhada(payload: SimulacaoDetalhadaRequest) -> Dict[str, Any]:
     produto = (payload.produto or "").strip() or None
     cfop = (payload.cfop or "").strip() or None
 
-    rows = query_dataset(
+    frame = query_dataset_frame(
         Filters(
             periodo_inicio=d0,
             periodo_fim=d1,
@@ -95,16 +87,10 @@ def simulacao_detalhada(payload: SimulacaoDetalhadaRequest) -> Dict[str, Any]:
         )
     )
 
-    receita_total = 0.0
-    icms_atual = 0.0
-    pis_atual = 0.0
-    cofins_atual = 0.0
-
-    for r in rows:
-        receita_total += _num(r.get("vprod"))
-        icms_atual += _num(r.get("vicms_icms"))
-        pis_atual += _num(r.get("vpis"))
-        cofins_atual += _num(r.get("vcofins"))
+    receita_total = sum_money(frame, "vprod")
+    icms_atual = sum_money(frame, "vicms_icms")
+    pis_atual = sum_money(frame, "vpis")
+    cofins_atual = sum_money(frame, "vcofins")
 
     carga_atual = icms_atual + pis_atual + cofins_atual
 
@@ -124,10 +110,9 @@ def simulacao_detalhada(payload: SimulacaoDetalhadaRequest) -> Dict[str, Any]:
 
     # IS: só aplica se vier lista de NCM seletivo + alíquota > 0
     valor_is = 0.0
-    if seletivos and alic_is > 0:
-        for r in rows:
-            if (r.get("ncm") or "").strip() in seletivos:
-                valor_is += _num(r.get("vprod")) * float(alic_is)
+    if seletivos and alic_is > 0 and "ncm" in frame.columns:
+        sel = frame["ncm"].astype(str).str.strip().isin(seletivos)
+        valor_is = sum_money(frame.loc[sel], "vprod") * float(alic_is)
 
     # transição simplificada do MVP: 2027+ zera PIS/COFINS
     if ano >= 2027:
@@ -9,13 +9,18 @@ from fastapi import APIRouter, Query
 from pydantic import BaseModel, Field
 
 from app.services.database_service import get_status
-from app.storage.dataset import Filters, query_dataset
+from app.storage.dataset import Filters, iter_dataset_batches
 
 from app.services.classifier_service import safe_finalidade
 
 # Engine v4 (novo)
 from app.services.simulator_engine.dto_v4 import Scenario as EngineScenario, RunFilters as EngineRunFilters
-from app.services.simulator_engine.engine_v4 import run_engine_v4
+from app.services.simulator_engine.engine_v4 import (
+    FRAME_GROUP_COLUMNS,
+    FRAME_MONEY_COLUMNS,
+    rows_from_frames,
+    run_engine_v4,
+)
 
 router = APIRouter(prefix="/simulator", tags=["Simulator v4"])
 
@@ -230,8 +235,8 @@ def run_v4(
     if periodo_fim:
         d1 = _to_date(periodo_fim)
 
-    # Dataset (filtros iguais ao dashboard)
-    rows = query_dataset(
+    # Dataset (filtros iguais ao dashboard), agregado lote a lote
+    batches = iter_dataset_batches(
         Filters(
             periodo_inicio=d0,
             periodo_fim=d1,
@@ -240,8 +245,10 @@ def run_v4(
             ncm=ncm,
             produto=produto,
             cfop=cfop,
-        )
+        ),
+        columns=FRAME_GROUP_COLUMNS + FRAME_MONEY_COLUMNS,
     )
+    rows = rows_from_frames(batches)
 
     mov_filter = _up(movimento)
     fin_filter = safe_finalidade(finalidade)
@@ -1,12 +1,27 @@
 # backend/app/core/config.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Cache do dataset: build/pré-carga em background, sem atrasar o boot
+    from app.services.dataset_warmup_service import schedule_warmup
+    schedule_warmup()
+
+    # Imports em background interrompidos por restart voltam para a fila
+    from app.services.import_job_service import resume_import_jobs
+    resume_import_jobs()
+    yield
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="API Calculadora da Reforma",
         version="0.3.0",
+        lifespan=_lifespan,
     )
 
     # CORS (desenvolvimento)
@@ -28,3 +28,17 @@ def format_two_decimals(data: Any) -> Any:
 
     # Outros tipos: retorna como está
     return data
+
+
+def normalize_search_text(value: Any) -> str:
+    """
+    Normaliza texto para busca: remove acentos, trim e caixa alta.
+    Ex.: " Máquina de Café " -> "MAQUINA DE CAFE"
+    """
+    import unicodedata
+
+    if value is None:
+        return ""
+    s = unicodedata.normalize("NFKD", str(value))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return s.strip().upper()
@@ -0,0 +1,119 @@
+# backend/app/core/nfe_xml.py
+from __future__ import annotations
+
+import io
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Sequence, Tuple
+
+# Colunas emitidas por item (layout do CSV canônico + identificação do item)
+NFE_ROW_COLUMNS = (
+    "dhemi",
+    "uf",
+    "uf_dest",
+    "vprod",
+    "vicms_icms",
+    "vpis",
+    "vcofins",
+    "ncm",
+    "produto",
+    "cfop",
+    "movimento",
+    "chave_nfe",
+    "n_item",
+)
+
+# cStat do protocolo que valem como nota autorizada (100 = autorizada, 150 = fora de prazo)
+_AUTHORIZED = {"100", "150"}
+
+_MOVIMENTO = {"0": "ENTRADA", "1": "SAIDA"}
+
+# campos do item: tag -> (coluna, grupo pai exigido no caminho)
+_ITEM_FIELDS = {
+    "xProd": ("produto", "prod"),
+    "NCM": ("ncm", "prod"),
+    "CFOP": ("cfop", "prod"),
+    "vProd": ("vprod", "prod"),
+    "vICMS": ("vicms_icms", "ICMS"),
+    "vPIS": ("vpis", "PIS"),
+    "vCOFINS": ("vcofins", "COFINS"),
+}
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_nfe_xml(data: bytes) -> List[Dict[str, str]]:
+    """Itens (det) de um XML de NF-e (procNFe ou NFe), um dict por item.
+
+    Parse incremental (iterparse): cada <det> é descartado após virar linha, então
+    a memória não depende do número de itens. Notas com protocolo não autorizado
+    (cancelada/denegada) não geram linhas; XML que não é NF-e devolve [].
+    Valores saem como texto (o cache faz a tipagem, como no CSV).
+    """
+    header = {"dhemi": "", "uf": "", "uf_dest": "", "movimento": "", "chave_nfe": ""}
+    items: List[Dict[str, str]] = []
+    item: Dict[str, str] = {}
+    path: List[str] = []
+    status = ""
+
+    for event, elem in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+        name = _local(elem.tag)
+
+        if event == "start":
+            path.append(name)
+            if name == "infNFe":
+                header["chave_nfe"] = (elem.get("Id") or "").replace("NFe", "", 1)
+            elif name == "det":
+                item = {"n_item": elem.get("nItem") or str(len(items) + 1)}
+            continue
+
+        path.pop()
+        text = (elem.text or "").strip()
+        parent = path[-1] if path else ""
+
+        if "det" in path:
+            field = _ITEM_FIELDS.get(name)
+            if field is not None and field[1] in path:
+                item[field[0]] = text
+        elif name == "det":
+            items.append(item)
+            elem.clear()
+        elif name in ("dhEmi", "dEmi") and parent == "ide":
+            header["dhemi"] = text[:10]
+        elif name == "tpNF" and parent == "ide":
+            header["movimento"] = _MOVIMENTO.get(text, "")
+        elif name == "UF" and parent == "enderEmit":
+            header["uf"] = text
+        elif name == "UF" and parent == "enderDest":
+            header["uf_dest"] = text
+        elif name == "cStat" and parent == "infProt":
+            status = text
+
+    if status and status not in _AUTHORIZED:
+        return []
+
+    return [{col: it.get(col, header.get(col, "")) for col in NFE_ROW_COLUMNS} for it in items]
+
+
+def parse_nfe_xml_batch(blobs: Sequence[bytes]) -> Tuple[Dict[str, List[str]], int]:
+    """Worker do import em lote: XMLs -> colunas (listas) + nº de arquivos ignorados.
+
+    Ignorados: XML inválido ou sem itens de NF-e (ex.: eventos, notas canceladas).
+    """
+    columns: Dict[str, List[str]] = {col: [] for col in NFE_ROW_COLUMNS}
+    skipped = 0
+
+    for data in blobs:
+        try:
+            rows = parse_nfe_xml(data)
+        except ET.ParseError:
+            rows = []
+        if not rows:
+            skipped += 1
+            continue
+        for row in rows:
+            for col in NFE_ROW_COLUMNS:
+                columns[col].append(row[col])
+
+    return columns, skipped
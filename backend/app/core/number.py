@@ -44,3 +44,29 @@ def parse_money(v) -> float:
         return float(s)
     except Exception:
         return 0.0
+
+
+def parse_money_series(s: "pd.Series") -> "pd.Series":
+    """
+    Versão vetorizada de parse_money para colunas pandas (mesmas regras).
+    Valores vazios/inválidos viram 0.0, como no parser escalar.
+    """
+    return parse_money_series_nan(s).fillna(0.0)
+
+
+def parse_money_series_nan(s: "pd.Series") -> "pd.Series":
+    """
+    Como parse_money_series, mas mantém NaN onde o valor não é número
+    (vazio ou inválido): permite contar valores inválidos sem um segundo parse.
+    """
+    import pandas as pd
+
+    txt = s.fillna("").astype(str).str.replace("R$", "", regex=False)
+    txt = txt.str.replace(r"\s+", "", regex=True)
+
+    # 1.234,56 (pt-BR) => remove milhar; depois qualquer ',' vira decimal
+    br = txt.str.contains(".", regex=False) & txt.str.contains(",", regex=False)
+    txt = txt.where(~br, txt.str.replace(".", "", regex=False))
+    txt = txt.str.replace(",", ".", regex=False)
+
+    return pd.to_numeric(txt, errors="coerce").astype("float64")
@@ -11,6 +11,49 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173",
     ]
 
+    # Dataset de NF-e: orçamento (MB) do DataFrame mantido em memória entre requests.
+    # 0 desliga o cache em memória (cada consulta lê o cache em disco).
+    dataset_cache_max_mb: int = 2048
+
+    # Índices secundários: usa a lista de posições só se o filtro selecionar até
+    # esta fração das linhas; acima disso a máscara vetorizada é mais barata.
+    dataset_index_max_selectivity: float = 0.05
+
+    # Grava também um espelho Arrow IPC (sem compressão) do cache e o lê via memory-map:
+    # workers do uvicorn compartilham as páginas e o cold start fica praticamente nulo.
+    # Custo: o espelho ocupa em disco mais que as partições parquet (comprimidas).
+    dataset_arrow_mmap: bool = True
+
+    # LRU (MB) de resultados de consulta (posições de linha) por filtros + versão do dataset.
+    dataset_result_cache_mb: int = 256
+
+    # Build do cache lê o CSV em blocos deste tamanho (linhas): memória limitada ao bloco.
+    dataset_chunk_rows: int = 500_000
+
+    # Acima deste tamanho (MB, base tipada) o cache fica em modo out-of-core: sem
+    # espelho Arrow/índices e consultas agregadas em lotes (iter_dataset_batches).
+    dataset_in_memory_max_mb: int = 8192
+
+    # Linhas por lote lido das partições no modo out-of-core.
+    dataset_batch_rows: int = 250_000
+
+    # Build do cache em paralelo: processos de parse (0 = nº de CPUs) e tamanho
+    # mínimo (MB) de cada intervalo do CSV; arquivos menores usam o caminho serial.
+    dataset_parse_workers: int = 0
+    dataset_parallel_min_mb: int = 64
+
+    # Import grava direto no cache colunar; o CSV canônico é gerado sob demanda
+    # (GET /database/export-csv). True mantém também o CSV no import (I/O extra).
+    dataset_keep_csv: bool = False
+
+    # Contagem de distintos do dashboard (/breakdowns): True usa HyperLogLog
+    # (memória fixa, erro ~1%) em vez da contagem exata e tira produto do
+    # group-by combinado (ranking de produtos num group-by próprio).
+    dashboard_distinct_approx: bool = False
+
+    # Reconstrói/pré-carrega o cache em background no startup e após cada import.
+    dataset_warmup: bool = True
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
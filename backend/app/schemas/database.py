@@ -2,13 +2,17 @@
 from __future__ import annotations
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class DatabaseStatus(BaseModel):
     exists: bool
     path: str
     rows: int
+    # cache colunar: pronto para consultas / sendo (re)construído em background
+    cache_ready: bool = False
+    indexing: bool = False
+    cache_error: Optional[str] = None
 
 
 class DatabaseSummary(BaseModel):
@@ -23,8 +27,79 @@ class DatabaseSummary(BaseModel):
     icms_total: float = 0.0
     pis_total: float = 0.0
     cofins_total: float = 0.0
+    # linhas vazias por coluna (disponível quando servido do manifesto)
+    null_counts: Dict[str, int] = {}
+
+
+class QualitySample(BaseModel):
+    record: Optional[int] = None  # posição da linha (1-based) na sequência importada
+    issue: str  # date_invalid | money_invalid | bad_line
+    line: Optional[int] = None  # bad_line: nº da linha no arquivo importado
+    column: Optional[str] = None
+    value: str = ""
+    row: Dict[str, str] = {}
+
+
+class DatabaseQuality(BaseModel):
+    exists: bool
+    rows: int
+    valid_rows: int
+    # linhas fora da base (data vazia/inválida)
+    rejected_rows: int = 0
+    date_invalid: int = 0
+    # linhas malformadas (campos a mais), puladas no parse
+    bad_lines: int = 0
+    # valores preenchidos mas não numéricos (gravados como 0), por coluna
+    money_invalid: Dict[str, int] = {}
+    # obrigatórias vazias, por coluna
+    missing_required: Dict[str, int] = {}
+    samples: List[QualitySample] = []
 
 
 class ImportCsvResponse(BaseModel):
+    # linhas gravadas na base (com data válida)
     imported_rows: int
     path: str
+    # import incremental (append): linhas já existentes na base, ignoradas
+    duplicate_rows: int = 0
+    # linhas sem data válida (fora da base)
+    rejected_rows: int = 0
+    # linhas malformadas (campos a mais), puladas no parse
+    bad_lines: int = 0
+    # import em background: acompanhe em /database/import-jobs/{job_id}
+    job_id: Optional[str] = None
+
+
+class ImportNfeXmlResponse(ImportCsvResponse):
+    # XMLs lidos / ignorados (inválidos, eventos, notas não autorizadas)
+    files: int = 0
+    skipped_files: int = 0
+
+
+class ImportJob(BaseModel):
+    id: str
+    status: str  # queued | running | done | failed
+    kind: str = "csv"  # csv | nfe_xml
+    filename: Optional[str] = None
+    append: bool = False
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    bytes_total: int = 0
+    bytes_read: int = 0
+    rows_processed: int = 0
+    # linhas sem data válida (não entram na base)
+    rejected_rows: int = 0
+    imported_rows: int = 0
+    duplicate_rows: int = 0
+    bad_lines: int = 0
+    # só nfe_xml
+    files: int = 0
+    skipped_files: int = 0
+    error: Optional[str] = None
+    # derivados
+    elapsed_seconds: float = 0.0
+    progress: float = 0.0
+    rows_per_second: float = 0.0
+    mb_per_second: float = 0.0
+    eta_seconds: Optional[float] = None
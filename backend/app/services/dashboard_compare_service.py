@@ -1,41 +1,41 @@
 from __future__ import annotations
 
-import csv
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-
-from app.core.dataset import DATASET_PATH, ensure_data_dir
+from datetime import date
+from typing import Dict, Iterator, List, Tuple
+
+from app.core.dataset import ensure_data_dir
+from app.storage.dataset import (
+    MONEY_COLUMNS,
+    Filters,
+    dataset_exists,
+    dataset_manifest,
+    iter_dataset_batches,
+    query_cube,
+)
 from app.services.tax_params_service import get_rate
 
+# Base inteira (sem recorte de período)
+_ALL_PERIOD = (date(1900, 1, 1), date(2199, 12, 31))
+
+# Nomes das somas na série por período -> coluna do cache / total do manifesto
+_SERIES_COLUMNS = {"receita": "vprod", "icms": "vicms_icms", "pis": "vpis", "cofins": "vcofins"}
+_MANIFEST_TOTALS = {"receita": "receita_total", "icms": "icms_total", "pis": "pis_total", "cofins": "cofins_total"}
 
-def _to_float(v: str) -> float:
-    if v is None:
-        return 0.0
-    s = str(v).strip()
-    if not s:
-        return 0.0
-    # Regra simples (igual ao seu database_service): remove milhar "." e troca "," por "."
-    s = s.replace(".", "").replace(",", ".")
-    try:
-        return float(s)
-    except Exception:
-        return 0.0
-
-
-def _parse_date(v: str) -> Optional[datetime]:
-    if not v:
-        return None
-    s = str(v).strip()
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y%m%d"):
-        try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            continue
-    return None
 
+def _iter_money_frames() -> Iterator["pd.DataFrame"]:
+    """Blocos com __month + valores monetários da base: células do cubo mensal
+    (sem varrer linhas) ou, sem cubo, os lotes do cache."""
+    filters = Filters(periodo_inicio=_ALL_PERIOD[0], periodo_fim=_ALL_PERIOD[1])
+
+    plan = query_cube(filters)
+    if plan is None:
+        ranges = [filters]
+    else:
+        cells, ranges = plan
+        yield cells
 
-def _period_yyyy_mm(dt: datetime) -> str:
-    return f"{dt.year:04d}-{dt.month:02d}"
+    for f in ranges:
+        yield from iter_dataset_batches(f, ("__month",) + MONEY_COLUMNS)
 
 
 def _get_cbs_ibs_rates(ano: int, uf_ref: str) -> Tuple[float, float]:
@@ -55,7 +55,7 @@ def _get_cbs_ibs_rates(ano: int, uf_ref: str) -> Tuple[float, float]:
 def dashboard_compare(ano_reforma: int) -> Dict:
     ensure_data_dir()
 
-    if not DATASET_PATH.exists():
+    if not dataset_exists():
         return {
             "kpis": {
                 "ano_reforma": int(ano_reforma),
@@ -75,42 +75,32 @@ def dashboard_compare(ano_reforma: int) -> Dict:
             "timeseries": [],
         }
 
-    # Totais atuais (do dataset)
-    receita_total = 0.0
-    icms_atual = 0.0
-    pis_atual = 0.0
-    cofins_atual = 0.0
-
-    # Série por período
+    # Série por período (os totais atuais saem da soma da série)
     series: Dict[str, Dict[str, float]] = {}
 
-    with open(DATASET_PATH, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f, delimiter=";")
-        for row in reader:
-            receita = _to_float(row.get("vprod", "0"))
-            icms = _to_float(row.get("vicms_icms", "0"))
-            pis = _to_float(row.get("vpis", "0"))
-            cofins = _to_float(row.get("vcofins", "0"))
-
-            receita_total += receita
-            icms_atual += icms
-            pis_atual += pis
-            cofins_atual += cofins
-
-            dt = _parse_date(row.get("dhemi", "")) or None
-            period = _period_yyyy_mm(dt) if dt else "SEM_DATA"
-
-            if period not in series:
-                series[period] = {
-                    "receita": 0.0,
-                    "icms": 0.0,
-                    "pis": 0.0,
-                    "cofins": 0.0,
-                }
-            series[period]["receita"] += receita
-            series[period]["icms"] += icms
-            series[period]["pis"] += pis
-            series[period]["cofins"] += cofins
+    for frame in _iter_money_frames():
+        if frame.empty:
+            continue
+        cols = [c for c in MONEY_COLUMNS if c in frame.columns]
+        for period, m in frame.groupby("__month", observed=True, sort=False)[cols].sum().iterrows():
+            bucket = series.setdefault(str(period), {k: 0.0 for k in _SERIES_COLUMNS})
+            for key, col in _SERIES_COLUMNS.items():
+                bucket[key] += float(m.get(col, 0.0))
+
+    # linhas sem data válida não entram no cache: a diferença para os totais do
+    # manifesto (que cobre todas as linhas recebidas) vai para "SEM_DATA"
+    manifest = dataset_manifest() or {}
+    if (manifest.get("quality") or {}).get("date_invalid"):
+        totals = manifest.get("totals") or {}
+        series["SEM_DATA"] = {
+            key: float(totals.get(_MANIFEST_TOTALS[key], 0.0)) - sum(p[key] for p in series.values())
+            for key in _SERIES_COLUMNS
+        }
+
+    receita_total = sum(p["receita"] for p in series.values())
+    icms_atual = sum(p["icms"] for p in series.values())
+    pis_atual = sum(p["pis"] for p in series.values())
+    cofins_atual = sum(p["cofins"] for p in series.values())
 
     carga_atual_total = icms_atual + pis_atual + cofins_atual
 
@@ -2,12 +2,36 @@
 from __future__ import annotations
 
 import csv
+import gzip
 import io
+import itertools
+import os
+import zipfile
+import zlib
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from app.core.dataset import DATASET_PATH, ensure_data_dir
 from app.core.number import parse_money
+from app.core.settings import settings
+from app.services.dataset_warmup_service import is_warming_up, last_warmup_error
+from app.storage.dataset import (
+    NFE_KEY_COLUMNS,
+    ImportProgress,
+    dataset_cache_status,
+    dataset_exists,
+    dataset_manifest,
+    export_dataset_csv,
+    file_import_available,
+    import_dataset_chunks,
+    import_dataset_file,
+    invalidate_dataset_cache,
+)
+from app.storage.csv_ranges import iter_record_blocks, read_csv_block
+from app.storage.manifest import MANIFEST_MONEY_COLUMNS
 
 REQUIRED_COLUMNS = [
     "dhemi",
@@ -21,6 +45,10 @@ REQUIRED_COLUMNS = [
 
 OPTIONAL_COLUMNS = ["ncm", "produto", "cfop", "movimento"]
 
+# Identificação do item da NF-e (opcional): chave de deduplicação do import incremental
+KEY_COLUMNS = list(NFE_KEY_COLUMNS)
+KEY_COLUMN_ALIASES = {"chnfe": "chave_nfe", "chave": "chave_nfe", "nitem": "n_item"}
+
 
 def _sniff_delimiter(sample: str) -> str:
     """
@@ -35,11 +63,12 @@ def _sniff_delimiter(sample: str) -> str:
 
 def clear_dataset() -> None:
     """
-    Remove o arquivo de dataset importado.
+    Remove o dataset importado (CSV e cache colunar).
     """
     ensure_data_dir()
     if DATASET_PATH.exists():
         DATASET_PATH.unlink()
+    invalidate_dataset_cache(remove_files=True)
 
 
 def _normalize_header(h: str) -> str:
@@ -83,65 +112,408 @@ def validate_csv_columns(header: List[str]) -> Tuple[bool, List[str]]:
     return (len(missing) == 0, missing)
 
 
-def import_csv_bytes(file_bytes: bytes) -> int:
+def import_csv_bytes(file_bytes: bytes, append: bool = False) -> int:
+    """
+    Importa CSV já carregado em memória (ver import_csv_stream).
+    """
+    return import_csv_stream(io.BytesIO(file_bytes), append=append)["imported_rows"]
+
+
+# Uploads aceitos: CSV puro ou compactado (descompactado em streaming no import)
+UPLOAD_SUFFIXES = (".csv", ".csv.gz", ".gz", ".zip", ".csv.zst", ".zst", ".zstd")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZIP_MAGIC = b"PK\x03\x04"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def is_supported_upload(filename: str) -> bool:
+    return (filename or "").lower().endswith(UPLOAD_SUFFIXES)
+
+
+def _zip_csv_member(zf: zipfile.ZipFile) -> zipfile.ZipInfo:
+    members = [
+        m for m in zf.infolist()
+        if not m.is_dir() and not m.filename.startswith("__MACOSX/")
+    ]
+    csvs = [m for m in members if m.filename.lower().endswith(".csv")]
+    if len(csvs) == 1:
+        return csvs[0]
+    if not csvs and len(members) == 1:
+        return members[0]
+    raise ValueError("O .zip deve conter um único arquivo .csv.")
+
+
+@contextmanager
+def open_upload_stream(fileobj: BinaryIO) -> Iterator[BinaryIO]:
+    """Stream binário do CSV, descompactando gzip/zip/zstd sob demanda.
+
+    O formato vem dos primeiros bytes (não do nome do arquivo). A descompressão é
+    incremental: nem o arquivo descompactado inteiro nem uma cópia dele vão para a
+    memória ou o disco. `fileobj` precisa de seek (upload em spool/arquivo) e não é
+    fechado aqui.
+    """
+    head = fileobj.read(4)
+    fileobj.seek(0)
+
+    if head.startswith(_GZIP_MAGIC):
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as gz:
+            yield gz
+    elif head.startswith(_ZIP_MAGIC):
+        with zipfile.ZipFile(fileobj) as zf:
+            with zf.open(_zip_csv_member(zf)) as member:
+                yield member
+    elif head.startswith(_ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Upload .zst requer o pacote 'zstandard' instalado no servidor.")
+        reader = zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+        with io.BufferedReader(reader) as stream:
+            try:
+                yield stream
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Arquivo compactado inválido ou truncado: {e}")
+    else:
+        yield fileobj
+
+
+def _canonical_frame(chunk: "pd.DataFrame") -> "pd.DataFrame":
+    """Bloco do CSV enviado no layout canônico (header normalizado, valores com strip).
+
+    chave_nfe/n_item seguem junto quando o arquivo traz a chave de acesso. As
+    linhas malformadas do bloco (attrs) seguem no resultado.
+    """
+    import pandas as pd
+
+    names = [_normalize_header(c) for c in chunk.columns]
+    chunk.columns = [KEY_COLUMN_ALIASES.get(c, c) for c in names]
+    chunk = chunk.loc[:, ~chunk.columns.duplicated(keep="last")]
+
+    output_fields = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    if all(c in chunk.columns for c in KEY_COLUMNS):
+        output_fields = output_fields + KEY_COLUMNS
+
+    out = pd.DataFrame(index=chunk.index)
+    for col in output_fields:
+        out[col] = chunk[col].str.strip() if col in chunk.columns else ""
+    out.attrs = dict(chunk.attrs)
+    return out
+
+
+def _canonical_chunks(lines: Iterable[str], delimiter: str) -> Iterator["pd.DataFrame"]:
+    """Blocos do CSV enviado (linhas de texto, com o header) no layout canônico.
+
+    Linhas com campos a mais não entram na base: vão para attrs[BAD_LINES_ATTR] de
+    cada bloco com o nº da linha no arquivo (header = linha 1), para o manifesto
+    contá-las no relatório de qualidade e na resposta do import.
+    """
+    it = iter(lines)
+    line_no = 0
+    header: Optional[List[str]] = None
+    for line in it:
+        line_no += 1
+        if line.strip():
+            header = next(csv.reader([line], delimiter=delimiter), [])
+            break
+    if header is None:
+        return
+
+    for block, count in iter_record_blocks(it, int(settings.dataset_chunk_rows)):
+        chunk = read_csv_block(block, delimiter, header, line_no + 1)
+        line_no += count
+        yield _canonical_frame(chunk)
+
+
+def _upload_file_path(fileobj: BinaryIO) -> Optional[str]:
+    """Caminho do upload quando ele está num arquivo nomeado (ex.: spool do job)."""
+    name = getattr(fileobj, "name", None)
+    return name if isinstance(name, str) and os.path.isfile(name) else None
+
+
+def _data_start(fileobj: BinaryIO) -> Tuple[int, int]:
+    """(byte, nº da linha) onde começam os dados: logo após a 1ª linha não vazia (header)."""
+    fileobj.seek(0)
+    line_no = 0
+    while True:
+        line = fileobj.readline()
+        line_no += 1
+        if not line or line.strip():
+            return fileobj.tell(), line_no + 1
+
+
+def import_csv_stream(
+    fileobj: BinaryIO,
+    append: bool = False,
+    progress: Optional[ImportProgress] = None,
+) -> Dict[str, int]:
     """
     Importa CSV (qualquer delimitador detectado), valida colunas,
-    normaliza header e regrava dataset interno SEMPRE em ';'
-    (forma canônica do projeto).
+    normaliza header e grava direto no cache colunar do dataset
+    (partições + manifesto + índices), sem regravar o CSV canônico.
+
+    append=True acrescenta à base atual (ex.: fechamento mensal), ignorando as
+    linhas já importadas: chave chave_nfe + n_item quando o CSV traz essas
+    colunas, senão o conteúdo da linha.
+
+    `progress(linhas, rejeitadas)` é chamado a cada bloco (jobs em background).
+
+    Streaming: lê o arquivo binário em blocos e decodifica de forma incremental;
+    a memória não depende do tamanho do arquivo. Aceita o CSV compactado em
+    gzip, zip ou zstd (ver open_upload_stream). Síncrono (bloqueante): rotas
+    async devem chamar numa worker thread.
+
+    A base nova só é publicada no fim: um import inválido preserva a anterior.
+
+    CSV puro já em arquivo (upload em spool dos jobs) no import completo: o parse
+    roda em paralelo por intervalos de bytes (import_dataset_file), como o build
+    do cache; compactados e append seguem em streaming, bloco a bloco.
+
+    Linhas com campos a mais são puladas e contadas (bad_lines; amostra no
+    relatório de qualidade).
+
+    Retorna {"imported_rows": linhas gravadas, "duplicate_rows": linhas já
+    existentes (ignoradas), "rejected_rows": linhas sem data válida (fora da
+    base), "bad_lines": linhas malformadas}.
     """
     ensure_data_dir()
 
-    text = file_bytes.decode("utf-8", errors="replace")
-    sample = text[:50_000]
-    delimiter = _sniff_delimiter(sample)
+    try:
+        with open_upload_stream(fileobj) as stream:
+            text = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+            try:
+                # amostra até o fim de uma linha: o parse segue linha a linha
+                sample = text.read(50_000)
+                if sample and not sample.endswith(("\n", "\r")):
+                    sample += text.readline()
+                delimiter = _sniff_delimiter(sample)
+
+                header = next((r for r in csv.reader(io.StringIO(sample), delimiter=delimiter) if r), None)
+                if header is None:
+                    raise ValueError("CSV sem cabeçalho (header).")
+
+                # valida colunas obrigatórias (normalizadas)
+                ok, missing = validate_csv_columns(header)
+                if not ok:
+                    raise ValueError(
+                        f"CSV inválido. Faltam colunas obrigatórias: {', '.join(missing)}"
+                    )
+
+                if not append and stream is fileobj and _upload_file_path(fileobj) and file_import_available():
+                    data_start, first_line = _data_start(fileobj)
+                    result = import_dataset_file(
+                        fileobj, data_start, header, delimiter, _canonical_frame,
+                        first_line=first_line, progress=progress,
+                    )
+                else:
+                    result = import_dataset_chunks(
+                        _canonical_chunks(itertools.chain(io.StringIO(sample, newline=""), text), delimiter),
+                        append=append,
+                        progress=progress,
+                    )
+            finally:
+                # não fecha o arquivo do chamador (ex.: UploadFile)
+                text.detach()
+    except (gzip.BadGzipFile, zipfile.BadZipFile, zlib.error, EOFError) as e:
+        raise ValueError(f"Arquivo compactado inválido ou truncado: {e}")
+
+    return {
+        "imported_rows": int(result["imported"]),
+        "duplicate_rows": int(result["duplicates"]),
+        "rejected_rows": int(result["rejected"]),
+        "bad_lines": int(result["bad_lines"]),
+    }
 
-    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
-    if reader.fieldnames is None:
-        raise ValueError("CSV sem cabeçalho (header).")
 
-    # valida colunas obrigatórias (normalizadas)
-    header_norm = [_normalize_header(h) for h in reader.fieldnames]
-    ok, missing = validate_csv_columns(header_norm)
-    if not ok:
-        raise ValueError(
-            f"CSV inválido. Faltam colunas obrigatórias: {', '.join(missing)}"
-        )
+# ------------------------
+# NF-e XML (procNFe) em lote
+# ------------------------
 
-    # mapeia nome original -> normalizado
-    field_map: Dict[str, str] = {name: _normalize_header(name) for name in reader.fieldnames}
-    output_fields = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+# XMLs por tarefa do pool de parse (amortiza o IPC entre processos)
+_XML_BATCH_FILES = 256
 
-    imported = 0
-    with open(DATASET_PATH, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=output_fields, delimiter=";")
-        writer.writeheader()
 
-        for row in reader:
-            normalized_row: Dict[str, str] = {}
-            for k, v in row.items():
-                nk = field_map.get(k, _normalize_header(k))
-                normalized_row[nk] = (v or "").strip()
+def _xml_parse_workers() -> int:
+    return int(settings.dataset_parse_workers) or (os.cpu_count() or 1)
+
+
+def _iter_zip_xmls(fileobj: BinaryIO) -> Iterator[bytes]:
+    with zipfile.ZipFile(fileobj) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".xml"):
+                continue
+            yield zf.read(info)
 
-            out = {col: normalized_row.get(col, "") for col in output_fields}
-            writer.writerow(out)
-            imported += 1
 
-    return imported
+def _iter_dir_xmls(path: Path) -> Iterator[bytes]:
+    for p in sorted(path.rglob("*")):
+        if p.is_file() and p.suffix.lower() == ".xml":
+            yield p.read_bytes()
+
+
+def _parse_xml_batches(batches: Iterator[List[bytes]]) -> Iterator[Tuple[Dict[str, List[str]], int]]:
+    """Parse dos lotes de XML, na ordem, em processos (spawn) quando há mais de um lote.
+
+    No máximo 2 lotes por processo em voo: a leitura do zip não corre à frente do
+    parse e os resultados não se acumulam em memória.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    from app.core.nfe_xml import parse_nfe_xml_batch
+
+    workers = _xml_parse_workers()
+    head = list(itertools.islice(batches, 2))
+    if len(head) < 2 or workers <= 1:
+        # poucos arquivos: não compensa subir processos
+        for batch in itertools.chain(head, batches):
+            yield parse_nfe_xml_batch(batch)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        window = deque()
+        for batch in itertools.chain(head, batches):
+            window.append(pool.submit(parse_nfe_xml_batch, batch))
+            if len(window) >= 2 * workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def _nfe_xml_chunks(blobs: Iterable[bytes], stats: Dict[str, int]) -> Iterator["pd.DataFrame"]:
+    """XMLs -> blocos crus no layout canônico (com chave_nfe/n_item), na ordem dos arquivos.
+
+    Blocos de até settings.dataset_chunk_rows linhas (mesmo tamanho do import CSV).
+    """
+    import pandas as pd
+
+    from app.core.nfe_xml import NFE_ROW_COLUMNS
+
+    def batches() -> Iterator[List[bytes]]:
+        it = iter(blobs)
+        while True:
+            batch = list(itertools.islice(it, _XML_BATCH_FILES))
+            if not batch:
+                return
+            stats["files"] += len(batch)
+            yield batch
+
+    chunk_rows = int(settings.dataset_chunk_rows)
+    pending: Dict[str, List[str]] = {col: [] for col in NFE_ROW_COLUMNS}
+    total = 0
+
+    for columns, skipped in _parse_xml_batches(batches()):
+        stats["skipped_files"] += skipped
+        for col in NFE_ROW_COLUMNS:
+            pending[col].extend(columns[col])
+
+        if len(pending["dhemi"]) >= chunk_rows:
+            total += len(pending["dhemi"])
+            yield pd.DataFrame(pending, columns=list(NFE_ROW_COLUMNS))
+            pending = {col: [] for col in NFE_ROW_COLUMNS}
+
+    if pending["dhemi"]:
+        total += len(pending["dhemi"])
+        yield pd.DataFrame(pending, columns=list(NFE_ROW_COLUMNS))
+
+    if total == 0:
+        # não substitui a base por uma vazia (ex.: zip só com eventos/canceladas)
+        raise ValueError("Nenhum item de NF-e autorizada encontrado nos XMLs.")
+
+
+def _import_nfe_xml(
+    blobs: Iterable[bytes],
+    append: bool,
+    progress: Optional[ImportProgress],
+) -> Dict[str, int]:
+    stats = {"files": 0, "skipped_files": 0}
+    try:
+        result = import_dataset_chunks(_nfe_xml_chunks(blobs, stats), append=append, progress=progress)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Arquivo compactado inválido ou truncado: {e}")
+
+    return {
+        "imported_rows": int(result["imported"]),
+        "duplicate_rows": int(result["duplicates"]),
+        "rejected_rows": int(result["rejected"]),
+        "files": stats["files"],
+        "skipped_files": stats["skipped_files"],
+    }
+
+
+def import_nfe_xml_stream(
+    fileobj: BinaryIO,
+    append: bool = False,
+    progress: Optional[ImportProgress] = None,
+) -> Dict[str, int]:
+    """
+    Importa NF-e em XML (procNFe) de um .zip (ou um único .xml) direto para o cache
+    colunar, com as mesmas colunas do CSV canônico.
+
+    - XMLs lidos do zip em sequência e parseados em lote por um pool de processos
+      (iterparse, memória constante por arquivo)
+    - cada item (det) vira uma linha; chave de acesso + nItem identificam o item,
+      então append=True ignora notas já importadas
+    - notas não autorizadas e XMLs que não são NF-e são ignorados (skipped_files)
+
+    Síncrono (bloqueante): rotas async devem chamar numa worker thread.
+    """
+    ensure_data_dir()
+
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    blobs = _iter_zip_xmls(fileobj) if head.startswith(_ZIP_MAGIC) else iter([fileobj.read()])
+    return _import_nfe_xml(blobs, append, progress)
+
+
+def import_nfe_xml_dir(
+    path: Path,
+    append: bool = False,
+    progress: Optional[ImportProgress] = None,
+) -> Dict[str, int]:
+    """Importa todos os .xml de um diretório (recursivo), como import_nfe_xml_stream."""
+    ensure_data_dir()
+
+    path = Path(path)
+    if not path.is_dir():
+        raise ValueError(f"Diretório não encontrado: {path}")
+    return _import_nfe_xml(_iter_dir_xmls(path), append, progress)
 
 
 def get_status() -> dict:
     """
     Retorna status do dataset.
+
+    `indexing` indica cache em (re)construção: a UI mostra "indexando" em vez
+    de esperar a primeira consulta pagar o build.
+
+    Com o cache pronto, `rows` vem do manifesto (O(1)); durante o build, conta as linhas.
     """
     ensure_data_dir()
 
-    if not DATASET_PATH.exists():
+    if not dataset_exists():
         return {"exists": False, "path": str(DATASET_PATH), "rows": 0}
 
-    with open(DATASET_PATH, "r", encoding="utf-8", newline="") as f:
-        rows = max(sum(1 for _ in f) - 1, 0)
+    manifest = dataset_manifest()
+    if manifest is not None:
+        rows = int(manifest["rows"])
+    elif DATASET_PATH.exists():
+        # cache em (re)construção a partir do CSV: conta as linhas
+        with open(DATASET_PATH, "r", encoding="utf-8", newline="") as f:
+            rows = max(sum(1 for _ in f) - 1, 0)
+    else:
+        rows = 0
 
-    return {"exists": True, "path": str(DATASET_PATH), "rows": rows}
+    cache = dataset_cache_status()
+    return {
+        "exists": True,
+        "path": str(DATASET_PATH),
+        "rows": rows,
+        "cache_ready": cache["ready"],
+        "indexing": cache["indexing"] or (not cache["ready"] and is_warming_up()),
+        "cache_error": None if cache["ready"] else last_warmup_error(),
+    }
 
 
 def get_summary() -> dict:
@@ -150,10 +522,12 @@ def get_summary() -> dict:
       - período min/max (dhemi)
       - ufs origem/destino
       - somatórios: receita (vprod) e tributos
+
+    Servido do manifesto do cache quando pronto; senão, varre o CSV.
     """
     ensure_data_dir()
 
-    if not DATASET_PATH.exists():
+    if not dataset_exists():
         return {
             "exists": False,
             "path": str(DATASET_PATH),
@@ -168,6 +542,10 @@ def get_summary() -> dict:
             "cofins_total": 0.0,
         }
 
+    manifest = dataset_manifest()
+    if manifest is not None:
+        return summary_from_manifest(manifest)
+
     min_dt: Optional[datetime] = None
     max_dt: Optional[datetime] = None
     ufs_o = set()
@@ -177,7 +555,8 @@ def get_summary() -> dict:
     pis = 0.0
     cofins = 0.0
 
-    with open(DATASET_PATH, "r", encoding="utf-8", newline="") as f:
+    csv_path = DATASET_PATH if DATASET_PATH.exists() else export_dataset_csv()
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f, delimiter=";")
         rows = 0
 
@@ -217,6 +596,57 @@ def get_summary() -> dict:
     }
 
 
+def summary_from_manifest(manifest: dict) -> dict:
+    """Resumo no formato de get_summary a partir do manifesto do cache."""
+    totals = manifest.get("totals") or {}
+    out = {
+        "exists": True,
+        "path": str(DATASET_PATH),
+        "rows": int(manifest.get("rows") or 0),
+        "min_date": manifest.get("min_date"),
+        "max_date": manifest.get("max_date"),
+        "ufs_origem": list(manifest.get("ufs_origem") or []),
+        "ufs_destino": list(manifest.get("ufs_destino") or []),
+        "null_counts": dict(manifest.get("nulls") or {}),
+    }
+    for key in MANIFEST_MONEY_COLUMNS:
+        out[key] = float(totals.get(key, 0.0))
+    return out
+
+
+def get_quality() -> dict:
+    """
+    Relatório de qualidade do último import, direto do manifesto (sem reler a base):
+      - linhas descartadas por data vazia/inválida (não entram nas consultas)
+      - linhas malformadas (campos a mais) puladas no parse
+      - valores monetários inválidos por coluna (entram como 0)
+      - colunas obrigatórias vazias
+      - amostra limitada das linhas problemáticas
+    """
+    ensure_data_dir()
+
+    manifest = dataset_manifest(wait=True) if dataset_exists() else None
+    if manifest is None:
+        return {"exists": False, "rows": 0, "valid_rows": 0}
+
+    quality = manifest.get("quality") or {}
+    nulls = manifest.get("nulls") or {}
+    rows = int(manifest.get("rows") or 0)
+    valid_rows = int(manifest.get("valid_rows", rows) or 0)
+
+    return {
+        "exists": True,
+        "rows": rows,
+        "valid_rows": valid_rows,
+        "rejected_rows": rows - valid_rows,
+        "date_invalid": int(quality.get("date_invalid") or 0),
+        "bad_lines": int(quality.get("bad_lines") or 0),
+        "money_invalid": dict(quality.get("money_invalid") or {}),
+        "missing_required": {c: int(nulls.get(c, 0)) for c in REQUIRED_COLUMNS if nulls.get(c)},
+        "samples": list(quality.get("samples") or []),
+    }
+
+
 def get_template_csv_bytes() -> bytes:
     """
     Template canônico do projeto (delimitador ';').
@@ -7,6 +7,9 @@ from typing import Optional, Dict, Any, Set
 
 import csv
 
+from app.core.dataset import DATASET_PATH
+from app.storage.dataset import dataset_exists, dataset_manifest
+
 
 @dataclass
 class DatasetSummary:
@@ -34,6 +37,26 @@ def _to_float(v: str) -> float:
 
 
 def build_summary(csv_path: Path) -> DatasetSummary:
+    # dataset canônico: resumo pronto no manifesto do cache (sem varrer o CSV).
+    # O import direto no cache não mantém o CSV: sem ele, espera o build do manifesto.
+    canonical = csv_path.resolve() == DATASET_PATH.resolve()
+    manifest = dataset_manifest(wait=not csv_path.exists()) if canonical and dataset_exists() else None
+    if manifest is not None:
+        totals = manifest.get("totals") or {}
+        return DatasetSummary(
+            exists=True,
+            path=str(csv_path),
+            rows=int(manifest.get("rows") or 0),
+            min_date=manifest.get("min_date"),
+            max_date=manifest.get("max_date"),
+            ufs_origem=list(manifest.get("ufs_origem") or []),
+            ufs_destino=list(manifest.get("ufs_destino") or []),
+            receita_total=round(float(totals.get("receita_total", 0.0)), 2),
+            icms_total=round(float(totals.get("icms_total", 0.0)), 2),
+            pis_total=round(float(totals.get("pis_total", 0.0)), 2),
+            cofins_total=round(float(totals.get("cofins_total", 0.0)), 2),
+        )
+
     if not csv_path.exists():
         return DatasetSummary(
             exists=False,
@@ -0,0 +1,68 @@
+# backend/app/services/dataset_warmup_service.py
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Optional
+
+from app.core.settings import settings
+from app.storage.dataset import warm_dataset_cache
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_THREAD: Optional[threading.Thread] = None
+_PENDING = False
+_LAST_ERROR: Optional[str] = None
+
+
+def schedule_warmup() -> None:
+    """Agenda a reconstrução/pré-carga do cache do dataset numa thread em background.
+
+    - no máximo uma thread por processo; pedidos durante a execução geram uma
+      nova rodada ao final (ex.: dois imports seguidos)
+    - entre processos, o lock do build garante um único parse do CSV
+    """
+    global _THREAD, _PENDING
+
+    if not settings.dataset_warmup:
+        return
+
+    with _LOCK:
+        if _THREAD is not None:
+            _PENDING = True
+            return
+        _THREAD = threading.Thread(target=_run, name="dataset-warmup", daemon=True)
+        _THREAD.start()
+
+
+def is_warming_up() -> bool:
+    with _LOCK:
+        return _THREAD is not None
+
+
+def last_warmup_error() -> Optional[str]:
+    with _LOCK:
+        return _LAST_ERROR
+
+
+def _run() -> None:
+    global _THREAD, _PENDING, _LAST_ERROR
+
+    while True:
+        with _LOCK:
+            _PENDING = False
+
+        error: Optional[str] = None
+        try:
+            warm_dataset_cache()
+        except Exception as e:
+            # não derruba o app; a próxima consulta tenta o build de novo
+            logger.exception("Falha no warm-up do cache do dataset")
+            error = str(e)
+
+        with _LOCK:
+            _LAST_ERROR = error
+            if not _PENDING:
+                _THREAD = None
+                return
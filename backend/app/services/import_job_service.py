@@ -0,0 +1,178 @@
+# backend/app/services/import_job_service.py
+from __future__ import annotations
+
+import logging
+import queue
+import shutil
+import threading
+import time
+from typing import BinaryIO, Optional
+
+from app.services.database_service import import_csv_stream, import_nfe_xml_stream
+from app.services.dataset_warmup_service import schedule_warmup
+from app.storage.file_lock import FileLock
+from app.storage.import_jobs import (
+    FINISHED_STATUSES,
+    JOBS_DIR,
+    create_job,
+    get_job,
+    job_lock_path,
+    list_jobs,
+    new_job_id,
+    update_job,
+    upload_path,
+)
+
+logger = logging.getLogger(__name__)
+
+# tipo do job -> import a partir do upload em spool (arquivo binário com seek)
+_IMPORTERS = {
+    "csv": import_csv_stream,
+    "nfe_xml": import_nfe_xml_stream,
+}
+
+_QUEUE: "queue.Queue[str]" = queue.Queue()
+_LOCK = threading.Lock()
+_WORKER: Optional[threading.Thread] = None
+
+
+def submit_import_job(fileobj: BinaryIO, filename: str, append: bool = False, kind: str = "csv") -> dict:
+    """Copia o upload para o spool do job e enfileira o import em background.
+
+    O arquivo temporário do multipart some ao fim do request; o spool em
+    data/import_jobs/<id>.upload permite processar depois (e retomar após restart).
+    `kind`: "csv" (import_csv_stream) ou "nfe_xml" (import_nfe_xml_stream).
+    Síncrono (I/O de disco): rotas async devem chamar numa worker thread.
+    """
+    if kind not in _IMPORTERS:
+        raise ValueError(f"Tipo de import inválido: {kind}")
+
+    job_id = new_job_id()
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+
+    spool = upload_path(job_id)
+    with open(spool, "wb") as out:
+        shutil.copyfileobj(fileobj, out, 1024 * 1024)
+
+    job = create_job(job_id, kind=kind, filename=filename, append=bool(append), bytes_total=spool.stat().st_size)
+    _enqueue(job_id)
+    return job
+
+
+def resume_import_jobs() -> None:
+    """Reenfileira jobs não finalizados (ex.: servidor reiniciado no meio do import).
+
+    Refazer é seguro: a base só é publicada no fim do import, e o append ignora as
+    linhas já gravadas. Entre processos, o lock do job evita execução dupla.
+    """
+    for job in list_jobs(("queued", "running")):
+        _enqueue(job["id"])
+
+
+def describe_job(job: dict) -> dict:
+    """Job + métricas derivadas: progresso, vazão e ETA (pelos bytes lidos do upload)."""
+    out = dict(job)
+    started = job.get("started_at")
+    end = job.get("finished_at") or time.time()
+    elapsed = max(0.0, end - started) if started else 0.0
+
+    total = int(job.get("bytes_total") or 0)
+    read = int(job.get("bytes_read") or 0)
+    out["elapsed_seconds"] = elapsed
+    out["progress"] = 1.0 if job.get("status") == "done" else (min(1.0, read / total) if total else 0.0)
+    out["rows_per_second"] = job.get("rows_processed", 0) / elapsed if elapsed > 0 else 0.0
+    out["mb_per_second"] = read / 1024 / 1024 / elapsed if elapsed > 0 else 0.0
+
+    eta = None
+    if job.get("status") == "running" and read > 0 and elapsed > 0:
+        eta = max(0.0, (total - read) / (read / elapsed))
+    out["eta_seconds"] = eta
+    return out
+
+
+def _enqueue(job_id: str) -> None:
+    global _WORKER
+
+    _QUEUE.put(job_id)
+    with _LOCK:
+        if _WORKER is None or not _WORKER.is_alive():
+            _WORKER = threading.Thread(target=_work, name="import-jobs", daemon=True)
+            _WORKER.start()
+
+
+def _work() -> None:
+    # um job por vez: o import já é serializado pelo lock do build
+    while True:
+        job_id = _QUEUE.get()
+        try:
+            _run_job(job_id)
+        except Exception:
+            logger.exception("Falha no job de import %s", job_id)
+        finally:
+            _QUEUE.task_done()
+
+
+def _run_job(job_id: str) -> None:
+    lock = FileLock(job_lock_path(job_id))
+    if not lock.acquire(blocking=False):
+        return  # outro processo está executando este job
+
+    try:
+        # relê com o lock: outro processo pode ter concluído o job
+        job = get_job(job_id)
+        if job is None or job.get("status") in FINISHED_STATUSES:
+            return
+
+        spool = upload_path(job_id)
+        if not spool.exists():
+            update_job(job_id, status="failed", finished_at=time.time(), error="Arquivo do upload não encontrado")
+            return
+
+        update_job(
+            job_id,
+            status="running",
+            started_at=time.time(),
+            bytes_read=0,
+            rows_processed=0,
+            rejected_rows=0,
+            error=None,
+        )
+
+        counters = {"rows": 0, "rejected": 0}
+        try:
+            with open(spool, "rb") as f:
+
+                def progress(rows: int, rejected: int) -> None:
+                    counters["rows"] += rows
+                    counters["rejected"] += rejected
+                    update_job(
+                        job_id,
+                        bytes_read=f.tell(),
+                        rows_processed=counters["rows"],
+                        rejected_rows=counters["rejected"],
+                    )
+
+                importer = _IMPORTERS[job.get("kind") or "csv"]
+                result = importer(f, append=bool(job.get("append")), progress=progress)
+        except ValueError as e:
+            update_job(job_id, status="failed", finished_at=time.time(), error=str(e))
+        except Exception:
+            logger.exception("Falha no job de import %s", job_id)
+            update_job(job_id, status="failed", finished_at=time.time(), error="Falha interna no import")
+        else:
+            update_job(
+                job_id,
+                status="done",
+                finished_at=time.time(),
+                bytes_read=int(job.get("bytes_total") or 0),
+                **result,
+            )
+            # reconstrói o cache em background (como o import síncrono)
+            schedule_warmup()
+
+        try:
+            spool.unlink()
+        except FileNotFoundError:
+            pass
+    finally:
+        lock.release()
@@ -4,6 +4,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, Iterable, List, Tuple
 
+from app.core.aggregation import top_k
 from app.services.simulator_engine.credit_events import CreditEventV2
 
 
@@ -40,8 +41,7 @@ def top_by(
         val = float(getattr(e, metric, 0.0) or 0.0)
         buckets[key] = buckets.get(key, 0.0) + val
 
-    items = sorted(buckets.items(), key=lambda kv: kv[1], reverse=True)
-    items = items[: max(0, int(limit))]
+    items = top_k(buckets.items(), limit)
     return [{"key": k, "value": float(v)} for k, v in items]
 
 
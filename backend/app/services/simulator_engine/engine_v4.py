@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import json
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 from app.core.number import parse_money
 from app.services.classifier_service import (
@@ -55,6 +55,81 @@ def _up(v: Optional[str]) -> Optional[str]:
     return s or None
 
 
+# ------------------------
+# Entrada colunar (DataFrame do dataset.py)
+# ------------------------
+
+# Tudo o que o loop do engine lê de uma linha (além dos valores monetários).
+# Linhas com as mesmas chaves produzem os mesmos movimento/finalidade/regra/mês,
+# então podem ser somadas antes do loop sem alterar nenhum total.
+FRAME_GROUP_COLUMNS = ("movimento", "produto", "cfop", "ncm", "uf", "uf_dest", "__month")
+FRAME_MONEY_COLUMNS = ("vprod", "vicms_icms", "vpis", "vcofins")
+
+
+def _group_frame(frame: "pd.DataFrame", keys: List[str], money: List[str]) -> "pd.DataFrame":
+    work = frame[keys + money]
+    for k in keys:
+        if str(work[k].dtype) != "category":
+            work = work.assign(**{k: work[k].fillna("").astype(str)})
+
+    grouped = work.groupby(keys, observed=True, sort=False, dropna=False)
+    agg = grouped[money].sum()
+    agg["__rows"] = grouped.size()
+    return agg.reset_index()
+
+
+def rows_from_frames(frames: Iterable["pd.DataFrame"]) -> List[dict]:
+    """Agrega o recorte colunar em "itens agrupados" consumíveis pelo loop do engine.
+
+    Cada item traz as chaves de FRAME_GROUP_COLUMNS, as somas monetárias e
+    `__rows` (quantidade de linhas originais). `dhemi` é o 1º dia do mês, que é
+    tudo o que o engine usa da data (séries, apropriação e eventos são mensais).
+
+    Aceita o recorte em lotes (iter_dataset_batches): cada lote é agrupado ao
+    chegar e os parciais são reagrupados no fim, sem materializar o recorte.
+    """
+    import pandas as pd
+
+    keys: List[str] = []
+    money: List[str] = []
+    parts: List["pd.DataFrame"] = []
+    for frame in frames:
+        if frame.empty:
+            continue
+        if not parts:
+            keys = [k for k in FRAME_GROUP_COLUMNS if k in frame.columns]
+            money = [k for k in FRAME_MONEY_COLUMNS if k in frame.columns]
+            if not keys:
+                return []
+        parts.append(_group_frame(frame, keys, money))
+
+    if not parts:
+        return []
+
+    if len(parts) == 1:
+        agg = parts[0]
+    else:
+        combined = pd.concat(parts, ignore_index=True)
+        for k in keys:
+            combined[k] = combined[k].astype(object)
+        agg = combined.groupby(keys, sort=False, dropna=False)[money + ["__rows"]].sum().reset_index()
+
+    out = agg.to_dict("records")
+    for r in out:
+        for k in keys:
+            if r[k] is None or r[k] != r[k]:  # NaN de category
+                r[k] = ""
+        r["__rows"] = int(r["__rows"])
+        if r.get("__month"):
+            r["dhemi"] = f"{r['__month']}-01"
+    return out
+
+
+def rows_from_frame(frame: "pd.DataFrame") -> List[dict]:
+    """Atalho de rows_from_frames para um único recorte."""
+    return rows_from_frames([frame])
+
+
 # ------------------------
 # Rules JSON
 # ------------------------
@@ -88,8 +163,11 @@ def parse_rules_json(raw: Optional[str]) -> List[Rule]:
 # Engine v4 (v5.2: credit ledger nível 2)
 # ------------------------
 
-def run_engine_v4(*, rows: List[dict], f: RunFilters, c: Scenario) -> EngineResult:
-    """Executa a simulação v4 em cima de `rows` (list[dict]) já filtradas pelo dataset.py.
+def run_engine_v4(*, rows: Union[Iterable[dict], "pd.DataFrame"], f: RunFilters, c: Scenario) -> EngineResult:
+    """Executa a simulação v4 em cima de `rows` já filtradas pelo dataset.py.
+
+    `rows` pode ser list[dict] (query_dataset) ou o DataFrame de
+    query_dataset_frame; neste caso as linhas são agregadas via rows_from_frame.
 
     Otimizações incluídas:
     - Usa o campo `movimento` do CSV como fonte de verdade (fallback para classificador).
@@ -107,6 +185,9 @@ def run_engine_v4(*, rows: List[dict], f: RunFilters, c: Scenario) -> EngineResu
     Mantém o contrato do Simulator v4; campos novos são adicionados no bloco credit_ledger.
     """
 
+    if hasattr(rows, "columns"):
+        rows = rows_from_frame(rows)
+
     rules = parse_rules_json(f.regras_json)
 
     mov_filter = _up(f.movimento)
@@ -172,7 +253,7 @@ def run_engine_v4(*, rows: List[dict], f: RunFilters, c: Scenario) -> EngineResu
         if fin_filter and fin_eff != fin_filter:
             continue
 
-        rows_filtradas += 1
+        rows_filtradas += int(r.get("__rows", 1))
 
         vprod = _num(r.get("vprod"))
         icms_i = _num(r.get("vicms_icms"))
@@ -0,0 +1,183 @@
+# backend/app/storage/csv_ranges.py
+from __future__ import annotations
+
+import io
+import itertools
+import re
+import warnings
+from pathlib import Path
+from typing import AnyStr, BinaryIO, Iterable, Iterator, List, Sequence, Tuple
+
+_BLOCK = 16 * 1024 * 1024
+
+# Linhas malformadas (campos a mais) puladas pelo parser, guardadas no DataFrame
+# do bloco: [(nº da linha no arquivo, texto da linha)]
+BAD_LINES_ATTR = "bad_lines"
+
+# Mensagem do ParserWarning do pandas para on_bad_lines="warn"
+_SKIPPED_LINE = re.compile(r"Skipping line (\d+)")
+
+
+def _count_quotes(f: BinaryIO, start: int, end: int) -> int:
+    f.seek(start)
+    n = 0
+    remaining = end - start
+    while remaining > 0:
+        block = f.read(min(_BLOCK, remaining))
+        if not block:
+            break
+        n += block.count(b'"')
+        remaining -= len(block)
+    return n
+
+
+def split_line_ranges(path: Path, parts: int, start: int = 0) -> List[Tuple[int, int]]:
+    """Divide o arquivo em até `parts` intervalos de bytes [ini, fim) alinhados em fim de registro.
+
+    Um corte só vale numa quebra de linha fora de aspas: campos entre aspas podem
+    conter '\\n' (o csv do Python grava assim). A paridade das aspas até cada corte
+    é obtida contando '"' em blocos (bytes.count, uma passada sequencial barata).
+
+    `start` pula o cabeçalho. Intervalos vazios são omitidos.
+    """
+    size = path.stat().st_size
+    if parts <= 1 or size <= start:
+        return [(start, size)] if size > start else []
+
+    targets = [start + (size - start) * i // parts for i in range(1, parts)]
+    bounds = [start]
+    quotes = 0
+    pos = start
+
+    with open(path, "rb") as f:
+        for target in targets:
+            if target <= pos:
+                continue
+
+            quotes += _count_quotes(f, pos, target)
+            pos = target
+            f.seek(pos)
+
+            # avança até uma quebra de linha com número par de aspas acumuladas
+            while True:
+                line = f.readline()
+                if not line:
+                    pos = size
+                    break
+                quotes += line.count(b'"')
+                pos += len(line)
+                if quotes % 2 == 0:
+                    break
+
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _quotes(line: AnyStr) -> int:
+    return line.count(b'"' if isinstance(line, bytes) else '"')
+
+
+def range_lines(f: BinaryIO, start: int, end: int) -> Iterator[bytes]:
+    """Linhas (bytes) do intervalo [start, end) de `f`, alinhado em fim de linha."""
+    f.seek(start)
+    pos = start
+    while pos < end:
+        line = f.readline()
+        if not line:
+            return
+        pos += len(line)
+        yield line
+
+
+def _logical_lines(lines: Sequence[str]) -> List[Tuple[int, str]]:
+    """Junta linhas físicas em registros: quebra de linha entre aspas não encerra o registro.
+
+    Devolve (posição da 1ª linha física do registro, 0-based; texto do registro).
+    """
+    out: List[Tuple[int, str]] = []
+    pending: List[str] = []
+    start = quotes = 0
+    for pos, line in enumerate(lines):
+        if not pending:
+            start = pos
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            out.append((start, "".join(pending)))
+            pending = []
+    if pending:
+        out.append((start, "".join(pending)))
+    return out
+
+
+def iter_record_blocks(lines: Iterable[AnyStr], rows: int) -> Iterator[Tuple[AnyStr, int]]:
+    """Agrupa as linhas de um CSV (texto ou bytes) em blocos de ~`rows` registros completos.
+
+    Devolve (conteúdo do bloco, nº de linhas físicas do bloco). Um bloco só termina
+    com número par de aspas: campos entre aspas podem conter quebra de linha.
+    """
+    it = iter(lines)
+    while True:
+        part = list(itertools.islice(it, max(1, int(rows))))
+        if not part:
+            return
+
+        quotes = sum(_quotes(line) for line in part)
+        while quotes % 2:
+            line = next(it, None)
+            if line is None:
+                break
+            part.append(line)
+            quotes += _quotes(line)
+
+        yield part[0][:0].join(part), len(part)
+
+
+def read_csv_block(block: str, sep: str, header: Sequence[str], first_line: int) -> "pd.DataFrame":
+    """Parse (engine C, tudo string) de um bloco de registros sem cabeçalho.
+
+    Colunas = `header` (na ordem, nomes repetidos preservados). Linhas com campos a
+    mais são puladas e ficam em df.attrs[BAD_LINES_ATTR] como (nº da linha física,
+    texto), com o bloco começando na linha `first_line`. O pandas só informa as
+    linhas puladas via ParserWarning (on_bad_lines="warn", nº do registro no
+    bloco); outros avisos capturados são reemitidos.
+
+    O nº de campos vem de um registro sentinela (vazio, com len(header) campos) à
+    frente do bloco: com header/names, uma 1ª linha com campos a mais viraria
+    índice ou seria truncada em vez de pulada.
+    """
+    import pandas as pd
+
+    sentinel = '""' + sep * (len(header) - 1) + "\n"
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        df = pd.read_csv(
+            io.StringIO(sentinel + block),
+            sep=sep,
+            dtype=str,
+            header=None,
+            on_bad_lines="warn",
+        )
+
+    skipped: List[int] = []
+    for w in caught:
+        found = _SKIPPED_LINE.findall(str(w.message)) if issubclass(w.category, pd.errors.ParserWarning) else []
+        if found:
+            skipped.extend(int(n) for n in found)
+        else:
+            warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+
+    df = df.iloc[1:].reset_index(drop=True)
+    df.columns = list(header)
+    bad: List[Tuple[int, str]] = []
+    if skipped:
+        records = _logical_lines(io.StringIO(block, newline="").readlines())
+        for n in skipped:
+            if 1 < n <= len(records) + 1:
+                start, text = records[n - 2]
+                bad.append((first_line + start, text.rstrip("\r\n")))
+    df.attrs[BAD_LINES_ATTR] = bad
+    return df
@@ -2,13 +2,63 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from calendar import monthrange
 from datetime import date
 from pathlib import Path
-from typing import Optional, Iterable
+from typing import BinaryIO, Callable, Iterator, Optional, Iterable, Sequence
 
 from app.core.dataset import DATASET_PATH, ensure_data_dir
-from app.core.number import parse_money
+from app.core.formatters import normalize_search_text
+from app.core.number import parse_money, parse_money_series
+from app.core.settings import settings
+from app.storage.csv_ranges import BAD_LINES_ATTR, iter_record_blocks, range_lines, read_csv_block, split_line_ranges
+from app.storage.dataset_cube import CUBE_DIMENSIONS, build_cube, load_cube, save_cube
+from app.storage.file_lock import FileLock
+from app.storage.manifest import ManifestBuilder, bad_line_keys, load_rejected_keys, raw_row_keys, save_rejected_keys
+from app.storage.dataset_index import DatasetIndex, build_index, load_index, plan_positions, save_index
+from app.storage.result_cache import ResultCache
+from app.storage.term_index import (
+    TERM_FIELDS,
+    TERM_REVENUE_COLUMN,
+    TermIndex,
+    build_term_indexes,
+    load_term_indexes,
+    save_term_indexes,
+    term_metrics,
+)
+from app.storage.text_index import TrigramIndex, build_trigram_index, load_trigram_index, save_trigram_index
+
+
+# Colunas monetárias: gravadas no cache já como float64 (parse único no build)
+MONEY_COLUMNS = ("vprod", "vicms_icms", "vpis", "vcofins")
+
+# Dimensões gravadas como category (produto: muitos valores, mas muito repetidos)
+CATEGORY_COLUMNS = ("uf", "uf_dest", "cfop", "ncm", "movimento", "produto")
+
+# Versão do layout do cache; cache com versão diferente é reconstruído
+CACHE_SCHEMA_VERSION = 8
+
+# Coluna de partição do cache parquet (hive: <dir>/__month=YYYY-MM/part-00000.parquet)
+PARTITION_COLUMN = "__month"
+
+# Chave de deduplicação de cada linha (uint64), usada pelo import incremental
+KEY_COLUMN = "__key"
+
+# Colunas opcionais que identificam o item da NF-e (chave de acesso + nº do item);
+# só compõem KEY_COLUMN e não são gravadas no cache
+NFE_KEY_COLUMNS = ("chave_nfe", "n_item")
+
+# Colunas internas do cache (não vão para o CSV exportado nem para o engine)
+INTERNAL_COLUMNS = ("__dt", PARTITION_COLUMN, KEY_COLUMN)
+
+# Progresso do import: chamado a cada bloco com (linhas lidas, linhas rejeitadas)
+ImportProgress = Callable[[int, int], None]
 
 
 @dataclass
@@ -27,13 +77,62 @@ class Filters:
 # ------------------------
 
 def _cache_paths(csv_path: Path) -> tuple[Path, Path, Path]:
-    """Retorna (pickle_path, parquet_path, meta_path)."""
+    """Retorna (pickle_path, parquet_dir, meta_path).
+
+    parquet_dir é um dataset hive particionado por mês (__month=YYYY-MM).
+    """
     pkl_path = csv_path.with_suffix(csv_path.suffix + ".pkl")
-    pq_path = csv_path.with_suffix(csv_path.suffix + ".parquet")
+    pq_path = csv_path.with_suffix(csv_path.suffix + ".parts")
     meta_path = csv_path.with_suffix(csv_path.suffix + ".meta.json")
     return pkl_path, pq_path, meta_path
 
 
+def _index_path(csv_path: Path) -> Path:
+    """Sidecar com os índices secundários (uf, uf_dest, ncm, cfop)."""
+    return csv_path.with_suffix(csv_path.suffix + ".idx")
+
+
+def _trigram_path(csv_path: Path) -> Path:
+    """Sidecar com o índice de trigramas das descrições de produto."""
+    return csv_path.with_suffix(csv_path.suffix + ".trgm")
+
+
+def _cube_path(csv_path: Path) -> Path:
+    """Sidecar com o cubo mensal pré-agregado (mês x uf x uf_dest x cfop x ncm x movimento)."""
+    return csv_path.with_suffix(csv_path.suffix + ".cube")
+
+
+def _terms_path(csv_path: Path) -> Path:
+    """Sidecar com os índices de termos do autocomplete (produto/ncm/cfop)."""
+    return csv_path.with_suffix(csv_path.suffix + ".terms")
+
+
+def _rejected_path(csv_path: Path) -> Path:
+    """Sidecar com as chaves das linhas rejeitadas/malformadas (dedup do import incremental)."""
+    return csv_path.with_suffix(csv_path.suffix + ".rejected")
+
+
+def _arrow_path(csv_path: Path) -> Path:
+    """Espelho do cache em Arrow IPC sem compressão (lido via memory-map)."""
+    return csv_path.with_suffix(csv_path.suffix + ".arrow")
+
+
+def _lock_path(csv_path: Path) -> Path:
+    """Lock entre processos do build do cache (single-flight)."""
+    return csv_path.with_suffix(csv_path.suffix + ".lock")
+
+
+def _replace_dir(tmp_dir: Path, final_dir: Path) -> None:
+    """Troca `final_dir` por `tmp_dir` com renames (a versão anterior é removida depois)."""
+    old_dir = final_dir.with_name(final_dir.name + ".old")
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    if final_dir.exists():
+        final_dir.rename(old_dir)
+    tmp_dir.rename(final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
 def _file_fingerprint(path: Path) -> dict:
     st = path.stat()
     return {
@@ -53,45 +152,87 @@ def _read_meta(meta_path: Path) -> Optional[dict]:
 
 def _write_meta(meta_path: Path, meta: dict) -> None:
     try:
-        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        # write-then-rename: leitores nunca veem meta pela metade
+        tmp = meta_path.with_name(meta_path.name + ".tmp")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(meta_path)
     except Exception:
         # se falhar, não bloqueia a execução
         pass
 
 
-def _cache_is_fresh(csv_path: Path, meta_path: Path) -> bool:
-    meta = _read_meta(meta_path)
-    if not meta or "csv" not in meta:
+def _meta_is_fresh(meta: Optional[dict]) -> bool:
+    """O cache descrito por `meta` vale para a base atual?
+
+    - com CSV canônico: o fingerprint do CSV precisa bater (CSV trocado => rebuild)
+    - sem CSV: só vale cache importado direto (source="import"), que é a própria base
+    """
+    if not meta or meta.get("schema") != CACHE_SCHEMA_VERSION or not meta.get("version"):
         return False
 
     try:
-        current = _file_fingerprint(csv_path)
-        cached = meta.get("csv") or {}
-        return (
-            int(cached.get("mtime_ns", -1)) == int(current.get("mtime_ns", -2))
-            and int(cached.get("size", -1)) == int(current.get("size", -2))
-        )
+        current = _file_fingerprint(DATASET_PATH)
+    except FileNotFoundError:
+        return meta.get("source") == "import"
     except Exception:
         return False
 
+    cached = meta.get("csv") or {}
+    return (
+        int(cached.get("mtime_ns", -1)) == int(current.get("mtime_ns", -2))
+        and int(cached.get("size", -1)) == int(current.get("size", -2))
+    )
 
-def _build_cache(csv_path: Path) -> "pd.DataFrame":
-    """Carrega CSV, normaliza colunas e retorna DataFrame pronto para consulta."""
-    import pandas as pd
 
-    # lê tudo como string para preservar vírgulas e formatos; numéricos serão parseados no engine
-    df = pd.read_csv(csv_path, sep=";", dtype=str, encoding="utf-8")
+def _current_meta() -> Optional[dict]:
+    """.meta.json atual, relido só quando o arquivo muda (stat por chamada)."""
+    global _META_MEMO
+
+    _, _, meta_path = _cache_paths(DATASET_PATH)
+    try:
+        st = meta_path.stat()
+    except FileNotFoundError:
+        return None
+
+    key = (int(st.st_mtime_ns), int(st.st_size))
+    memo = _META_MEMO
+    if memo is not None and memo[0] == key:
+        return memo[1]
+
+    meta = _read_meta(meta_path)
+    _META_MEMO = (key, meta)
+    return meta
+
+
+def dataset_exists() -> bool:
+    """Há base importada: CSV canônico ou cache colunar importado direto (sem CSV)."""
+    if DATASET_PATH.exists():
+        return True
+    return (_current_meta() or {}).get("source") == "import"
+
+
+def _normalize_chunk(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Tipagem de um bloco do CSV (lido como string) no layout do cache.
+
+    - valores monetários (MONEY_COLUMNS) viram float64 (parse_money uma única vez)
+    - __dt é datetime64 e __month é a chave YYYY-MM
+    - UF/CFOP/NCM/movimento/produto viram category (UF e movimento em maiúsculas)
+    - __key é a chave de deduplicação da linha (ver _row_keys)
+    """
+    import pandas as pd
 
     # normalizações leves (robustez)
-    for col in ("uf", "uf_dest", "cfop", "ncm", "movimento"):
+    for col in CATEGORY_COLUMNS:
         if col in df.columns:
             df[col] = df[col].fillna("").astype(str).str.strip()
 
-    if "movimento" in df.columns:
-        df["movimento"] = df["movimento"].str.upper()
+    for col in ("uf", "uf_dest", "movimento"):
+        if col in df.columns:
+            df[col] = df[col].str.upper()
 
     # data: suporta YYYY-MM-DD, DD/MM/YYYY, YYYYMMDD (e variantes)
     # dayfirst=True cobre DD/MM/YYYY; errors='coerce' evita crash
+    # format="mixed": formato decidido por valor, não pelo 1º valor de cada bloco
     date_col = None
     for cand in ("dhemi", "dtemi", "dt_emissao"):
         if cand in df.columns:
@@ -101,72 +242,1272 @@ def _build_cache(csv_path: Path) -> "pd.DataFrame":
     if not date_col:
         raise ValueError("CSV não possui colunas de data esperadas (dhemi/dtemi/dt_emissao).")
 
-    df["__dt"] = pd.to_datetime(df[date_col].astype(str).str.strip(), errors="coerce", dayfirst=True)
+    df["__dt"] = pd.to_datetime(df[date_col].astype(str).str.strip(), errors="coerce", dayfirst=True, format="mixed")
+
+    # texto original da data: poucos valores distintos (dias) -> category
+    df[date_col] = df[date_col].astype("category")
 
     # elimina linhas sem data válida (mesma semântica do código atual)
     df = df[df["__dt"].notna()].copy()
 
-    # chave mês (para consultas futuras e para engine, se desejar)
+    # chave mês (partição do cache e chave das séries mensais)
     df["__month"] = df["__dt"].dt.to_period("M").astype(str)  # YYYY-MM
 
-    return df
+    # money: parse vetorizado, uma vez por build (não mais por request)
+    for col in MONEY_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_money_series(df[col])
 
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    df[KEY_COLUMN] = _row_keys(df)
+    return df.drop(columns=[c for c in NFE_KEY_COLUMNS if c in df.columns])
+
+
+def _row_keys(df: "pd.DataFrame") -> "np.ndarray":
+    """Chave uint64 de cada linha (já tipada) para deduplicar imports incrementais.
+
+    - chave_nfe + n_item, quando a linha traz a chave de acesso
+    - senão, hash do conteúdo tipado (data, dimensões, valores): a mesma linha dá a
+      mesma chave em formatos diferentes ('10,50' x '10.5', DD/MM/AAAA x ISO) e no
+      CSV exportado
+    """
+    import numpy as np
+    import pandas as pd
+    from pandas.util import hash_pandas_object
+
+    content = pd.DataFrame({"__dt": df["__dt"]}, index=df.index)
+    for col in CATEGORY_COLUMNS:
+        content[col] = df[col] if col in df.columns else ""
+    for col in MONEY_COLUMNS:
+        content[col] = df[col] if col in df.columns else 0.0
+    keys = hash_pandas_object(content, index=False).to_numpy()
+
+    if all(c in df.columns for c in NFE_KEY_COLUMNS):
+        ident = pd.DataFrame({c: df[c].fillna("").astype(str).str.strip() for c in NFE_KEY_COLUMNS})
+        has_key = (ident["chave_nfe"] != "").to_numpy()
+        if has_key.any():
+            keys = np.where(has_key, hash_pandas_object(ident, index=False).to_numpy(), keys)
+
+    return keys
 
-def _load_dataset_df() -> "pd.DataFrame":
-    """Carrega DataFrame do cache persistente, reconstruindo se necessário."""
-    ensure_data_dir()
 
-    if not DATASET_PATH.exists():
-        raise ValueError("Base não encontrada. Faça upload do CSV em /database/import-csv.")
+def _iter_csv_chunks(
+    csv_path: Path,
+    chunk_rows: Optional[int],
+    manifest: Optional[ManifestBuilder] = None,
+) -> Iterator["pd.DataFrame"]:
+    """Lê o CSV canônico em blocos de até `chunk_rows` linhas já tipados (None = tudo).
 
-    pkl_path, pq_path, meta_path = _cache_paths(DATASET_PATH)
+    Se `manifest` for informado, cada bloco cru (antes da tipagem) alimenta o manifesto.
+    """
+    import pandas as pd
+
+    if not chunk_rows:
+        chunks = [pd.read_csv(csv_path, sep=";", dtype=str, encoding="utf-8")]
+    else:
+        # lê tudo como string para preservar vírgulas e formatos; tipagem em _normalize_chunk
+        chunks = pd.read_csv(csv_path, sep=";", dtype=str, encoding="utf-8", chunksize=int(chunk_rows))
+
+    for chunk in chunks:
+        if manifest is not None:
+            manifest.add(chunk)
+        typed = _normalize_chunk(chunk)
+        if manifest is not None:
+            manifest.add_rejected(chunk, typed.index)
+        yield typed
+
+
+def _build_cache(csv_path: Path, manifest: Optional[ManifestBuilder] = None) -> "pd.DataFrame":
+    """Carrega o CSV inteiro em memória, tipado e na ordem canônica (por mês, estável)."""
+    df = next(_iter_csv_chunks(csv_path, None, manifest))
+    return df.sort_values("__month", kind="stable", ignore_index=True)
+
+
+def _partition_dir(pq_dir: Path, month: str) -> Path:
+    return pq_dir / f"{PARTITION_COLUMN}={month}"
+
+
+def _partition_files(pq_dir: Path, month: str) -> list[Path]:
+    """Arquivos da partição do mês, na ordem canônica (ordem de gravação dos blocos)."""
+    return sorted(_partition_dir(pq_dir, month).glob("part-*.parquet"))
+
+
+def _arrow_schema(df: "pd.DataFrame") -> "pa.Schema":
+    """Schema fixo do cache: category -> dictionary<int32, string> em todos os blocos."""
+    import pandas as pd
+    import pyarrow as pa
+
+    fields = []
+    for col in df.columns:
+        if col == PARTITION_COLUMN:
+            continue
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+        elif col in MONEY_COLUMNS:
+            fields.append(pa.field(col, pa.float64()))
+        elif col == "__dt":
+            fields.append(pa.field(col, pa.timestamp("ns")))
+        elif col == KEY_COLUMN:
+            fields.append(pa.field(col, pa.uint64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+class _PartitionWriter:
+    """Grava blocos tipados no dataset hive particionado por mês.
+
+    Cada bloco gera um arquivo por mês (part-00000, part-00001, ...); lendo os meses
+    em ordem crescente e os arquivos em ordem de nome, recupera-se a ordem canônica.
+    `prefix` distingue escritores paralelos (um por intervalo do CSV, em ordem) e
+    imports incrementais (part-z<n>-..., depois dos arquivos já existentes do mês).
+    `schema` fixa o schema (ex.: o das partições atuais, no import incremental).
+    Requer pyarrow.
+    """
+
+    def __init__(self, pq_dir: Path, prefix: str = "part-", schema: Optional["pa.Schema"] = None) -> None:
+        import pyarrow  # noqa: F401  (falha cedo sem pyarrow)
+
+        self.pq_dir = pq_dir
+        self.prefix = prefix
+        self.schema = schema
+        self.seq = 0
+        self.rows = 0
+        self.nbytes = 0
+        self._months: dict[str, int] = {}
+
+    def write(self, chunk: "pd.DataFrame") -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if chunk.empty:
+            return
+        if self.schema is None:
+            self.schema = _arrow_schema(chunk)
+
+        data = chunk.drop(columns=[PARTITION_COLUMN])
+        for month, part in data.groupby(chunk[PARTITION_COLUMN], sort=True):
+            path = _partition_dir(self.pq_dir, str(month)) / f"{self.prefix}{self.seq:05d}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(part, schema=self.schema, preserve_index=False), path)
+            self._months[str(month)] = self._months.get(str(month), 0) + int(len(part))
+
+        self.seq += 1
+        self.rows += int(len(chunk))
+        self.nbytes += int(chunk.memory_usage(deep=True).sum())
+
+    @property
+    def months(self) -> dict[str, int]:
+        """{mês: linhas} em ordem crescente de mês (ordem canônica)."""
+        return {m: self._months[m] for m in sorted(self._months)}
+
+
+@contextmanager
+def _staged_dir(final_dir: Path) -> Iterator[Path]:
+    """Diretório temporário publicado no lugar de `final_dir` ao sair do `with` sem erro.
+
+    Se o build falhar, o temporário é descartado e a versão anterior fica intacta.
+    """
+    stage = final_dir.with_name(final_dir.name + ".tmp")
+    if stage.exists():
+        shutil.rmtree(stage)
+    stage.mkdir(parents=True)
+    try:
+        yield stage
+    except BaseException:
+        shutil.rmtree(stage, ignore_errors=True)
+        raise
+    _replace_dir(stage, final_dir)
+
+
+def _csv_header(csv_path: Path) -> tuple[list[str], int]:
+    """(colunas do cabeçalho, byte onde começam os dados) do CSV canônico."""
+    import csv
+
+    with open(csv_path, "rb") as f:
+        first = f.readline()
+    header = next(csv.reader([first.decode("utf-8")], delimiter=";"), [])
+    return header, len(first)
+
+
+def _parse_workers() -> int:
+    return int(settings.dataset_parse_workers) or (os.cpu_count() or 1)
+
+
+def _plan_ranges(csv_path: Path, data_start: int) -> list[tuple[int, int]]:
+    """Intervalos de bytes para o parse paralelo (1 intervalo = caminho serial)."""
+    size = csv_path.stat().st_size - data_start
+    min_bytes = max(0, int(settings.dataset_parallel_min_mb)) * 1024 * 1024
+    parts = _parse_workers()
+    if min_bytes:
+        parts = min(parts, size // min_bytes)
+    if parts <= 1:
+        return [(data_start, data_start + size)]
+    return split_line_ranges(csv_path, parts, start=data_start)
+
+
+def _build_range(
+    csv_path: Path,
+    start: int,
+    end: int,
+    header: list[str],
+    out_dir: Path,
+    range_no: int,
+    chunk_rows: int,
+    sep: str = ";",
+    prepare: Optional[Callable[["pd.DataFrame"], "pd.DataFrame"]] = None,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> tuple[dict[str, int], int, int, ManifestBuilder, int]:
+    """Worker do build paralelo: parse + tipagem de um intervalo do CSV direto para parquet.
+
+    Lê o intervalo em blocos de `chunk_rows` linhas (memória limitada ao bloco).
+    `prepare` leva cada bloco cru ao layout canônico (ex.: upload com outro header;
+    precisa ser picklable: função de módulo). Linhas malformadas entram no
+    manifesto parcial, numeradas a partir do início do intervalo. `progress(linhas,
+    rejeitadas, byte lido)` só no caminho serial (mesmo processo).
+
+    Devolve (meses, linhas, bytes em memória, manifesto parcial, linhas do intervalo).
+    """
+    manifest = ManifestBuilder()
+    writer = _PartitionWriter(out_dir, prefix=f"part-{range_no:05d}-")
+    line_no = 1
+    pos = start
+
+    with open(csv_path, "rb") as f:
+        for block, count in iter_record_blocks(range_lines(f, start, end), int(chunk_rows)):
+            chunk = read_csv_block(block.decode("utf-8", errors="replace"), sep, header, line_no)
+            line_no += count
+            pos += len(block)
+            if prepare is not None:
+                chunk = prepare(chunk)
+
+            manifest.add_bad_lines(chunk.attrs.get(BAD_LINES_ATTR) or [])
+            manifest.add(chunk)
+            typed = _normalize_chunk(chunk)
+            manifest.add_rejected(chunk, typed.index)
+            writer.write(typed)
+            if progress is not None:
+                progress(int(len(chunk)), int(len(chunk) - len(typed)), pos)
+
+    return writer.months, writer.rows, writer.nbytes, manifest, line_no - 1
+
+
+def _write_range_partitions(
+    csv_path: Path,
+    ranges: list[tuple[int, int]],
+    header: list[str],
+    out_dir: Path,
+    manifest: ManifestBuilder,
+    sep: str = ";",
+    prepare: Optional[Callable[["pd.DataFrame"], "pd.DataFrame"]] = None,
+    first_line: int = 2,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> tuple[dict[str, int], int, int]:
+    """Parse dos intervalos de bytes do CSV (ver _build_range) para partições parquet.
+
+    Vários intervalos: ProcessPoolExecutor, um intervalo por processo; os arquivos
+    part-<intervalo>-<bloco> preservam a ordem canônica e os manifestos parciais
+    são somados em ordem. `first_line`: nº da linha do arquivo em que começam os
+    dados. `progress(linhas, rejeitadas, byte lido)`: por bloco com um intervalo,
+    por intervalo concluído no paralelo.
+
+    Devolve (meses, linhas, bytes em memória).
+    """
+    months: dict[str, int] = {}
+    rows = nbytes = 0
+    line_offset = first_line - 1
+
+    def collect(result: tuple) -> None:
+        nonlocal rows, nbytes, line_offset
+        part_months, part_rows, part_nbytes, part_manifest, part_lines = result
+        for m, n in part_months.items():
+            months[m] = months.get(m, 0) + n
+        rows += part_rows
+        nbytes += part_nbytes
+        manifest.merge(part_manifest, line_offset=line_offset)
+        line_offset += part_lines
+
+    chunk_rows = int(settings.dataset_chunk_rows)
+    if len(ranges) <= 1:
+        for i, (a, b) in enumerate(ranges):
+            collect(_build_range(csv_path, a, b, header, out_dir, i, chunk_rows, sep, prepare, progress))
+        return {m: months[m] for m in sorted(months)}, rows, nbytes
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn: não herda threads/locks do servidor (fork + threads é frágil)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(len(ranges), _parse_workers()), mp_context=ctx) as pool:
+        futures = [
+            pool.submit(_build_range, csv_path, a, b, header, out_dir, i, chunk_rows, sep, prepare)
+            for i, (a, b) in enumerate(ranges)
+        ]
+        for fut, (_, end) in zip(futures, ranges):
+            result = fut.result()
+            collect(result)
+            if progress is not None:
+                part_manifest = result[3]
+                progress(int(part_manifest.rows), int(part_manifest.date_invalid), end)
+
+    return {m: months[m] for m in sorted(months)}, rows, nbytes
+
+
+def _write_csv_partitions(
+    csv_path: Path,
+    out_dir: Path,
+    manifest: ManifestBuilder,
+) -> tuple[dict[str, int], int, int]:
+    """Converte o CSV canônico em partições parquet; devolve (meses, linhas, bytes).
+
+    Arquivos grandes são divididos em intervalos de bytes alinhados em fim de
+    registro e processados em paralelo (ver _write_range_partitions).
+    """
+    header, data_start = _csv_header(csv_path)
+    ranges = _plan_ranges(csv_path, data_start)
 
-    # Tenta reutilizar cache se estiver fresco
-    if _cache_is_fresh(DATASET_PATH, meta_path):
-        # Preferência: Parquet (mais rápido/compacto) -> Pickle
+    if len(ranges) <= 1:
+        writer = _PartitionWriter(out_dir)
+        for chunk in _iter_csv_chunks(csv_path, settings.dataset_chunk_rows, manifest):
+            writer.write(chunk)
+        return writer.months, writer.rows, writer.nbytes
+
+    return _write_range_partitions(csv_path, ranges, header, out_dir, manifest)
+
+
+def _read_partitions(pq_dir: Path, months: Sequence[str]) -> "pd.DataFrame":
+    """Lê apenas as partições pedidas, na ordem canônica, e recompõe __month."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = []
+    for month in months:
+        for path in _partition_files(pq_dir, month):
+            table = pq.read_table(path)
+            tables.append(table.append_column(PARTITION_COLUMN, pa.array([month] * table.num_rows, pa.string())))
+
+    # categories com dicionários diferentes por bloco/partição são unificadas no to_pandas
+    return pa.concat_tables(tables).to_pandas()
+
+
+def _write_arrow(df: "pd.DataFrame", path: Path) -> None:
+    """Grava o DataFrame completo (ordem canônica) como Arrow IPC sem compressão.
+
+    Lido com memory-map, os buffers numéricos/datas/códigos de category são usados
+    direto do page cache: vários workers do uvicorn compartilham as mesmas páginas.
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp.replace(path)
+
+
+def _open_arrow(path: Path) -> Optional["pa.Table"]:
+    """Abre o .arrow via memory-map (zero-copy); None se indisponível."""
+    try:
+        import pyarrow as pa
+
+        if not path.exists():
+            return None
+        return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    except Exception:
+        return None
+
+
+def _month_span(meta: dict, wanted: Sequence[str]) -> tuple[int, int]:
+    """(offset, linhas) na ordem canônica cobertos pelos meses `wanted` (contíguos)."""
+    counts = meta.get("months") or {}
+    if not wanted:
+        return 0, 0
+    offset = sum(int(n) for m, n in counts.items() if m < wanted[0])
+    return offset, sum(int(counts[m]) for m in wanted)
+
+
+def months_for_period(d0: date, d1: date, months: Iterable[str]) -> list[str]:
+    """Filtra as chaves YYYY-MM que se sobrepõem ao período [d0, d1]."""
+    m0 = f"{d0.year:04d}-{d0.month:02d}"
+    m1 = f"{d1.year:04d}-{d1.month:02d}"
+    return [m for m in months if m0 <= m <= m1]
+
+
+# ------------------------
+# Cache em memória (por processo)
+# ------------------------
+
+@dataclass
+class _MemoryEntry:
+    version: str
+    df: "pd.DataFrame"
+    nbytes: int
+
+
+_MEM_LOCK = threading.Lock()
+_MEM_ENTRY: Optional[_MemoryEntry] = None
+
+# meta do cache: ((mtime_ns, size) do .meta.json, conteúdo)
+_META_MEMO: Optional[tuple[tuple[int, int], Optional[dict]]] = None
+
+# sidecars carregados (.idx, .trgm): nome -> (versão do cache, objeto ou None)
+_SIDECARS: dict[str, tuple[dict, object]] = {}
+
+# resultados de consulta: (versão do cache, filtros canônicos) -> posições canônicas
+_BUILD_LOCK = FileLock(_lock_path(DATASET_PATH))
+
+_RESULTS = ResultCache(max_bytes=max(0, int(settings.dataset_result_cache_mb)) * 1024 * 1024)
+
+# métricas do autocomplete por recorte: (versão do cache, recorte período/UF, campo)
+# -> [ocorrências; receita] por id de termo. À parte de _RESULTS para que as
+# consultas do dashboard não as tirem do LRU entre uma tecla e outra.
+_SCOPE_METRICS = ResultCache(max_bytes=max(0, int(settings.dataset_result_cache_mb)) * 1024 * 1024)
+
+
+def _memory_budget_bytes() -> int:
+    return max(0, int(settings.dataset_cache_max_mb)) * 1024 * 1024
+
+
+def invalidate_dataset_cache(remove_files: bool = False) -> None:
+    """Descarta o DataFrame mantido em memória (e, opcionalmente, os arquivos de cache).
+
+    Chamado por import/clear do dataset; a próxima consulta recarrega do disco.
+    """
+    global _MEM_ENTRY
+    with _MEM_LOCK:
+        _MEM_ENTRY = None
+        _SIDECARS.clear()
+    _RESULTS.clear()
+    _SCOPE_METRICS.clear()
+
+    if remove_files:
+        sidecars = (
+            _index_path(DATASET_PATH),
+            _trigram_path(DATASET_PATH),
+            _arrow_path(DATASET_PATH),
+            _cube_path(DATASET_PATH),
+            _terms_path(DATASET_PATH),
+            _rejected_path(DATASET_PATH),
+        )
+        with _BUILD_LOCK:
+            # meta primeiro: sem ele, os demais artefatos nunca são considerados válidos
+            pkl_path, pq_dir, meta_path = _cache_paths(DATASET_PATH)
+            for p in (meta_path, pkl_path, pq_dir, *sidecars):
+                try:
+                    if p.is_dir():
+                        shutil.rmtree(p)
+                    elif p.exists():
+                        p.unlink()
+                except Exception:
+                    pass
+
+
+def _remember(version: str, df: "pd.DataFrame", nbytes: Optional[int] = None) -> None:
+    """Guarda o DataFrame completo em memória se couber no orçamento."""
+    global _MEM_ENTRY
+
+    budget = _memory_budget_bytes()
+    if budget <= 0:
+        return
+
+    if nbytes is None:
+        nbytes = int(df.memory_usage(deep=True).sum())
+    with _MEM_LOCK:
+        _MEM_ENTRY = _MemoryEntry(version, df, nbytes) if nbytes <= budget else None
+
+
+def _load_dataset_df(period: Optional[tuple[date, date]] = None) -> "pd.DataFrame":
+    """Atalho de _load_dataset_slice que devolve só o DataFrame."""
+    return _load_dataset_slice(period)[0]
+
+
+def _load_dataset_slice(period: Optional[tuple[date, date]] = None) -> tuple["pd.DataFrame", int]:
+    """Carrega o DataFrame do dataset (memória -> Arrow mmap -> partições parquet -> pickle -> CSV).
+
+    - O cache em memória é chaveado pela versão gravada no .meta.json (nova a cada
+      build/import), e o meta só vale para o CSV atual: CSV trocado invalida a entrada.
+    - `period` é uma dica de recorte: se o dataset completo não couber no orçamento
+      de memória, lê só as partições mensais que se sobrepõem ao período. O retorno pode conter mais linhas
+      do que o pedido (ex.: dataset completo em memória); o chamador aplica a máscara.
+
+    Retorna (df, offset): df cobre as posições canônicas [offset, offset + len(df)).
+    """
+    meta = _fresh_meta()
+    version = meta["version"]
+
+    with _MEM_LOCK:
+        entry = _MEM_ENTRY
+    if entry is not None and entry.version == version:
+        return entry.df, 0
+
+    pkl_path, pq_dir, _ = _cache_paths(DATASET_PATH)
+
+    cached_months = list((meta.get("months") or {}).keys())
+    fits = 0 < int(meta.get("nbytes") or 0) <= _memory_budget_bytes()
+    pushdown = period is not None and not fits and bool(cached_months)
+    wanted = months_for_period(period[0], period[1], cached_months) if pushdown else []
+
+    # Arrow IPC via memory-map: recorte por período é um slice zero-copy
+    table = _load_sidecar("arrow", lambda: _open_arrow(_arrow_path(DATASET_PATH))) if settings.dataset_arrow_mmap else None
+    if table is not None:
+        if pushdown:
+            offset, length = _month_span(meta, wanted)
+            return table.slice(offset, length).to_pandas(split_blocks=True), offset
+
+        df = table.to_pandas(split_blocks=True)
+        _remember(version, df, nbytes=int(meta.get("nbytes") or 0) or None)
+        return df, 0
+
+    # Predicate pushdown por período: só as partições do recorte
+    if pushdown and pq_dir.exists():
         try:
-            if pq_path.exists():
-                import pandas as pd
-                return pd.read_parquet(pq_path)
+            df = _read_partitions(pq_dir, wanted or cached_months[:1])
+            if not wanted:
+                return df.iloc[0:0], 0
+            return df, _month_span(meta, wanted)[0]
         except Exception:
             pass
 
+    # Dataset completo: partições (preferência) -> pickle
+    df = None
+    if cached_months and pq_dir.exists():
         try:
-            if pkl_path.exists():
-                import pandas as pd
-                return pd.read_pickle(pkl_path)
+            df = _read_partitions(pq_dir, cached_months)
         except Exception:
-            pass
+            df = None
+
+    if df is None and pkl_path.exists():
+        try:
+            import pandas as pd
+            df = pd.read_pickle(pkl_path)
+        except Exception:
+            df = None
+
+    if df is None:
+        if not DATASET_PATH.exists():
+            raise ValueError("Cache da base importada está corrompido. Importe o CSV novamente.")
+        df = _build_cache(DATASET_PATH)
+
+    _remember(version, df, nbytes=int(meta.get("nbytes") or 0) or None)
+    return df, 0
+
+
+def warm_dataset_cache() -> bool:
+    """Deixa o cache pronto: reconstrói se estiver velho e pré-carrega memória e sidecars.
+
+    Usado pelo warm-up em background (startup e pós-import). Retorna False se não há base.
+    """
+    if not dataset_exists():
+        return False
+
+    chunked = _is_chunked()
+    _load_cube()
+    _load_term_indexes()
+    if chunked:
+        return True
+
+    nbytes = int(_fresh_meta().get("nbytes") or 0)
+    if 0 < nbytes <= _memory_budget_bytes():
+        _load_dataset_slice()
+
+    _load_index()
+    _load_trigram_index()
+    return True
+
+
+def dataset_manifest(wait: bool = False) -> Optional[dict]:
+    """Manifesto do dataset (linhas, período, UFs, totais, nulos, qualidade) ou None.
+
+    Lido do .meta.json sem tocar no CSV; None se não há base ou o cache ainda não
+    foi (re)construído para o CSV atual (o chamador decide se espera ou varre).
+    wait=True espera o build (single-flight) quando o cache está desatualizado.
+    """
+    meta = _current_meta()
+    if not _meta_is_fresh(meta):
+        if not wait or not dataset_exists():
+            return None
+        meta = _fresh_meta()
+    return meta.get("manifest")
+
+
+def dataset_cache_status() -> dict:
+    """Prontidão do cache em disco: {"ready": válido para o CSV atual, "indexing": build em curso}.
+
+    "indexing" enxerga builds de qualquer processo (lock do build ocupado).
+    """
+    if _meta_is_fresh(_current_meta()):
+        return {"ready": True, "indexing": False}
+
+    if not dataset_exists():
+        return {"ready": False, "indexing": False}
+
+    busy = not _BUILD_LOCK.acquire(blocking=False)
+    if not busy:
+        _BUILD_LOCK.release()
+    return {"ready": False, "indexing": busy}
+
+
+def _load_sidecar(name: str, loader):
+    """Carrega um sidecar do cache atual uma vez por versão do cache (None se indisponível)."""
+    meta = _current_meta()
+    if not _meta_is_fresh(meta):
+        return None
+
+    version = meta["version"]
+    with _MEM_LOCK:
+        entry = _SIDECARS.get(name)
+    if entry is not None and entry[0] == version:
+        return entry[1]
 
-    # Reconstrói cache
-    df = _build_cache(DATASET_PATH)
+    obj = loader()
+
+    with _MEM_LOCK:
+        _SIDECARS[name] = (version, obj)
+    return obj
+
+
+def _load_index() -> Optional[DatasetIndex]:
+    """Índices secundários do cache atual (memória -> .idx); None se indisponível."""
+    return _load_sidecar("idx", lambda: load_index(_index_path(DATASET_PATH)))
+
+
+def _load_trigram_index() -> Optional[TrigramIndex]:
+    """Índice de trigramas de produto do cache atual (memória -> .trgm)."""
+    return _load_sidecar("trgm", lambda: load_trigram_index(_trigram_path(DATASET_PATH)))
+
+
+def _load_cube() -> Optional["pd.DataFrame"]:
+    """Cubo mensal do cache atual (memória -> .cube); None se indisponível."""
+    return _load_sidecar("cube", lambda: load_cube(_cube_path(DATASET_PATH)))
+
+
+def _load_term_indexes() -> Optional[dict[str, TermIndex]]:
+    """Índices de termos do cache atual (memória -> .terms); None se indisponível."""
+    return _load_sidecar("terms", lambda: load_term_indexes(_terms_path(DATASET_PATH)))
+
+
+def _empty_frame() -> "pd.DataFrame":
+    """Base vazia (import só com cabeçalho): colunas mínimas para as consultas."""
+    import pandas as pd
+
+    data = {col: pd.Series([], dtype="category") for col in CATEGORY_COLUMNS}
+    data.update({col: pd.Series([], dtype="float64") for col in MONEY_COLUMNS})
+    data["__dt"] = pd.Series([], dtype="datetime64[ns]")
+    data[PARTITION_COLUMN] = pd.Series([], dtype=object)
+    data[KEY_COLUMN] = pd.Series([], dtype="uint64")
+    return pd.DataFrame(data)
+
+
+def import_dataset_chunks(
+    chunks: Iterable["pd.DataFrame"],
+    append: bool = False,
+    progress: Optional[ImportProgress] = None,
+) -> dict:
+    """Importa blocos crus (tudo string, colunas canônicas) direto para o cache colunar.
+
+    Uma passada: manifesto + tipagem + partições parquet + índices + meta, sem
+    regravar o CSV canônico e sem rebuild na primeira consulta. O CSV passa a ser
+    opcional: gerado sob demanda (export_dataset_csv) ou mantido no import com
+    settings.dataset_keep_csv. Sem pyarrow, grava o CSV e reconstrói a partir dele.
+
+    append=True acrescenta as linhas à base atual (ver _append_chunks); sem base,
+    equivale ao import completo. `progress` recebe, a cada bloco, as linhas lidas e
+    as rejeitadas (data inválida: não entram no cache). Linhas malformadas puladas
+    no parse vêm em attrs[BAD_LINES_ATTR] de cada bloco e entram no manifesto.
+
+    Devolve {"rows": linhas recebidas, "imported": linhas gravadas no cache,
+    "duplicates": linhas já existentes (ignoradas), "rejected": linhas novas sem
+    data válida, "bad_lines": linhas malformadas novas, "manifest": ...}.
+    """
+    ensure_data_dir()
+
+    with _BUILD_LOCK:
+        meta = _current_meta()
+        if append and _meta_is_fresh(meta) and meta.get("months"):
+            return _append_chunks(chunks, meta, progress)
+
+        return _import_result(_replace_chunks(chunks, progress))
+
+
+def _import_result(manifest: dict) -> dict:
+    """Resultado de import_dataset_chunks para um import completo (manifesto gravado)."""
+    rows = int(manifest["rows"])
+    valid_rows = int(manifest.get("valid_rows", rows))
+    return {
+        "rows": rows,
+        "imported": valid_rows,
+        "duplicates": 0,
+        "rejected": rows - valid_rows,
+        "bad_lines": int((manifest.get("quality") or {}).get("bad_lines") or 0),
+        "manifest": manifest,
+    }
+
+
+def _replace_chunks(chunks: Iterable["pd.DataFrame"], progress: Optional[ImportProgress] = None) -> dict:
+    """Substitui a base pelos blocos importados (chamado com o lock do build)."""
+    pkl_path, pq_dir, meta_path = _cache_paths(DATASET_PATH)
+    manifest = ManifestBuilder()
 
-    # Persiste: tenta parquet; se não tiver engine, cai no pickle
-    wrote_any = False
     try:
-        df.to_parquet(pq_path, index=False)  # requer pyarrow ou fastparquet
-        wrote_any = True
-    except Exception:
-        pass
+        import pyarrow  # noqa: F401
+        columnar = True
+    except ImportError:
+        columnar = False
+
+    keep_csv = settings.dataset_keep_csv or not columnar
+    csv_tmp = DATASET_PATH.with_name(DATASET_PATH.name + ".importing")
+
+    try:
+        with _staged_dir(pq_dir) as stage:
+            writer = _PartitionWriter(stage) if columnar else None
+            csv_out = open(csv_tmp, "w", encoding="utf-8", newline="") if keep_csv else None
+            try:
+                header = True
+                for raw in chunks:
+                    manifest.add_bad_lines(raw.attrs.get(BAD_LINES_ATTR) or [])
+                    manifest.add(raw)
+                    if csv_out is not None:
+                        raw.to_csv(csv_out, sep=";", index=False, header=header)
+                        header = False
+                    rejected = 0
+                    if writer is not None:
+                        typed = _normalize_chunk(raw)
+                        manifest.add_rejected(raw, typed.index)
+                        rejected = int(len(raw) - len(typed))
+                        writer.write(typed)
+                    if progress is not None:
+                        progress(int(len(raw)), rejected)
+            finally:
+                if csv_out is not None:
+                    csv_out.close()
+
+            # a base anterior deixa de valer antes de publicar as partições novas
+            if meta_path.exists():
+                meta_path.unlink()
+            if csv_out is not None:
+                csv_tmp.replace(DATASET_PATH)
+            elif DATASET_PATH.exists():
+                DATASET_PATH.unlink()
+    finally:
+        if csv_tmp.exists():
+            csv_tmp.unlink()
+
+    if writer is None:
+        invalidate_dataset_cache()
+        _, meta = _rebuild_cache()
+        return meta["manifest"]
+
+    return _publish_import(writer.months, writer.rows, writer.nbytes, manifest)
+
 
+def _publish_import(months: dict[str, int], rows: int, nbytes: int, manifest: ManifestBuilder) -> dict:
+    """Publica a base importada (partições já no lugar): espelho, índices e meta.
+
+    Devolve o manifesto gravado.
+    """
+    pkl_path, _, _ = _cache_paths(DATASET_PATH)
+    invalidate_dataset_cache()
+    if pkl_path.exists():
+        pkl_path.unlink()
+
+    df, meta = _finish_build(None, months, rows, nbytes, manifest, source="import")
+    if df is not None:
+        _remember(meta["version"], df, nbytes=meta["nbytes"])
+    return meta["manifest"]
+
+
+def file_import_available() -> bool:
+    """Import completo direto de arquivo (import_dataset_file) disponível?
+
+    Requer pyarrow (partições) e dispensa o CSV canônico (dataset_keep_csv=False).
+    """
     try:
-        df.to_pickle(pkl_path)
-        wrote_any = True
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return not settings.dataset_keep_csv
+
+
+def import_dataset_file(
+    fileobj: BinaryIO,
+    data_start: int,
+    header: list[str],
+    sep: str,
+    prepare: Callable[["pd.DataFrame"], "pd.DataFrame"],
+    first_line: int = 2,
+    progress: Optional[ImportProgress] = None,
+) -> dict:
+    """Import completo (substitui a base) de um CSV puro já em arquivo (ex.: upload em spool).
+
+    Como import_dataset_chunks(append=False), mas o parse usa os intervalos de
+    bytes do build paralelo (_write_range_partitions): arquivos grandes são
+    processados em vários processos. `fileobj.name` é o caminho do arquivo;
+    `data_start` o byte onde começam os dados (`first_line`: nº da linha), com
+    `header` as colunas do arquivo e `prepare` (função de módulo) levando cada
+    bloco ao layout canônico. A posição de `fileobj` acompanha o parse (bytes
+    lidos do job) e `progress` recebe linhas lidas e rejeitadas: por bloco com um
+    intervalo, por intervalo concluído no paralelo. Requer file_import_available().
+
+    Devolve o mesmo que import_dataset_chunks.
+    """
+    csv_path = Path(fileobj.name)
+    ensure_data_dir()
+
+    def report(rows: int, rejected: int, pos: int) -> None:
+        fileobj.seek(pos)
+        if progress is not None:
+            progress(rows, rejected)
+
+    with _BUILD_LOCK:
+        _, pq_dir, meta_path = _cache_paths(DATASET_PATH)
+        manifest = ManifestBuilder()
+        ranges = _plan_ranges(csv_path, data_start)
+
+        with _staged_dir(pq_dir) as stage:
+            months, rows, nbytes = _write_range_partitions(
+                csv_path, ranges, header, stage, manifest,
+                sep=sep, prepare=prepare, first_line=first_line, progress=report,
+            )
+            # a base anterior deixa de valer antes de publicar as partições novas
+            if meta_path.exists():
+                meta_path.unlink()
+            if DATASET_PATH.exists():
+                DATASET_PATH.unlink()
+
+        published = _publish_import(months, rows, nbytes, manifest)
+
+    return _import_result(published)
+
+
+def _partition_keys(pq_dir: Path, month: str) -> "np.ndarray":
+    """Chaves (KEY_COLUMN) já gravadas na partição do mês."""
+    import numpy as np
+    import pyarrow.parquet as pq
+
+    arrays = [
+        pq.read_table(path, columns=[KEY_COLUMN]).column(KEY_COLUMN).to_numpy()
+        for path in _partition_files(pq_dir, month)
+    ]
+    return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.uint64)
+
+
+def _known_rows(typed: "pd.DataFrame", pq_dir: Path, known: dict[str, "np.ndarray"]) -> "np.ndarray":
+    """Máscara das linhas cuja chave já existe na base.
+
+    A chave inclui a data (ou identifica o item da NF-e, que tem data fixa), então
+    uma duplicata só pode estar no mesmo mês: lê apenas as chaves dos meses tocados
+    pelo bloco (`known` guarda as já lidas).
+    """
+    import numpy as np
+
+    out = np.zeros(len(typed), dtype=bool)
+    months = typed[PARTITION_COLUMN].to_numpy()
+    keys = typed[KEY_COLUMN].to_numpy()
+
+    for month in np.unique(months):
+        month = str(month)
+        if month not in known:
+            known[month] = _partition_keys(pq_dir, month)
+        sel = months == month
+        out[sel] = np.isin(keys[sel], known[month])
+    return out
+
+
+def _append_rejected_only(meta: dict, manifest: ManifestBuilder, csv_tmp: Optional[Path]) -> dict:
+    """Append sem linha nova no cache, só com rejeitadas/malformadas inéditas.
+
+    Grava as chaves (.rejected) e o manifesto no meta atual, com a mesma versão: o
+    cache de dados (partições, espelho Arrow, índices) não muda. `csv_tmp`: linhas
+    a acrescentar ao CSV canônico mantido (dataset_keep_csv), cujo fingerprint vai
+    para o meta.
+    """
+    _, _, meta_path = _cache_paths(DATASET_PATH)
+    _write_derived(_rejected_path(DATASET_PATH), lambda p: save_rejected_keys(p, manifest))
+
+    meta = {**meta, "manifest": manifest.to_dict(valid_rows=int(meta["rows"]))}
+    if csv_tmp is not None:
+        with open(csv_tmp, "rb") as src, open(DATASET_PATH, "ab") as dst:
+            shutil.copyfileobj(src, dst)
+        meta["csv"] = _file_fingerprint(DATASET_PATH)
+    _write_meta(meta_path, meta)
+    return meta
+
+
+def _append_chunks(
+    chunks: Iterable["pd.DataFrame"],
+    meta: dict,
+    progress: Optional[ImportProgress] = None,
+) -> dict:
+    """Acrescenta blocos crus à base atual (chamado com o lock do build).
+
+    - linhas cuja chave (KEY_COLUMN) já está na base são ignoradas; repetições
+      dentro do próprio arquivo são mantidas, como no import completo
+    - o mesmo vale para as linhas sem data válida e as malformadas já vistas
+      (chaves no sidecar .rejected): não são contadas de novo no manifesto
+    - sem nenhuma linha nova com data válida, partições, índices e versão ficam
+      como estão; rejeitadas/malformadas novas só entram no manifesto e no .rejected
+    - só as linhas novas são tipadas e gravadas, em arquivos part-z<n>-* ao fim de
+      cada mês (a ordem canônica continua mês a mês)
+    - o manifesto gravado é somado às linhas novas, sem reler a base
+    - CSV canônico: recebe as linhas novas se settings.dataset_keep_csv; senão é
+      descartado (export_dataset_csv gera de novo)
+
+    Espelho Arrow e índices são refeitos das partições (leitura colunar, sem parse
+    de CSV): as posições dos meses seguintes aos tocados mudam.
+    """
+    import numpy as np
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Importação incremental requer pyarrow (cache em partições).")
+
+    pkl_path, pq_dir, meta_path = _cache_paths(DATASET_PATH)
+    first_month = next(iter(meta["months"]))
+    schema = pq.read_schema(_partition_files(pq_dir, first_month)[0])
+
+    seq = int(meta.get("appends") or 0) + 1
+    known_rejected, known_bad_lines = load_rejected_keys(_rejected_path(DATASET_PATH))
+    manifest = ManifestBuilder.from_dict(meta["manifest"])
+    manifest.add_keys(known_rejected, known_bad_lines)
+    known: dict[str, "np.ndarray"] = {}
+    received = imported = duplicates = rejected = bad_lines = 0
+
+    keep_csv = settings.dataset_keep_csv and DATASET_PATH.exists()
+    csv_header = _csv_header(DATASET_PATH)[0] if keep_csv else None
+    csv_tmp = DATASET_PATH.with_name(DATASET_PATH.name + ".appending")
+    stage = pq_dir.with_name(pq_dir.name + ".append")
+    if stage.exists():
+        shutil.rmtree(stage)
+
+    try:
+        writer = _PartitionWriter(stage, prefix=f"part-z{seq:05d}-", schema=schema)
+        csv_out = open(csv_tmp, "w", encoding="utf-8", newline="") if keep_csv else None
+        try:
+            for raw in chunks:
+                bad = raw.attrs.get(BAD_LINES_ATTR) or []
+                if bad:
+                    seen = np.isin(bad_line_keys(bad), known_bad_lines)
+                    bad = [line for line, old in zip(bad, seen) if not old]
+                manifest.add_bad_lines(bad)
+                bad_lines += len(bad)
+
+                received += int(len(raw))
+                typed = _normalize_chunk(raw.copy())
+
+                dup = _known_rows(typed, pq_dir, known)
+                drop = typed.index[dup]
+                dropped = ~raw.index.isin(typed.index)
+                if dropped.any():
+                    seen = np.isin(raw_row_keys(raw[dropped]), known_rejected)
+                    drop = drop.append(raw.index[dropped][seen])
+                    rejected += int((~seen).sum())
+                if len(drop):
+                    duplicates += int(len(drop))
+                    raw = raw.drop(index=drop)
+                    typed = typed[~dup]
+                imported += int(len(typed))
+                if progress is not None:
+                    progress(int(len(raw) + len(drop)), int(len(raw) - len(typed)))
+
+                manifest.add(raw)
+                manifest.add_rejected(raw, typed.index)
+                if csv_out is not None:
+                    raw.reindex(columns=csv_header, fill_value="").to_csv(csv_out, sep=";", index=False, header=False)
+                try:
+                    writer.write(typed)
+                except KeyError as e:
+                    raise ValueError(f"Colunas do arquivo diferem da base atual: {e}")
+        finally:
+            if csv_out is not None:
+                csv_out.close()
+
+        result = {
+            "rows": received,
+            "imported": imported,
+            "duplicates": duplicates,
+            "rejected": rejected,
+            "bad_lines": bad_lines,
+        }
+        if not imported:
+            # nenhuma linha nova no cache: partições, índices e versão ficam como estão
+            if rejected or bad_lines:
+                meta = _append_rejected_only(meta, manifest, csv_tmp if keep_csv else None)
+            return {**result, "manifest": meta["manifest"]}
+
+        # publica: meta antigo sai primeiro (leitores esperam o lock e veem a versão nova)
+        meta_path.unlink()
+        for path in sorted(stage.glob("*/part-*.parquet")):
+            dest = pq_dir / path.parent.name / path.name
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, dest)
+
+        if keep_csv:
+            with open(csv_tmp, "rb") as src, open(DATASET_PATH, "ab") as dst:
+                shutil.copyfileobj(src, dst)
+        elif DATASET_PATH.exists():
+            DATASET_PATH.unlink()
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+        if csv_tmp.exists():
+            csv_tmp.unlink()
+
+    months = dict(meta["months"])
+    for month, n in writer.months.items():
+        months[month] = months.get(month, 0) + n
+    months = {m: months[m] for m in sorted(months)}
+
+    invalidate_dataset_cache()
+
+    source = meta.get("source", "csv") if DATASET_PATH.exists() else "import"
+    df, new_meta = _finish_build(
+        None,
+        months,
+        int(meta["rows"]) + writer.rows,
+        int(meta["nbytes"]) + writer.nbytes,
+        manifest,
+        source=source,
+        appends=seq,
+    )
+    if df is not None:
+        _remember(new_meta["version"], df, nbytes=new_meta["nbytes"])
+
+    return {**result, "manifest": new_meta["manifest"]}
+
+
+def export_dataset_csv() -> Path:
+    """Garante o CSV canônico (';') da base e devolve o caminho.
+
+    Base importada direto no cache não tem CSV: ele é gerado das partições, na ordem
+    canônica, só com as linhas do cache (data válida; UF/movimento em maiúsculas,
+    valores monetários já numéricos). O fingerprint do CSV gerado entra no meta,
+    então o cache continua válido (mesma versão).
+    """
+    meta = _fresh_meta()
+    if DATASET_PATH.exists():
+        return DATASET_PATH
+
+    import pyarrow.parquet as pq
+
+    _, pq_dir, meta_path = _cache_paths(DATASET_PATH)
+    tmp = DATASET_PATH.with_name(DATASET_PATH.name + ".exporting")
+
+    with _BUILD_LOCK:
+        meta = _current_meta()
+        if DATASET_PATH.exists() and _meta_is_fresh(meta):
+            return DATASET_PATH
+        if not _meta_is_fresh(meta):
+            raise ValueError("Base não encontrada. Faça upload do CSV em /database/import-csv.")
+
+        try:
+            with open(tmp, "w", encoding="utf-8", newline="") as out:
+                header = True
+                for month in meta.get("months") or {}:
+                    for path in _partition_files(pq_dir, month):
+                        df = pq.read_table(path).to_pandas()
+                        df = df.drop(columns=[c for c in INTERNAL_COLUMNS if c in df.columns])
+                        df.to_csv(out, sep=";", index=False, header=header)
+                        header = False
+            tmp.replace(DATASET_PATH)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+        _write_meta(meta_path, {**meta, "csv": _file_fingerprint(DATASET_PATH)})
+
+    return DATASET_PATH
+
+
+def _rebuild_cache_once() -> tuple[Optional["pd.DataFrame"], dict]:
+    """Reconstrói o cache com single-flight entre threads e processos (workers).
+
+    Só um build por vez (lock em `<csv>.lock`); quem chega com o cache velho espera
+    e, ao obter o lock, confere de novo: se outro processo já reconstruiu, não refaz
+    e devolve (None, meta) para o chamador ler os artefatos novos do disco.
+    """
+    with _BUILD_LOCK:
+        meta = _current_meta()
+        if _meta_is_fresh(meta):
+            return None, meta
+        if not DATASET_PATH.exists():
+            if (meta or {}).get("source") == "import":
+                raise ValueError("Cache da base importada é de uma versão anterior. Importe o CSV novamente.")
+            raise ValueError("Base não encontrada. Faça upload do CSV em /database/import-csv.")
+        return _rebuild_cache()
+
+
+def _fresh_meta() -> dict:
+    """Meta do cache válido para a base atual; reconstrói (single-flight) se preciso."""
+    ensure_data_dir()
+
+    meta = _current_meta()
+    if _meta_is_fresh(meta):
+        return meta
+
+    df, meta = _rebuild_cache_once()
+    if df is not None:
+        _remember(meta["version"], df, nbytes=meta["nbytes"])
+    return meta
+
+
+def _rebuild_cache() -> tuple[Optional["pd.DataFrame"], dict]:
+    """Reconstrói o cache persistente a partir do CSV; devolve (DataFrame completo, meta).
+
+    O CSV é lido em blocos (settings.dataset_chunk_rows) direto para as partições,
+    com memória limitada ao bloco. Se a base tipada passar de
+    settings.dataset_in_memory_max_mb, o cache fica em modo "chunked" (out-of-core):
+    sem espelho Arrow/índices, e o DataFrame devolvido é None; as consultas usam
+    leitura por partição ou iter_dataset_batches.
+    """
+    pkl_path, pq_dir, meta_path = _cache_paths(DATASET_PATH)
+
+    # Persiste: partições parquet (requer pyarrow); sem pyarrow, cai no pickle
+    df: Optional["pd.DataFrame"] = None
+    months: dict[str, int] = {}
+    manifest = ManifestBuilder()
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        df = _build_cache(DATASET_PATH, manifest)
+        try:
+            tmp = pkl_path.with_name(pkl_path.name + ".tmp")
+            df.to_pickle(tmp)
+            tmp.replace(pkl_path)
+        except Exception:
+            pass
+        rows, nbytes = int(len(df)), int(df.memory_usage(deep=True).sum())
+    else:
+        with _staged_dir(pq_dir) as stage:
+            months, rows, nbytes = _write_csv_partitions(DATASET_PATH, stage, manifest)
+
+        if pkl_path.exists():
+            pkl_path.unlink()
+
+    return _finish_build(df, months, rows, nbytes, manifest, source="csv")
+
+
+def _iter_partition_frames(pq_dir: Path, months: dict[str, int], columns: Iterable[str]) -> Iterator["pd.DataFrame"]:
+    """Partições lidas só com `columns` (+ __month), uma por vez (builds no modo chunked)."""
+    import pyarrow.parquet as pq
+
+    wanted = set(columns)
+    for month in months:
+        for path in _partition_files(pq_dir, month):
+            names = pq.read_schema(path).names
+            df = pq.read_table(path, columns=[c for c in names if c in wanted]).to_pandas()
+            df[PARTITION_COLUMN] = month
+            yield df
+
+
+def _write_derived(path: Path, write: Callable[[Path], None]) -> None:
+    """Grava um sidecar agregado; se falhar, remove a versão anterior (as consultas
+    voltam a varrer as linhas em vez de usar agregados de outra base)."""
+    try:
+        write(path)
     except Exception:
-        pass
+        if path.exists():
+            path.unlink()
+
+
+def _finish_build(
+    df: Optional["pd.DataFrame"],
+    months: dict[str, int],
+    rows: int,
+    nbytes: int,
+    manifest: ManifestBuilder,
+    source: str,
+    appends: int = 0,
+) -> tuple[Optional["pd.DataFrame"], dict]:
+    """Etapa final do build (CSV ou import): artefatos derivados + meta com versão nova.
+
+    Chamado com o lock do build; o meta é gravado por último (publica a versão).
+    `appends` conta os imports incrementais sobre as partições atuais.
+    """
+    pkl_path, pq_dir, meta_path = _cache_paths(DATASET_PATH)
+
+    in_memory = nbytes <= max(0, int(settings.dataset_in_memory_max_mb)) * 1024 * 1024
+    if df is None and in_memory:
+        if months:
+            df = _read_partitions(pq_dir, list(months))
+        elif DATASET_PATH.exists():
+            df = _build_cache(DATASET_PATH)
+        else:
+            df = _empty_frame()
+        nbytes = int(df.memory_usage(deep=True).sum())
 
-    # Sempre escreve meta (mesmo se persistência falhar; meta controla freshness)
     meta = {
-        "csv": _file_fingerprint(DATASET_PATH),
+        "schema": CACHE_SCHEMA_VERSION,
+        # versão do cache: chave do cache em memória e do LRU de resultados
+        "version": uuid.uuid4().hex,
+        "source": source,
+        "csv": _file_fingerprint(DATASET_PATH) if DATASET_PATH.exists() else None,
+        "mode": "memory" if df is not None else "chunked",
+        "rows": rows,
+        "nbytes": nbytes,
+        "months": months,
+        "appends": appends,
+        "manifest": manifest.to_dict(valid_rows=rows),
         "cache": {
-            "parquet": bool(pq_path.exists()),
+            "parquet": bool(months),
             "pickle": bool(pkl_path.exists()),
-            "wrote_any": wrote_any,
+            "wrote_any": bool(months) or pkl_path.exists(),
         },
     }
+
+    # Cubo mensal e índices de termos: nos dois modos (no chunked, partição a partição)
+    def frames(columns: Sequence[str]) -> Iterable["pd.DataFrame"]:
+        return [df] if df is not None else _iter_partition_frames(pq_dir, months, columns)
+
+    _write_derived(
+        _cube_path(DATASET_PATH),
+        lambda p: save_cube(p, build_cube(frames(("__dt", *CUBE_DIMENSIONS, *MONEY_COLUMNS)), MONEY_COLUMNS)),
+    )
+    _write_derived(
+        _terms_path(DATASET_PATH),
+        lambda p: save_term_indexes(p, build_term_indexes(frames(("__dt", TERM_REVENUE_COLUMN, *TERM_FIELDS)))),
+    )
+    _write_derived(_rejected_path(DATASET_PATH), lambda p: save_rejected_keys(p, manifest))
+
+    if df is None:
+        # out-of-core: artefatos que exigem a base inteira em memória ficam de fora
+        for p in (_arrow_path(DATASET_PATH), _index_path(DATASET_PATH), _trigram_path(DATASET_PATH)):
+            if p.exists():
+                p.unlink()
+        _write_meta(meta_path, meta)
+        return None, meta
+
+    # Espelho Arrow IPC (memory-map compartilhado entre workers)
+    arrow_path = _arrow_path(DATASET_PATH)
+    try:
+        if settings.dataset_arrow_mmap:
+            _write_arrow(df, arrow_path)
+        elif arrow_path.exists():
+            arrow_path.unlink()
+    except Exception:
+        pass
+
+    # Índices secundários (posições na mesma ordem canônica das partições)
+    try:
+        save_index(_index_path(DATASET_PATH), build_index(df))
+    except Exception:
+        pass
+
+    # Trigramas das descrições distintas de produto (filtro "contém")
+    try:
+        if "produto" in df.columns:
+            save_trigram_index(_trigram_path(DATASET_PATH), build_trigram_index(df["produto"].cat.categories))
+    except Exception:
+        pass
+
+    # Sempre escreve meta (mesmo se persistência falhar; meta controla freshness)
     _write_meta(meta_path, meta)
 
-    return df
+    return df, meta
 
 
 # ------------------------
@@ -180,60 +1521,402 @@ def _norm(s: Optional[str]) -> Optional[str]:
     return s2 or None
 
 
-def query_dataset(filters: Filters) -> list[dict]:
-    """Retorna list[dict] compatível com o engine.
+def _col_eq(df: "pd.DataFrame", col: str, value: str) -> "pd.Series":
+    """Igualdade exata numa coluna do cache (category já normalizada no build)."""
+    if col not in df.columns:
+        return df["__dt"].isna()  # coluna ausente: nenhuma linha bate
+    return df[col].eq(value)
+
+
+def match_produto(needle: str) -> Optional[set[str]]:
+    """Descrições de produto (como estão no cache) que contêm `needle`.
 
-    Implementação:
-    - carrega DataFrame do cache persistente
-    - aplica filtros de forma vetorizada
-    - devolve records (dicts) com valores como strings (preserva parse_money no engine)
+    Usa o índice de trigramas; None se o índice não estiver disponível.
     """
-    import pandas as pd
+    index = _load_trigram_index()
+    if index is None:
+        return None
+    return set(index.match(needle))
+
 
-    df = _load_dataset_df()
+def _produto_mask(df: "pd.DataFrame", needle: str) -> "pd.Series":
+    """Máscara do filtro produto "contém", avaliada sobre os valores distintos."""
+    if "produto" not in df.columns:
+        return df["__dt"].isna()
+
+    s = df["produto"]
+    matched = match_produto(needle)
+    if matched is None:
+        # sem índice: varre só as categories (valores distintos), não as linhas
+        import pandas as pd
+
+        cats = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else pd.Index(s.dropna().unique())
+        q = normalize_search_text(needle)
+        matched = {c for c in cats.astype(str) if q in normalize_search_text(c)}
+
+    return s.isin(matched)
+
+
+def _filter_mask(df: "pd.DataFrame", filters: Filters) -> "pd.Series":
+    """Máscara booleana vetorizada equivalente aos filtros do dashboard."""
+    import pandas as pd
 
     # período
     d0 = pd.Timestamp(filters.periodo_inicio)
     d1 = pd.Timestamp(filters.periodo_fim)
     m = (df["__dt"] >= d0) & (df["__dt"] <= d1)
 
-    # UF origem/destino
+    # UF origem/destino (cache já guarda UF em maiúsculas)
     uf_or = _norm(filters.uf_origem)
     if uf_or:
-        m &= df.get("uf", "").astype(str).str.upper().eq(uf_or.upper())
+        m &= _col_eq(df, "uf", uf_or.upper())
 
     uf_de = _norm(filters.uf_destino)
     if uf_de:
-        m &= df.get("uf_dest", "").astype(str).str.upper().eq(uf_de.upper())
+        m &= _col_eq(df, "uf_dest", uf_de.upper())
 
     # NCM exato
     ncm = _norm(filters.ncm)
     if ncm:
-        m &= df.get("ncm", "").astype(str).str.strip().eq(ncm)
+        m &= _col_eq(df, "ncm", ncm)
 
-    # Produto contém
+    # Produto contém (sem acento / caixa alta)
     prod = _norm(filters.produto)
     if prod:
-        m &= df.get("produto", "").astype(str).str.upper().str.contains(prod.upper(), na=False)
+        m &= _produto_mask(df, prod)
 
     # CFOP exato
     cfop = _norm(filters.cfop)
     if cfop:
-        m &= df.get("cfop", "").astype(str).str.strip().eq(cfop)
+        m &= _col_eq(df, "cfop", cfop)
+
+    return m
+
+
+def query_dataset_frame(filters: Filters, columns: Optional[Sequence[str]] = None) -> "pd.DataFrame":
+    """Retorna o recorte filtrado como DataFrame tipado (API colunar).
+
+    - não materializa records nem faz cópia extra além da seleção das linhas
+    - money em float64, __dt datetime64, __month YYYY-MM, dimensões em category
+    - `columns` restringe as colunas devolvidas (ex.: só money + __month)
+    - filtros de igualdade seletivos usam os índices secundários (.idx)
+    - o resultado (posições de linha) fica num LRU chaveado por filtros + versão do CSV
+
+    O DataFrame retornado deve ser tratado como somente leitura.
+    """
+    import numpy as np
+
+    key = (_dataset_version(), _filters_key(filters))
+    cached = _RESULTS.get(key)
+
+    df, offset = _load_dataset_slice(period=(filters.periodo_inicio, filters.periodo_fim))
+
+    if cached is not None:
+        local = cached - offset
+    else:
+        positions = _index_positions(filters, offset, len(df))
+        if positions is not None:
+            # linhas candidatas pelo índice; a máscara completa verifica o resto
+            m = _filter_mask(df.iloc[positions], filters).to_numpy()
+            local = positions[m]
+        else:
+            local = np.flatnonzero(_filter_mask(df, filters).to_numpy())
 
-    out_df = df.loc[m].copy()
+        _RESULTS.put(key, local.astype(np.int64) + offset)
+
+    if columns is None:
+        return df.iloc[local]
+    return df.iloc[local, [df.columns.get_loc(c) for c in columns if c in df.columns]]
+
+
+def _equality_filters(filters: Filters) -> list[tuple[str, str]]:
+    """Filtros de igualdade normalizados como no cache: [(coluna, valor)]."""
+    equals: list[tuple[str, str]] = []
+
+    uf_or = _norm(filters.uf_origem)
+    if uf_or:
+        equals.append(("uf", uf_or.upper()))
+    uf_de = _norm(filters.uf_destino)
+    if uf_de:
+        equals.append(("uf_dest", uf_de.upper()))
+    ncm = _norm(filters.ncm)
+    if ncm:
+        equals.append(("ncm", ncm))
+    cfop = _norm(filters.cfop)
+    if cfop:
+        equals.append(("cfop", cfop))
+    return equals
+
+
+def query_cube(filters: Filters) -> Optional[tuple["pd.DataFrame", list[Filters]]]:
+    """Responde os filtros pelo cubo mensal: (células, recortes que exigem linhas).
+
+    - células: linhas do cubo (dimensões, somas de MONEY_COLUMNS, "rows", "dt_min",
+      "dt_max") dos meses inteiramente cobertos pelo período
+    - recortes: meses cobertos só em parte (bordas do período), com o período
+      reduzido ao mês; o chamador soma as linhas via iter_dataset_batches
+
+    None quando o cubo não atende (filtro produto "contém", que não é dimensão do
+    cubo, ou cubo indisponível): o chamador varre as linhas como antes.
+    """
+    import numpy as np
+
+    if _norm(filters.produto):
+        return None
+
+    _fresh_meta()
+    cube = _load_cube()
+    if cube is None:
+        return None
+
+    d0, d1 = filters.periodo_inicio, filters.periodo_fim
+    covered: list[str] = []
+    partial: list[Filters] = []
+    for month in months_for_period(d0, d1, cube["__month"].unique().tolist()):
+        year, mon = int(month[:4]), int(month[5:7])
+        first, last = date(year, mon, 1), date(year, mon, monthrange(year, mon)[1])
+        if d0 <= first and last <= d1:
+            covered.append(month)
+        else:
+            partial.append(replace(filters, periodo_inicio=max(d0, first), periodo_fim=min(d1, last)))
+
+    m = cube["__month"].isin(covered).to_numpy()
+    for col, value in _equality_filters(filters):
+        if col not in cube.columns:
+            m = np.zeros(len(cube), dtype=bool)
+            partial = []
+            break
+        m &= cube[col].eq(value).to_numpy()
+
+    return cube[m], partial
+
+
+def _term_matches(version: str, field: str, index: TermIndex, q: str) -> "np.ndarray":
+    """Ids dos termos que contêm `q` (normalizado), com cache de prefixos quentes.
+
+    A cada tecla o texto cresce: os termos que contêm "abcd" estão entre os que
+    contêm "abc", então o maior prefixo já em cache restringe a busca; sem
+    prefixo em cache, TermIndex.match parte dos trigramas dos termos.
+    """
+    if not q:
+        return index.match(q)
+
+    key = (version, "suggest", field, q)
+    cached = _RESULTS.get(key)
+    if cached is not None:
+        return cached
+
+    candidates = None
+    for k in range(len(q) - 1, 0, -1):
+        candidates = _RESULTS.get((version, "suggest", field, q[:k]))
+        if candidates is not None:
+            break
+
+    ids = index.match(q, candidates)
+    _RESULTS.put(key, ids)
+    return ids
+
+
+def _scope_term_metrics(version: str, scope: Filters, field: str) -> "np.ndarray":
+    """[ocorrências; receita] por id de termo de `field` no recorte período/UF `scope`.
+
+    Calculado uma vez por (versão, recorte), para todos os campos com índice de
+    termos numa só passada pelas linhas do recorte: as teclas seguintes e a troca
+    de campo reaproveitam.
+    """
+    import numpy as np
+
+    key = (version, _filters_key(scope))
+    metrics = _SCOPE_METRICS.get((*key, field))
+    if metrics is not None:
+        return metrics
+
+    indexes = _load_term_indexes() or {}
+    columns = ("__dt", TERM_REVENUE_COLUMN, *indexes)
+    for col, (count, revenue) in term_metrics(indexes, iter_dataset_batches(scope, columns)).items():
+        stacked = np.vstack([count, revenue]).astype(np.float64)
+        _SCOPE_METRICS.put((*key, col), stacked)
+        if col == field:
+            metrics = stacked
+    return metrics
+
+
+def suggest_terms(field: str, q: str, filters: Filters, limit: int = 10, rank: str = "receita") -> list[str]:
+    """Sugestões de autocomplete para `field` (produto/ncm/cfop) que contêm `q`.
+
+    - termos, ocorrências e receita vêm do índice de termos (.terms, gerado no build)
+    - ordem: termos que começam com `q`, depois os que só contêm; em cada grupo,
+      por receita (vprod) ou ocorrências (`rank`: "receita" | "ocorrencias")
+    - recorte período/UF de `filters` (demais filtros são ignorados): só termos com
+      linhas no recorte, ordenados pelas contagens do recorte (uma passada
+      vetorizada pelas linhas por recorte, _scope_term_metrics)
+    - sem índice (cache anterior a ele): monta os termos das linhas do recorte
+    """
+    import numpy as np
+    import pandas as pd
+
+    version = _dataset_version()
+    scope = Filters(
+        periodo_inicio=filters.periodo_inicio,
+        periodo_fim=filters.periodo_fim,
+        uf_origem=filters.uf_origem,
+        uf_destino=filters.uf_destino,
+    )
+    columns = ("__dt", TERM_REVENUE_COLUMN, field)
+
+    q = normalize_search_text(q)
+
+    index = (_load_term_indexes() or {}).get(field)
+    if index is None:
+        # termos só deste recorte: ids não valem para o cache de prefixos, e montar
+        # trigramas para uma consulta só custa mais que conferir todos os termos
+        index = build_term_indexes(iter_dataset_batches(scope, columns), (field,)).get(field)
+        if index is None:
+            return []
+        every = np.arange(len(index.terms), dtype=np.int64)
+        return index.top(index.match(q, every), index.count, index.revenue, q, limit, rank)
+
+    # recorte que cobre a base inteira: contagens do próprio índice
+    whole = (
+        not _norm(scope.uf_origem)
+        and not _norm(scope.uf_destino)
+        and (index.dt_min is None or pd.Timestamp(scope.periodo_inicio) <= pd.Timestamp(index.dt_min))
+        and (index.dt_max is None or pd.Timestamp(scope.periodo_fim) >= pd.Timestamp(index.dt_max))
+    )
+    if whole:
+        count, revenue = index.count, index.revenue
+    else:
+        count, revenue = _scope_term_metrics(version, scope, field)
+
+    return index.top(_term_matches(version, field, index, q), count, revenue, q, limit, rank)
+
+
+def _is_chunked() -> bool:
+    """True se o cache está em modo out-of-core (reconstrói o cache se estiver velho)."""
+    return _fresh_meta().get("mode") == "chunked"
+
+
+def iter_dataset_batches(
+    filters: Filters,
+    columns: Optional[Sequence[str]] = None,
+    batch_rows: Optional[int] = None,
+) -> Iterator["pd.DataFrame"]:
+    """Gera o recorte filtrado em lotes de DataFrame (caminho out-of-core).
+
+    - modo "memory": um único lote, igual a query_dataset_frame
+    - modo "chunked": percorre só as partições mensais do período, em lotes de
+      até `batch_rows` linhas (settings.dataset_batch_rows), aplicando a máscara por lote
+
+    Os lotes saem na ordem canônica; lotes vazios são omitidos. O consumidor deve
+    agregar incrementalmente (memória limitada ao lote).
+    """
+    if not _is_chunked():
+        frame = query_dataset_frame(filters, columns)
+        if len(frame):
+            yield frame
+        return
+
+    import pyarrow.parquet as pq
+
+    _, pq_dir, _ = _cache_paths(DATASET_PATH)
+    cached_months = list((_fresh_meta().get("months") or {}).keys())
+    wanted = months_for_period(filters.periodo_inicio, filters.periodo_fim, cached_months)
+
+    # colunas lidas: as pedidas + as usadas pela máscara
+    read_cols = None
+    if columns is not None:
+        needed = set(columns) | {"__dt", "uf", "uf_dest", "ncm", "cfop", "produto"}
+        needed.discard(PARTITION_COLUMN)
+
+    for month in wanted:
+        for path in _partition_files(pq_dir, month):
+            pf = pq.ParquetFile(path)
+            if columns is not None:
+                read_cols = [c for c in pf.schema_arrow.names if c in needed]
+
+            for batch in pf.iter_batches(batch_size=int(batch_rows or settings.dataset_batch_rows), columns=read_cols):
+                df = batch.to_pandas()
+                df[PARTITION_COLUMN] = month
+
+                out = df[_filter_mask(df, filters).to_numpy()]
+                if columns is not None:
+                    out = out[[c for c in columns if c in out.columns]]
+                if len(out):
+                    yield out
+
+
+def _dataset_version() -> str:
+    """Versão do cache atual (chave do LRU de resultados)."""
+    return _fresh_meta()["version"]
+
+
+def _filters_key(filters: Filters) -> tuple:
+    """Forma canônica dos filtros (mesma normalização aplicada pela máscara)."""
+    uf_or = _norm(filters.uf_origem)
+    uf_de = _norm(filters.uf_destino)
+    prod = _norm(filters.produto)
+    return (
+        filters.periodo_inicio.isoformat(),
+        filters.periodo_fim.isoformat(),
+        uf_or.upper() if uf_or else None,
+        uf_de.upper() if uf_de else None,
+        _norm(filters.ncm),
+        normalize_search_text(prod) if prod else None,
+        _norm(filters.cfop),
+    )
+
+
+def result_cache_stats() -> dict:
+    """Contadores do cache de resultados (hits/misses/entradas/bytes)."""
+    return _RESULTS.stats()
+
+
+def _index_positions(filters: Filters, offset: int, length: int) -> Optional["np.ndarray"]:
+    """Posições locais (0..length) candidatas via índice, ou None para usar só a máscara."""
+    equals = _equality_filters(filters)
+    if not equals:
+        return None
+
+    index = _load_index()
+    if index is None:
+        return None
+
+    positions = plan_positions(index, equals, max_selectivity=float(settings.dataset_index_max_selectivity))
+    if positions is None:
+        return None
+
+    # recorta para a fatia carregada (partições do período) e converte para posição local
+    lo, hi = positions.searchsorted([offset, offset + length])
+    return positions[lo:hi] - offset
+
+
+def query_dataset(filters: Filters) -> list[dict]:
+    """Retorna list[dict] compatível com o engine (legado).
+
+    Prefira query_dataset_frame: esta função materializa um dict por linha.
+    """
+    out_df = query_dataset_frame(filters)
 
     # Remove colunas internas antes de serializar
-    for col in ("__dt", "__month"):
-        if col in out_df.columns:
-            out_df.drop(columns=[col], inplace=True)
+    out_df = out_df.drop(columns=[c for c in INTERNAL_COLUMNS if c in out_df.columns])
 
-    # Converte NaN -> "" para manter semântica do engine (parse_money trata vazio)
+    # category -> object para permitir o preenchimento com ""
+    for col in out_df.select_dtypes("category").columns:
+        out_df[col] = out_df[col].astype(object)
+
+    # Converte NaN -> "" nas colunas texto (parse_money trata vazio; money já é float)
     out_df = out_df.where(out_df.notna(), "")
 
     return out_df.to_dict("records")
 
 
+def sum_money(frame: "pd.DataFrame", field: str) -> float:
+    """Soma vetorizada de uma coluna monetária do recorte (já em float64)."""
+    if field not in frame.columns:
+        return 0.0
+    return float(frame[field].sum())
+
+
 def sum_field(rows: Iterable[dict], field: str) -> float:
     total = 0.0
     for r in rows:
@@ -0,0 +1,108 @@
+# backend/app/storage/dataset_cube.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+# Dimensões do cubo mensal (células = combinações presentes na base)
+CUBE_DIMENSIONS = ("__month", "uf", "uf_dest", "cfop", "ncm", "movimento")
+
+# Medidas além das somas monetárias: nº de linhas e datas extremas de cada célula
+CUBE_COUNT = "rows"
+CUBE_DT_MIN = "dt_min"
+CUBE_DT_MAX = "dt_max"
+
+
+def _group_cells(df: "pd.DataFrame", dims: Sequence[str], measures: Sequence[str]) -> "pd.DataFrame":
+    g = df.groupby(list(dims), observed=True, sort=False, dropna=False)
+    out = g[list(measures)].sum()
+    out[CUBE_COUNT] = g.size()
+    out[CUBE_DT_MIN] = g["__dt"].min()
+    out[CUBE_DT_MAX] = g["__dt"].max()
+    return out.reset_index()
+
+
+def build_cube(frames: Iterable["pd.DataFrame"], measures: Sequence[str]) -> "pd.DataFrame":
+    """Agrega os blocos do cache (tipados, com __dt e __month) no cubo mensal.
+
+    Cada bloco vira células parciais (somas, contagem, min/max de __dt), somadas
+    no fim: a memória fica limitada ao bloco + células. Dimensões ausentes na base
+    ficam fora do cubo (filtro nelas não encontra linhas, como no cache).
+    """
+    import pandas as pd
+
+    parts = []
+    dims: list[str] = []
+    cols: list[str] = []
+    for df in frames:
+        if not len(df):
+            continue
+        dims = [c for c in CUBE_DIMENSIONS if c in df.columns]
+        cols = [c for c in measures if c in df.columns]
+        parts.append(_group_cells(df, dims, cols))
+
+    if not parts:
+        return pd.DataFrame(columns=[*CUBE_DIMENSIONS, *measures, CUBE_COUNT, CUBE_DT_MIN, CUBE_DT_MAX])
+
+    cube = pd.concat(parts, ignore_index=True)
+    for col in dims:
+        cube[col] = cube[col].astype(object).fillna("").astype(str)
+
+    if len(parts) > 1:
+        g = cube.groupby(dims, sort=False)
+        agg = {c: "sum" for c in cols}
+        agg.update({CUBE_COUNT: "sum", CUBE_DT_MIN: "min", CUBE_DT_MAX: "max"})
+        cube = g.agg(agg).reset_index()
+
+    return cube.sort_values(dims, kind="stable", ignore_index=True)
+
+
+def save_cube(path: Path, cube: "pd.DataFrame") -> None:
+    """Grava o cubo como .npz (sem pickle): dimensões como valores + códigos."""
+    import numpy as np
+    import pandas as pd
+
+    arrays = {}
+    for col in cube.columns:
+        s = cube[col]
+        if col in CUBE_DIMENSIONS:
+            cat = pd.Categorical(s.astype(str))
+            arrays[f"{col}.values"] = np.asarray(cat.categories, dtype=str)
+            arrays[f"{col}.codes"] = cat.codes.astype(np.int32)
+        elif col in (CUBE_DT_MIN, CUBE_DT_MAX):
+            arrays[col] = s.to_numpy(dtype="datetime64[ns]")
+        elif col == CUBE_COUNT:
+            arrays[col] = s.to_numpy(dtype=np.int64)
+        else:
+            arrays[col] = s.to_numpy(dtype=np.float64)
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    tmp.replace(path)
+
+
+def load_cube(path: Path) -> Optional["pd.DataFrame"]:
+    """Cubo gravado (save_cube); __month volta como texto e as demais dimensões como category."""
+    import numpy as np
+    import pandas as pd
+
+    if not path.exists():
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            data = {}
+            for name in z.files:
+                if name.endswith(".codes"):
+                    continue
+                if name.endswith(".values"):
+                    col = name[: -len(".values")]
+                    cat = pd.Categorical.from_codes(z[f"{col}.codes"], categories=z[name])
+                    data[col] = cat.astype(str) if col == "__month" else cat
+                else:
+                    data[name] = z[name]
+        order = [c for c in CUBE_DIMENSIONS if c in data] + [c for c in data if c not in CUBE_DIMENSIONS]
+        return pd.DataFrame({c: data[c] for c in order})
+    except Exception:
+        return None
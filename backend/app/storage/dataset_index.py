@@ -0,0 +1,159 @@
+# backend/app/storage/dataset_index.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Colunas com índice secundário (valor -> posições de linha no cache)
+INDEXED_COLUMNS = ("uf", "uf_dest", "ncm", "cfop")
+
+
+@dataclass
+class ColumnIndex:
+    """Listas invertidas de uma coluna em formato CSR.
+
+    values[i] tem as posições positions[offsets[i]:offsets[i + 1]] (crescentes),
+    onde posição = linha na ordem canônica do cache (mês, depois ordem do CSV).
+    """
+
+    values: "np.ndarray"
+    offsets: "np.ndarray"
+    positions: "np.ndarray"
+    _lookup: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self._lookup:
+            self._lookup = {str(v): i for i, v in enumerate(self.values.tolist())}
+
+    def postings(self, value: str) -> "np.ndarray":
+        i = self._lookup.get(value)
+        if i is None:
+            return self.positions[0:0]
+        return self.positions[self.offsets[i]: self.offsets[i + 1]]
+
+
+@dataclass
+class DatasetIndex:
+    rows: int
+    columns: Dict[str, ColumnIndex]
+
+
+def _position_dtype(rows: int):
+    import numpy as np
+
+    return np.int32 if rows < 2**31 else np.int64
+
+
+def build_index(df: "pd.DataFrame", columns: Sequence[str] = INDEXED_COLUMNS) -> DatasetIndex:
+    """Monta o índice a partir do DataFrame na ordem canônica do cache."""
+    import numpy as np
+    import pandas as pd
+
+    rows = int(len(df))
+    pos_dtype = _position_dtype(rows)
+    out: Dict[str, ColumnIndex] = {}
+
+    for col in columns:
+        if col not in df.columns:
+            continue
+
+        s = df[col]
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype("category")
+
+        codes = s.cat.codes.to_numpy()
+        valid = codes >= 0
+
+        # argsort estável: dentro de cada valor, posições já saem crescentes
+        order = np.argsort(codes, kind="stable").astype(pos_dtype)
+        order = order[valid[order]]
+
+        counts = np.bincount(codes[valid], minlength=len(s.cat.categories))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        values = np.asarray([str(v) for v in s.cat.categories], dtype=str)
+        out[col] = ColumnIndex(values=values, offsets=offsets, positions=order)
+
+    return DatasetIndex(rows=rows, columns=out)
+
+
+def save_index(path: Path, index: DatasetIndex) -> None:
+    """Grava o índice como .npz (sem pickle)."""
+    import numpy as np
+
+    arrays = {"__rows": np.asarray([index.rows], dtype=np.int64)}
+    for col, ci in index.columns.items():
+        arrays[f"{col}.values"] = ci.values
+        arrays[f"{col}.offsets"] = ci.offsets
+        arrays[f"{col}.positions"] = ci.positions
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    tmp.replace(path)
+
+
+def load_index(path: Path) -> Optional[DatasetIndex]:
+    import numpy as np
+
+    if not path.exists():
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            rows = int(z["__rows"][0])
+            cols: Dict[str, ColumnIndex] = {}
+            for name in z.files:
+                if not name.endswith(".values"):
+                    continue
+                col = name[: -len(".values")]
+                cols[col] = ColumnIndex(
+                    values=z[f"{col}.values"],
+                    offsets=z[f"{col}.offsets"],
+                    positions=z[f"{col}.positions"],
+                )
+        return DatasetIndex(rows=rows, columns=cols)
+    except Exception:
+        return None
+
+
+def plan_positions(
+    index: DatasetIndex,
+    equals: Sequence[Tuple[str, str]],
+    *,
+    max_selectivity: float,
+) -> Optional["np.ndarray"]:
+    """Planejador simples para filtros de igualdade.
+
+    - usa só as listas seletivas (len <= max_selectivity * rows)
+    - intersecta da menor para a maior
+    - devolve None quando nenhum filtro é seletivo (chamador usa a máscara)
+
+    O resultado é um superconjunto das linhas finais: filtros não usados aqui
+    (período, produto, igualdades pouco seletivas) são verificados pelo chamador.
+    """
+    import numpy as np
+
+    limit = max_selectivity * max(1, index.rows)
+    lists: List["np.ndarray"] = []
+
+    for col, value in equals:
+        ci = index.columns.get(col)
+        if ci is None:
+            continue
+        p = ci.postings(value)
+        if len(p) <= limit:
+            lists.append(p)
+
+    if not lists:
+        return None
+
+    lists.sort(key=len)
+    out = lists[0]
+    for p in lists[1:]:
+        if len(out) == 0:
+            break
+        out = np.intersect1d(out, p, assume_unique=True)
+    return out
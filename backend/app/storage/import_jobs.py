@@ -0,0 +1,117 @@
+# backend/app/storage/import_jobs.py
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from app.core.dataset import DATA_DIR
+
+# Um JSON por job (+ o upload em spool enquanto o job não termina)
+JOBS_DIR = DATA_DIR / "import_jobs"
+
+FINISHED_STATUSES = ("done", "failed")
+
+# Jobs finalizados mantidos no disco (os mais recentes)
+_HISTORY = 100
+
+_LOCK = threading.Lock()
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _valid_id(job_id: str) -> bool:
+    # ids são uuid hex: impede caminhos arbitrários vindos da URL
+    return bool(job_id) and job_id.isalnum()
+
+
+def _job_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.json"
+
+
+def upload_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.upload"
+
+
+def job_lock_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.lock"
+
+
+def _read(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def _write(job: dict) -> None:
+    # write-then-rename: GET em outro worker nunca lê o JSON pela metade
+    path = _job_path(job["id"])
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(job, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def create_job(job_id: str, **fields) -> dict:
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "bytes_total": 0,
+        "bytes_read": 0,
+        "rows_processed": 0,
+        "rejected_rows": 0,
+        "imported_rows": 0,
+        "duplicate_rows": 0,
+        "bad_lines": 0,
+        "error": None,
+        **fields,
+    }
+    with _LOCK:
+        _write(job)
+        _prune()
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    if not _valid_id(job_id):
+        return None
+    return _read(_job_path(job_id))
+
+
+def update_job(job_id: str, **fields) -> Optional[dict]:
+    with _LOCK:
+        job = _read(_job_path(job_id))
+        if job is None:
+            return None
+        job.update(fields)
+        _write(job)
+        return job
+
+
+def list_jobs(statuses: Optional[Sequence[str]] = None) -> List[dict]:
+    """Jobs gravados, do mais antigo para o mais recente."""
+    if not JOBS_DIR.exists():
+        return []
+    jobs = [j for j in (_read(p) for p in JOBS_DIR.glob("*.json")) if j is not None]
+    if statuses is not None:
+        jobs = [j for j in jobs if j.get("status") in statuses]
+    return sorted(jobs, key=lambda j: j.get("created_at") or 0)
+
+
+def _prune() -> None:
+    finished = list_jobs(FINISHED_STATUSES)
+    for job in finished[: max(0, len(finished) - _HISTORY)]:
+        for path in (_job_path(job["id"]), upload_path(job["id"]), job_lock_path(job["id"])):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
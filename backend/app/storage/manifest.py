@@ -0,0 +1,295 @@
+# backend/app/storage/manifest.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.number import parse_money_series_nan
+
+# Mesmas colunas/regras do resumo (/database/summary)
+MANIFEST_MONEY_COLUMNS = {
+    "receita_total": "vprod",
+    "icms_total": "vicms_icms",
+    "pis_total": "vpis",
+    "cofins_total": "vcofins",
+}
+
+# Formatos aceitos pelo resumo (database_service._parse_date)
+SUMMARY_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%Y%m%d")
+
+# Amostra de linhas problemáticas guardada no manifesto, por tipo de problema
+QUALITY_SAMPLE_PER_ISSUE = 20
+
+# Texto guardado de cada linha malformada na amostra
+BAD_LINE_SAMPLE_CHARS = 500
+
+
+def raw_row_keys(raw: "pd.DataFrame") -> "np.ndarray":
+    """Chave uint64 do conteúdo cru de cada linha (colunas canônicas, sem as "__*").
+
+    Identifica linhas que não entram no cache (data inválida) para o import
+    incremental ignorar as já vistas. Valores comparados com strip e sem
+    diferenciar maiúsculas: o bloco cru pode já ter passado por _normalize_chunk.
+    """
+    import pandas as pd
+    from pandas.util import hash_pandas_object
+
+    content = pd.DataFrame(index=raw.index)
+    for col in sorted(c for c in raw.columns if not str(c).startswith("__")):
+        s = raw[col].astype(object)
+        content[col] = s.where(s.notna(), "").astype(str).str.strip().str.upper()
+    return hash_pandas_object(content, index=False).to_numpy()
+
+
+def bad_line_keys(lines: Sequence[Tuple[int, str]]) -> "np.ndarray":
+    """Chave uint64 do texto (com strip) de cada linha malformada [(nº, texto)]."""
+    import pandas as pd
+    from pandas.util import hash_pandas_object
+
+    texts = pd.Series([text.strip() for _, text in lines], dtype=object)
+    return hash_pandas_object(texts, index=False).to_numpy()
+
+
+class ManifestBuilder:
+    """Acumula, bloco a bloco, as estatísticas do CSV canônico para o manifesto.
+
+    Recebe os blocos crus (tudo string, antes da tipagem do cache), então cobre
+    todas as linhas do arquivo, inclusive as descartadas por data inválida:
+    - rows, min/max de dhemi, UFs distintas, totais monetários
+    - nulls: linhas vazias/ausentes por coluna
+    - qualidade: valores monetários inválidos (contam como 0) e, via
+      add_rejected, linhas descartadas por data inválida; via add_bad_lines,
+      linhas malformadas (campos a mais) que o parser pulou; com amostra limitada
+      das linhas (QUALITY_SAMPLE_PER_ISSUE por problema)
+
+    "record" nas amostras é a posição da linha (1-based) na sequência de linhas
+    recebidas pela base (imports incrementais continuam a contagem). Linhas
+    malformadas não viram registro: a amostra traz "line", o nº da linha no
+    arquivo importado.
+
+    Guarda também as chaves (raw_row_keys / bad_line_keys) das linhas rejeitadas
+    e malformadas, gravadas à parte (save_rejected_keys): o import incremental
+    ignora as já vistas.
+    """
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.min_dt = None
+        self.max_dt = None
+        self.ufs_origem: Set[str] = set()
+        self.ufs_destino: Set[str] = set()
+        self.totals: Dict[str, float] = {k: 0.0 for k in MANIFEST_MONEY_COLUMNS}
+        self.nulls: Dict[str, int] = {}
+        self.date_invalid = 0
+        self.bad_lines = 0
+        self.money_invalid: Dict[str, int] = {}
+        self.samples: List[dict] = []
+        self._chunk_start = 0
+        self._rejected_keys: List["np.ndarray"] = []
+        self._bad_line_keys: List["np.ndarray"] = []
+
+    def add(self, raw: "pd.DataFrame") -> None:
+        import pandas as pd
+
+        self._chunk_start = self.rows
+        self.rows += int(len(raw))
+
+        for col in raw.columns:
+            s = raw[col]
+            empty = s.isna() | (s.astype(str).str.strip() == "")
+            self.nulls[col] = self.nulls.get(col, 0) + int(empty.sum())
+
+        if "dhemi" in raw.columns:
+            txt = raw["dhemi"].fillna("").astype(str).str.strip()
+            dt = None
+            for fmt in SUMMARY_DATE_FORMATS:
+                parsed = pd.to_datetime(txt, format=fmt, errors="coerce")
+                dt = parsed if dt is None else dt.fillna(parsed)
+            lo, hi = dt.min(), dt.max()
+            if pd.notna(lo):
+                self.min_dt = lo if self.min_dt is None else min(self.min_dt, lo)
+                self.max_dt = hi if self.max_dt is None else max(self.max_dt, hi)
+
+        for col, target in (("uf", self.ufs_origem), ("uf_dest", self.ufs_destino)):
+            if col in raw.columns:
+                vals = raw[col].dropna().astype(str).str.strip().str.upper().unique()
+                target.update(v for v in vals if v)
+
+        for key, col in MANIFEST_MONEY_COLUMNS.items():
+            if col not in raw.columns:
+                continue
+            values = parse_money_series_nan(raw[col])
+            self.totals[key] += float(values.fillna(0.0).sum())
+
+            # preenchido mas não numérico: entra como 0 no cache
+            bad = (values.isna() & (raw[col].fillna("").astype(str).str.strip() != "")).to_numpy()
+            if bad.any():
+                self.money_invalid[col] = self.money_invalid.get(col, 0) + int(bad.sum())
+                self._sample(raw, bad, "money_invalid", col)
+
+    def add_rejected(self, raw: "pd.DataFrame", kept: "pd.Index") -> None:
+        """Registra as linhas do último bloco (add) que não entraram no cache.
+
+        `kept` é o índice das linhas tipadas (após _normalize_chunk); as demais
+        foram descartadas por data vazia/inválida.
+        """
+        dropped = ~raw.index.isin(kept)
+        if dropped.any():
+            self.date_invalid += int(dropped.sum())
+            self._rejected_keys.append(raw_row_keys(raw[dropped]))
+            date_col = next((c for c in ("dhemi", "dtemi", "dt_emissao") if c in raw.columns), None)
+            self._sample(raw, dropped, "date_invalid", date_col)
+
+    def add_bad_lines(self, lines: Sequence[Tuple[int, str]]) -> None:
+        """Registra linhas malformadas puladas no parse: [(nº da linha no arquivo, texto)]."""
+        if not lines:
+            return
+        self.bad_lines += len(lines)
+        self._bad_line_keys.append(bad_line_keys(lines))
+
+        room = QUALITY_SAMPLE_PER_ISSUE - sum(1 for x in self.samples if x["issue"] == "bad_line")
+        for line, text in list(lines)[: max(0, room)]:
+            self.samples.append({
+                "record": None,
+                "line": int(line),
+                "issue": "bad_line",
+                "column": None,
+                "value": text[:BAD_LINE_SAMPLE_CHARS],
+                "row": {},
+            })
+
+    def _sample(self, raw: "pd.DataFrame", mask: "np.ndarray", issue: str, column: Optional[str]) -> None:
+        import numpy as np
+        import pandas as pd
+
+        room = QUALITY_SAMPLE_PER_ISSUE - sum(1 for x in self.samples if x["issue"] == issue)
+        if room <= 0:
+            return
+
+        cols = [c for c in raw.columns if not str(c).startswith("__")]
+        for pos in np.flatnonzero(mask)[:room].tolist():
+            row = raw.iloc[pos]
+            values = {c: ("" if pd.isna(row[c]) else str(row[c])) for c in cols}
+            self.samples.append({
+                "record": self._chunk_start + pos + 1,
+                "issue": issue,
+                "column": column,
+                "value": values.get(column, "") if column else "",
+                "row": values,
+            })
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ManifestBuilder":
+        """Retoma um manifesto gravado (to_dict), ex.: para somar um import incremental."""
+        import pandas as pd
+
+        builder = cls()
+        builder.rows = int(data.get("rows") or 0)
+        if data.get("min_date"):
+            builder.min_dt = pd.Timestamp(data["min_date"])
+        if data.get("max_date"):
+            builder.max_dt = pd.Timestamp(data["max_date"])
+        builder.ufs_origem = set(data.get("ufs_origem") or [])
+        builder.ufs_destino = set(data.get("ufs_destino") or [])
+        builder.totals.update({k: float(v) for k, v in (data.get("totals") or {}).items()})
+        builder.nulls = {k: int(v) for k, v in (data.get("nulls") or {}).items()}
+
+        quality = data.get("quality") or {}
+        builder.date_invalid = int(quality.get("date_invalid") or 0)
+        builder.bad_lines = int(quality.get("bad_lines") or 0)
+        builder.money_invalid = {k: int(v) for k, v in (quality.get("money_invalid") or {}).items()}
+        builder.samples = list(quality.get("samples") or [])
+        return builder
+
+    def merge(self, other: "ManifestBuilder", line_offset: int = 0) -> None:
+        """Soma um manifesto parcial (ex.: de outro processo do build paralelo).
+
+        `line_offset`: linhas do arquivo antes do trecho do parcial (nº das linhas
+        malformadas da amostra).
+        """
+        offset = self.rows
+        self.rows += other.rows
+        for dt in (other.min_dt, other.max_dt):
+            if dt is None:
+                continue
+            self.min_dt = dt if self.min_dt is None else min(self.min_dt, dt)
+            self.max_dt = dt if self.max_dt is None else max(self.max_dt, dt)
+        self.ufs_origem |= other.ufs_origem
+        self.ufs_destino |= other.ufs_destino
+        for k, v in other.totals.items():
+            self.totals[k] = self.totals.get(k, 0.0) + v
+        for k, v in other.nulls.items():
+            self.nulls[k] = self.nulls.get(k, 0) + v
+
+        self.date_invalid += other.date_invalid
+        self.bad_lines += other.bad_lines
+        self._rejected_keys.extend(other._rejected_keys)
+        self._bad_line_keys.extend(other._bad_line_keys)
+        for k, v in other.money_invalid.items():
+            self.money_invalid[k] = self.money_invalid.get(k, 0) + v
+        # amostras do parcial: posições relativas ao seu trecho do arquivo
+        for sample in other.samples:
+            issue = sample["issue"]
+            if sum(1 for x in self.samples if x["issue"] == issue) < QUALITY_SAMPLE_PER_ISSUE:
+                if sample.get("line") is not None:
+                    self.samples.append({**sample, "line": sample["line"] + line_offset})
+                else:
+                    self.samples.append({**sample, "record": sample["record"] + offset})
+
+    def add_keys(self, rejected: "np.ndarray", bad_lines: "np.ndarray") -> None:
+        """Soma chaves já gravadas (load_rejected_keys) às deste manifesto."""
+        self._rejected_keys.append(rejected)
+        self._bad_line_keys.append(bad_lines)
+
+    def keys(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(chaves das linhas rejeitadas, chaves das linhas malformadas), sem repetição."""
+        import numpy as np
+
+        return tuple(
+            np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.uint64)
+            for arrays in (self._rejected_keys, self._bad_line_keys)
+        )
+
+    def to_dict(self, valid_rows: Optional[int] = None) -> dict:
+        return {
+            "rows": int(self.rows),
+            # linhas com data válida (as que entram no cache/consultas)
+            "valid_rows": int(self.rows if valid_rows is None else valid_rows),
+            "min_date": self.min_dt.date().isoformat() if self.min_dt is not None else None,
+            "max_date": self.max_dt.date().isoformat() if self.max_dt is not None else None,
+            "ufs_origem": sorted(self.ufs_origem),
+            "ufs_destino": sorted(self.ufs_destino),
+            "totals": {k: float(v) for k, v in self.totals.items()},
+            "nulls": dict(self.nulls),
+            "quality": {
+                "date_invalid": int(self.date_invalid),
+                "bad_lines": int(self.bad_lines),
+                "money_invalid": dict(self.money_invalid),
+                "samples": list(self.samples),
+            },
+        }
+
+
+def save_rejected_keys(path: Path, manifest: ManifestBuilder) -> None:
+    """Grava as chaves das linhas rejeitadas/malformadas do manifesto (.npz, sem pickle)."""
+    import numpy as np
+
+    rejected, bad_lines = manifest.keys()
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, rejected=rejected, bad_lines=bad_lines)
+    tmp.replace(path)
+
+
+def load_rejected_keys(path: Path) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Chaves gravadas por save_rejected_keys; vazias se o arquivo não existir ou falhar."""
+    import numpy as np
+
+    empty = np.empty(0, dtype=np.uint64)
+    if not path.exists():
+        return empty, empty
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            return z["rejected"], z["bad_lines"]
+    except Exception:
+        return empty, empty
@@ -0,0 +1,303 @@
+# backend/app/storage/term_index.py
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.aggregation import top_k_indices
+from app.core.formatters import normalize_search_text
+from app.storage.text_index import TrigramIndex, build_trigram_index
+
+# Campos com índice de termos (autocomplete do dashboard)
+TERM_FIELDS = ("produto", "ncm", "cfop")
+
+# Coluna somada como "receita" de cada termo
+TERM_REVENUE_COLUMN = "vprod"
+
+# Critérios de ordenação das sugestões
+TERM_RANKS = ("receita", "ocorrencias")
+
+# Limite superior para prefixo (bisect): maior code point
+_MAX_CHAR = "\U0010ffff"
+
+# Separador dos termos gravados (um blob UTF-8; removido dos termos no build)
+_SEP = "\x00"
+
+
+@dataclass
+class TermIndex:
+    """Termos distintos de uma coluna, ordenados pelo texto normalizado.
+
+    - terms: valor exibido (a grafia mais frequente entre as que diferem só na caixa)
+    - norm_terms: normalize_search_text(term), em ordem crescente: um prefixo é um
+      intervalo contíguo de ids (bisect)
+    - count/revenue: ocorrências e soma de vprod de cada termo na base inteira
+    - dt_min/dt_max: período coberto pelas contagens (base inteira)
+    """
+
+    terms: List[str]
+    norm_terms: List[str]
+    count: "np.ndarray"
+    revenue: "np.ndarray"
+    dt_min: Optional["np.datetime64"] = None
+    dt_max: Optional["np.datetime64"] = None
+    _keys: Optional["pd.Index"] = field(default=None, repr=False)
+    _last: Optional[tuple] = field(default=None, repr=False)
+    _trigrams: Optional[TrigramIndex] = field(default=None, repr=False)
+
+    def ids_for(self, values: Sequence[str]) -> "np.ndarray":
+        """Id de cada valor (como está no cache); -1 se não indexado (ex.: vazio).
+
+        Lookup vetorizado (hash do pandas) sobre a chave em minúsculas. O último
+        resultado fica guardado pelo objeto `values`: as categories do DataFrame em
+        memória são as mesmas a cada consulta, então o mapeamento sai uma vez só.
+        """
+        import numpy as np
+        import pandas as pd
+
+        last = self._last
+        if last is not None and last[0] is values:
+            return last[1]
+
+        if self._keys is None:
+            self._keys = pd.Index(self.terms).str.lower()
+        wanted = pd.Index(values).astype(str).str.strip().str.lower()
+        ids = self._keys.get_indexer(wanted).astype(np.int64)
+        self._last = (values, ids)
+        return ids
+
+    def prefix_range(self, q: str) -> Tuple[int, int]:
+        """[lo, hi) dos ids cujo texto normalizado começa com `q` (já normalizado)."""
+        return bisect_left(self.norm_terms, q), bisect_left(self.norm_terms, q + _MAX_CHAR)
+
+    def match(self, q: str, candidates: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """Ids (crescentes) dos termos que contêm `q` (já normalizado), entre `candidates` se informado.
+
+        Os que começam com `q` são um intervalo de ids (prefix_range) e dispensam
+        conferência; os demais candidatos vêm dos trigramas dos termos (montados
+        uma vez por índice) e só eles são conferidos. Com menos de 3 caracteres
+        não há trigrama: confere todos os termos fora do prefixo.
+        """
+        import numpy as np
+
+        if candidates is None:
+            candidates = self._trigram_index().candidates(q) if q else None
+            if candidates is None:
+                candidates = np.arange(len(self.terms), dtype=np.int64)
+        candidates = np.asarray(candidates, dtype=np.int64)
+        if not q:
+            return candidates
+
+        lo, hi = self.prefix_range(q)
+        prefix = (candidates >= lo) & (candidates < hi)
+        rest = candidates[~prefix]
+        norm = self.norm_terms
+        found = np.fromiter((q in norm[i] for i in rest.tolist()), dtype=bool, count=len(rest))
+        return np.union1d(candidates[prefix], rest[found])
+
+    def _trigram_index(self) -> TrigramIndex:
+        if self._trigrams is None:
+            self._trigrams = build_trigram_index(self.terms, self.norm_terms)
+        return self._trigrams
+
+    def top(
+        self,
+        ids: "np.ndarray",
+        count: "np.ndarray",
+        revenue: "np.ndarray",
+        q: str,
+        limit: int,
+        rank: str = "receita",
+    ) -> List[str]:
+        """Melhores `limit` termos entre `ids`: prefixo antes de "contém", depois por
+        receita ou ocorrências (decrescente) e, no empate, pela ordem alfabética."""
+        import numpy as np
+
+        ids = ids[count[ids] > 0]
+        metric = revenue if rank == "receita" else count
+
+        # ids seguem a ordem alfabética: os de prefixo formam um trecho contíguo
+        lo, hi = self.prefix_range(q)
+        a, b = np.searchsorted(ids, [lo, hi])
+
+        out: List[int] = []
+        for group in (ids[a:b], np.concatenate([ids[:a], ids[b:]])):
+            need = int(limit) - len(out)
+            if need <= 0:
+                break
+            out.extend(_best(group, metric, need))
+        return [self.terms[i] for i in out]
+
+
+def _best(ids: "np.ndarray", metric: "np.ndarray", k: int) -> List[int]:
+    """Os `k` ids de maior métrica (empate: menor id), sem ordenar o grupo inteiro."""
+    return ids[top_k_indices(metric[ids], k)].tolist()
+
+
+def _frame_counts(frame: "pd.DataFrame", col: str) -> Tuple["pd.Index", "np.ndarray", "np.ndarray"]:
+    """(valores distintos, ocorrências, receita) de `col` no bloco, via códigos de category."""
+    import numpy as np
+    import pandas as pd
+
+    s = frame[col]
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+
+    codes = s.cat.codes.to_numpy()
+    valid = codes >= 0
+    n = len(s.cat.categories)
+
+    if TERM_REVENUE_COLUMN in frame.columns:
+        weights = frame[TERM_REVENUE_COLUMN].to_numpy(dtype=np.float64)[valid]
+    else:
+        weights = np.zeros(int(valid.sum()))
+
+    count = np.bincount(codes[valid], minlength=n)
+    revenue = np.bincount(codes[valid], weights=weights, minlength=n)
+    return s.cat.categories, count, revenue
+
+
+def build_term_indexes(frames: Iterable["pd.DataFrame"], fields: Sequence[str] = TERM_FIELDS) -> Dict[str, TermIndex]:
+    """Monta os índices de termos a partir dos blocos do cache (tipados, com __dt).
+
+    Cada bloco vira contagens parciais por valor (bincount dos códigos), somadas no
+    fim; valores que diferem só na caixa viram um termo. Vazios ficam de fora.
+    """
+    import numpy as np
+    import pandas as pd
+
+    partials: Dict[str, list] = {f: [] for f in fields}
+    dt_min = dt_max = None
+
+    for frame in frames:
+        if not len(frame):
+            continue
+        if "__dt" in frame.columns:
+            lo, hi = frame["__dt"].min(), frame["__dt"].max()
+            dt_min = lo if dt_min is None else min(dt_min, lo)
+            dt_max = hi if dt_max is None else max(dt_max, hi)
+        for col in fields:
+            if col in frame.columns:
+                values, count, revenue = _frame_counts(frame, col)
+                partials[col].append(pd.DataFrame({"value": values.astype(str), "count": count, "revenue": revenue}))
+
+    out: Dict[str, TermIndex] = {}
+    for col, parts in partials.items():
+        if not parts:
+            continue
+
+        df = pd.concat(parts, ignore_index=True)
+        df["value"] = df["value"].str.replace(_SEP, "", regex=False).str.strip()
+        df = df.groupby("value", sort=False).sum().reset_index()
+        df = df[(df["count"] > 0) & (df["value"] != "")]
+
+        # grafias que diferem só na caixa: um termo, exibido com a mais frequente
+        df["key"] = df["value"].str.lower()
+        df = df.sort_values("count", ascending=False, kind="stable")
+        terms = df.groupby("key", sort=False).agg(value=("value", "first"), count=("count", "sum"), revenue=("revenue", "sum"))
+
+        display = terms["value"].tolist()
+        norm = [normalize_search_text(t) for t in display]
+        keys = terms.index.tolist()
+        order = sorted(range(len(display)), key=lambda i: (norm[i], keys[i]))
+
+        out[col] = TermIndex(
+            terms=[display[i] for i in order],
+            norm_terms=[norm[i] for i in order],
+            count=terms["count"].to_numpy(dtype=np.int64)[order],
+            revenue=terms["revenue"].to_numpy(dtype=np.float64)[order],
+            dt_min=None if dt_min is None else np.datetime64(dt_min, "ns"),
+            dt_max=None if dt_max is None else np.datetime64(dt_max, "ns"),
+        )
+    return out
+
+
+def term_metrics(indexes: Dict[str, TermIndex], frames: Iterable["pd.DataFrame"]) -> Dict[str, Tuple["np.ndarray", "np.ndarray"]]:
+    """(ocorrências, receita) por id de termo nos blocos (ex.: o recorte período/UF).
+
+    Uma passada pelos blocos para todos os campos de `indexes` (campo -> índice).
+    """
+    import numpy as np
+
+    out = {
+        col: (np.zeros(len(index.terms), dtype=np.int64), np.zeros(len(index.terms), dtype=np.float64))
+        for col, index in indexes.items()
+    }
+
+    for frame in frames:
+        if not len(frame):
+            continue
+        for col, index in indexes.items():
+            if col not in frame.columns:
+                continue
+            count, revenue = out[col]
+            n = len(index.terms)
+            values, c, r = _frame_counts(frame, col)
+            ids = index.ids_for(values)
+            known = (ids >= 0) & (c > 0)
+            count += np.bincount(ids[known], weights=c[known], minlength=n).astype(np.int64)
+            revenue += np.bincount(ids[known], weights=r[known], minlength=n)
+
+    return out
+
+
+def _join_strings(values: Sequence[str]) -> "np.ndarray":
+    """Lista de strings -> um blob UTF-8 (uint8): leitura com um decode + split."""
+    import numpy as np
+
+    return np.frombuffer(_SEP.join(values).encode("utf-8"), dtype=np.uint8)
+
+
+def _split_strings(blob: "np.ndarray", n: int) -> List[str]:
+    if n == 0:
+        return []
+    return blob.tobytes().decode("utf-8").split(_SEP)
+
+
+def save_term_indexes(path: Path, indexes: Dict[str, TermIndex]) -> None:
+    """Grava os índices como .npz (sem pickle)."""
+    import numpy as np
+
+    arrays = {}
+    for col, index in indexes.items():
+        arrays[f"{col}.terms"] = _join_strings(index.terms)
+        arrays[f"{col}.norm"] = _join_strings(index.norm_terms)
+        arrays[f"{col}.count"] = index.count
+        arrays[f"{col}.revenue"] = index.revenue
+        if index.dt_min is not None:
+            arrays[f"{col}.period"] = np.asarray([index.dt_min, index.dt_max], dtype="datetime64[ns]")
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    tmp.replace(path)
+
+
+def load_term_indexes(path: Path) -> Optional[Dict[str, TermIndex]]:
+    import numpy as np
+
+    if not path.exists():
+        return None
+
+    try:
+        out: Dict[str, TermIndex] = {}
+        with np.load(path, allow_pickle=False) as z:
+            for name in z.files:
+                if not name.endswith(".count"):
+                    continue
+                col = name[: -len(".count")]
+                period = z[f"{col}.period"] if f"{col}.period" in z.files else None
+                count = z[f"{col}.count"]
+                out[col] = TermIndex(
+                    terms=_split_strings(z[f"{col}.terms"], len(count)),
+                    norm_terms=_split_strings(z[f"{col}.norm"], len(count)),
+                    count=count,
+                    revenue=z[f"{col}.revenue"],
+                    dt_min=None if period is None else period[0],
+                    dt_max=None if period is None else period[1],
+                )
+        return out
+    except Exception:
+        return None
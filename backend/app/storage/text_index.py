@@ -0,0 +1,167 @@
+# backend/app/storage/text_index.py
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from app.core.formatters import normalize_search_text
+
+GRAM = 3
+
+
+@dataclass
+class TrigramIndex:
+    """Índice invertido de trigramas sobre os termos distintos de uma coluna texto.
+
+    - terms: valores distintos como estão no cache (ex.: descrição do produto)
+    - norm_terms: mesmos valores normalizados (sem acento, caixa alta)
+    - grams[i] aponta para os termos postings[offsets[i]:offsets[i + 1]]
+    """
+
+    terms: List[str]
+    norm_terms: List[str]
+    grams: "np.ndarray"
+    offsets: "np.ndarray"
+    postings: "np.ndarray"
+    _lookup: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self._lookup:
+            self._lookup = {str(g): i for i, g in enumerate(self.grams.tolist())}
+
+    def _gram_postings(self, gram: str) -> "np.ndarray":
+        i = self._lookup.get(gram)
+        if i is None:
+            return self.postings[0:0]
+        return self.postings[self.offsets[i]: self.offsets[i + 1]]
+
+    def candidates(self, q: str) -> Optional["np.ndarray"]:
+        """Ids (crescentes) dos termos com todos os trigramas de `q` (já normalizado).
+
+        Superconjunto dos que contêm `q` (falta verificar a ordem dos trigramas);
+        None se `q` tem menos de 3 caracteres (sem trigrama para filtrar).
+        """
+        import numpy as np
+
+        if len(q) < GRAM:
+            return None
+
+        lists = sorted((self._gram_postings(g) for g in _grams(q)), key=len)
+        out = lists[0]
+        for p in lists[1:]:
+            if len(out) == 0:
+                break
+            out = np.intersect1d(out, p, assume_unique=True)
+        return out
+
+    def match(self, needle: str) -> List[str]:
+        """Termos (originais) que contêm `needle` após normalização.
+
+        Intersecta as listas dos trigramas do needle e verifica os candidatos;
+        needles com menos de 3 caracteres varrem os termos distintos.
+        """
+        import numpy as np
+
+        q = normalize_search_text(needle)
+        if not q:
+            return list(self.terms)
+
+        candidates = self.candidates(q)
+        if candidates is None:
+            candidates = np.arange(len(self.terms))
+        return [self.terms[i] for i in candidates.tolist() if q in self.norm_terms[i]]
+
+
+def _grams(s: str) -> set:
+    return {s[i: i + GRAM] for i in range(len(s) - GRAM + 1)}
+
+
+def build_trigram_index(terms: Sequence[str], norm_terms: Optional[Sequence[str]] = None) -> TrigramIndex:
+    """Monta o índice a partir dos termos distintos (ex.: categories de `produto`).
+
+    `norm_terms`: os termos já normalizados (normalize_search_text), se o chamador
+    já os tem (ex.: TermIndex).
+    """
+    import numpy as np
+
+    terms_list = [str(t) for t in terms]
+    norm = list(norm_terms) if norm_terms is not None else [normalize_search_text(t) for t in terms_list]
+
+    post: Dict[str, List[int]] = defaultdict(list)
+    for tid, t in enumerate(norm):
+        for g in _grams(t):
+            post[g].append(tid)
+
+    grams = sorted(post.keys())
+    offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+    np.cumsum([len(post[g]) for g in grams], out=offsets[1:])
+
+    tid_dtype = np.int32 if len(terms_list) < 2**31 else np.int64
+    postings = np.fromiter((tid for g in grams for tid in post[g]), dtype=tid_dtype, count=int(offsets[-1]))
+
+    return TrigramIndex(
+        terms=terms_list,
+        norm_terms=norm,
+        grams=np.asarray(grams, dtype=str),
+        offsets=offsets,
+        postings=postings,
+    )
+
+
+def _pack_strings(values: Sequence[str]) -> tuple["np.ndarray", "np.ndarray"]:
+    """Lista de strings -> (bytes UTF-8 concatenados, offsets); evita arrays 'U' de largura fixa."""
+    import numpy as np
+
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: "np.ndarray", offsets: "np.ndarray") -> List[str]:
+    raw = blob.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i]: bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+def save_trigram_index(path: Path, index: TrigramIndex) -> None:
+    """Grava o índice como .npz (sem pickle)."""
+    import numpy as np
+
+    terms_blob, terms_offsets = _pack_strings(index.terms)
+    norm_blob, norm_offsets = _pack_strings(index.norm_terms)
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            terms_blob=terms_blob,
+            terms_offsets=terms_offsets,
+            norm_blob=norm_blob,
+            norm_offsets=norm_offsets,
+            grams=index.grams,
+            offsets=index.offsets,
+            postings=index.postings,
+        )
+    tmp.replace(path)
+
+
+def load_trigram_index(path: Path) -> Optional[TrigramIndex]:
+    import numpy as np
+
+    if not path.exists():
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            return TrigramIndex(
+                terms=_unpack_strings(z["terms_blob"], z["terms_offsets"]),
+                norm_terms=_unpack_strings(z["norm_blob"], z["norm_offsets"]),
+                grams=z["grams"],
+                offsets=z["offsets"],
+                postings=z["postings"],
+            )
+    except Exception:
+        return None
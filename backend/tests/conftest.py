@@ -0,0 +1,135 @@
+# backend/tests/conftest.py
+from __future__ import annotations
+
+import math
+import random
+from pathlib import Path
+
+import pytest
+
+from app.core.settings import settings
+from app.storage.file_lock import FileLock
+
+# Módulos que importam DATASET_PATH por valor (from app.core.dataset import ...)
+_DATASET_MODULES = (
+    "app.core.dataset",
+    "app.storage.dataset",
+    "app.services.database_service",
+    "app.services.database_summary_service",
+    "app.api.routes.database",
+    "app.api.routes.database_summary",
+)
+
+CSV_HEADER = "dhemi;uf;uf_dest;vprod;vicms_icms;vpis;vcofins;ncm;produto;cfop;movimento"
+
+_UFS = ("AM", "SP", "MG", "RJ", "pr")
+_NCMS = ("30049099", "84716000", "21069090", "22021000")
+_CFOPS = ("5102", "6102", "1551", "2556")
+_PRODUTOS = ("Dipirona 500mg", "Material de escritório", "Café torrado", "Peças de manutenção")
+
+
+def _money(rng: random.Random, lo: float, hi: float) -> str:
+    value = f"{rng.uniform(lo, hi):.2f}"
+    # formatos que o import aceita: 1234.56 e 1234,56
+    return value.replace(".", ",") if rng.random() < 0.3 else value
+
+
+def make_csv_lines(rows: int = 3000, seed: int = 7) -> list[str]:
+    """CSV de teste (com header): datas em formatos variados, ~1% sem data válida
+    e ~0,5% de linhas malformadas (campos a mais)."""
+    rng = random.Random(seed)
+    lines = [CSV_HEADER]
+    for i in range(rows):
+        year, month, day = rng.choice((2023, 2024)), rng.randint(1, 12), rng.randint(1, 28)
+        roll = rng.random()
+        if roll < 0.01:
+            dhemi = "lixo"
+        elif roll < 0.3:
+            dhemi = f"{day:02d}/{month:02d}/{year}"
+        else:
+            dhemi = f"{year}-{month:02d}-{day:02d}"
+
+        fields = [
+            dhemi,
+            rng.choice(_UFS),
+            rng.choice(_UFS).upper(),
+            _money(rng, 10, 5000),
+            _money(rng, 1, 900),
+            _money(rng, 0, 80),
+            _money(rng, 0, 380),
+            rng.choice(_NCMS),
+            f"{rng.choice(_PRODUTOS)} {i % 40}",
+            rng.choice(_CFOPS),
+            rng.choice(("SAIDA", "ENTRADA")),
+        ]
+        if rng.random() < 0.005:
+            fields.append("sobra")
+        lines.append(";".join(fields))
+    return lines
+
+
+def assert_same(got, expected, path: str = "") -> None:
+    """Igualdade estrutural; floats com tolerância (ordem de soma difere entre modos)."""
+    if isinstance(expected, dict):
+        assert isinstance(got, dict) and got.keys() == expected.keys(), path
+        for key in expected:
+            assert_same(got[key], expected[key], f"{path}/{key}")
+    elif isinstance(expected, list):
+        assert isinstance(got, list) and len(got) == len(expected), path
+        for i, (a, b) in enumerate(zip(got, expected)):
+            assert_same(a, b, f"{path}[{i}]")
+    elif isinstance(expected, float) and not isinstance(got, bool):
+        assert math.isclose(got, expected, rel_tol=1e-9, abs_tol=1e-6), (path, got, expected)
+    else:
+        assert got == expected, (path, got, expected)
+
+
+@pytest.fixture
+def sample_lines() -> list[str]:
+    return make_csv_lines()
+
+
+@pytest.fixture
+def sample_csv(tmp_path: Path, sample_lines: list[str]) -> Path:
+    path = tmp_path / "upload.csv"
+    path.write_text("\n".join(sample_lines) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def dataset_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Base do dataset isolada em tmp_path (nada é gravado em backend/data)."""
+    import importlib
+
+    from app.services import import_job_service
+    from app.storage import dataset as storage
+    from app.storage import import_jobs
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    dataset_path = data_dir / "dataset_nfe_itens.csv"
+
+    monkeypatch.setattr("app.core.dataset.DATA_DIR", data_dir)
+    for name in _DATASET_MODULES:
+        monkeypatch.setattr(importlib.import_module(name), "DATASET_PATH", dataset_path)
+    monkeypatch.setattr(storage, "_BUILD_LOCK", FileLock(storage._lock_path(dataset_path)))
+    monkeypatch.setattr(import_jobs, "JOBS_DIR", data_dir / "import_jobs")
+    monkeypatch.setattr(import_job_service, "JOBS_DIR", data_dir / "import_jobs")
+
+    # consultas/rebuild síncronos, sem a pré-carga em background
+    monkeypatch.setattr(settings, "dataset_warmup", False)
+    monkeypatch.setattr(settings, "dataset_chunk_rows", 700)
+
+    storage.invalidate_dataset_cache()
+    yield data_dir
+    storage.invalidate_dataset_cache()
+
+
+@pytest.fixture
+def client(dataset_dir: Path):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    # sem `with`: o lifespan (warmup/jobs) não roda
+    return TestClient(app)
@@ -0,0 +1,98 @@
+# backend/tests/test_aggregation.py
+"""Top-K e contagem de distintos (exata e HyperLogLog)."""
+from __future__ import annotations
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.core.aggregation import HLL_PRECISION, DistinctCounter, HyperLogLog, top_k, top_k_indices
+from app.core.settings import settings
+from app.services.database_service import import_csv_stream
+from conftest import assert_same
+
+# erro padrão do HyperLogLog com a precisão padrão (~0,8%)
+HLL_STDERR = 1.04 / math.sqrt(1 << HLL_PRECISION)
+
+
+def test_top_k_matches_sorted_with_ties():
+    rng = random.Random(3)
+    items = [(f"k{i}", float(rng.randint(0, 20))) for i in range(500)]
+    for k in (0, 1, 7, 50, 500, 900):
+        # sorted é estável: nos empates vence a 1ª ocorrência
+        assert top_k(items, k) == sorted(items, key=lambda kv: kv[1], reverse=True)[:k]
+
+
+def test_top_k_indices_ties_keep_position_order():
+    rng = np.random.default_rng(5)
+    values = rng.integers(0, 15, size=2000).astype("float64")
+    for k in (0, 1, 10, 100, 2000, 5000):
+        expected = sorted(range(len(values)), key=lambda i: (-values[i], i))[:k]
+        assert top_k_indices(values, k).tolist() == expected
+
+    assert top_k_indices(np.array([2.0, 5.0, 5.0, 1.0, 5.0]), 2).tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("n", [100, 5_000, 200_000])
+def test_hll_error_within_bounds(n):
+    values = [f"produto-{i}" for i in range(n)]
+    hll = HyperLogLog()
+    hll.add(values)
+    # 4 erros padrão; na faixa baixa (contagem linear) o erro é bem menor
+    assert abs(hll.count() - n) <= max(2, 4 * HLL_STDERR * n)
+
+
+def test_hll_merge_equals_union_and_ignores_repeats():
+    a, b, whole = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left = [f"x{i}" for i in range(30_000)]
+    right = [f"x{i}" for i in range(20_000, 60_000)]
+    a.add(left)
+    b.add(right)
+    b.add(right)
+    whole.add(left + right)
+
+    a.merge(b)
+    assert np.array_equal(a.registers, whole.registers)
+    assert abs(a.count() - 60_000) <= 4 * HLL_STDERR * 60_000
+
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(precision=10))
+
+
+def test_distinct_counter_by_blocks():
+    blocks = [[f"v{i % 700}" for i in range(j, j + 1000)] for j in range(0, 5000, 1000)]
+    exact, approx = DistinctCounter(), DistinctCounter(approx=True)
+    for block in blocks:
+        exact.add(block)
+        approx.add(block)
+    assert exact.count() == 700
+    assert abs(approx.count() - 700) <= 4 * HLL_STDERR * 700
+
+    with pytest.raises(ValueError):
+        exact.merge(approx)
+
+
+@pytest.mark.parametrize("batch_rows", [None, 257])
+def test_breakdowns_approx_matches_exact(client, sample_csv, monkeypatch, batch_rows):
+    """HyperLogLog só aproxima os cards de distintos; rankings ficam iguais."""
+    if batch_rows:
+        monkeypatch.setattr(settings, "dataset_in_memory_max_mb", 0)
+        monkeypatch.setattr(settings, "dataset_batch_rows", batch_rows)
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+
+    for params in ({}, {"uf_origem": "pr"}, {"produto": "dipirona"}):
+        exact = client.get("/dashboard/breakdowns", params=params).json()
+        monkeypatch.setattr(settings, "dashboard_distinct_approx", True)
+        approx = client.get("/dashboard/breakdowns", params=params).json()
+        monkeypatch.setattr(settings, "dashboard_distinct_approx", False)
+
+        assert exact["distinct"]["produtos"] > 0
+        for name, value in exact["distinct"].items():
+            assert abs(approx["distinct"][name] - value) <= max(1, 4 * HLL_STDERR * value), name
+        # rankings iguais; somas com tolerância (o group-by agrupa em outra ordem)
+        approx.pop("distinct")
+        exact.pop("distinct")
+        assert_same(approx, exact)
@@ -0,0 +1,94 @@
+# backend/tests/test_compressed_uploads.py
+"""Uploads compactados (gzip, zip, zstd): mesmo resultado que o CSV puro."""
+from __future__ import annotations
+
+import gzip
+import io
+import zipfile
+
+import pytest
+
+from app.services.database_service import import_csv_stream, is_supported_upload
+from app.storage.dataset import invalidate_dataset_cache
+
+
+def _zip(members: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def _snapshot(client) -> dict:
+    return {
+        "summary": client.get("/database/summary").json(),
+        "overview": client.get("/dashboard/overview", params={"uf_origem": "pr"}).json(),
+    }
+
+
+@pytest.fixture
+def plain(client, sample_csv):
+    """(bytes do CSV, resultado e respostas do import sem compressão)."""
+    data = sample_csv.read_bytes()
+    result = import_csv_stream(io.BytesIO(data))
+    return data, result, _snapshot(client)
+
+
+def _compressed(kind: str, data: bytes) -> bytes:
+    if kind == "gzip":
+        return gzip.compress(data)
+    if kind == "zip":
+        return _zip({"__MACOSX/._upload.csv": b"lixo", "pasta/upload.csv": data})
+    if kind == "zip-single":
+        # um único membro, sem extensão .csv
+        return _zip({"exportacao.txt": data})
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize("kind", ["gzip", "zip", "zip-single", "zstd"])
+def test_compressed_matches_plain(client, plain, kind):
+    data, expected, snapshot = plain
+    packed = _compressed(kind, data)
+
+    invalidate_dataset_cache()
+    assert import_csv_stream(io.BytesIO(packed)) == expected
+    assert _snapshot(client) == snapshot
+
+    # append do mesmo conteúdo compactado: nada novo
+    again = import_csv_stream(io.BytesIO(packed), append=True)
+    assert again["imported_rows"] == 0 and again["duplicate_rows"] == expected["imported_rows"] + expected["rejected_rows"]
+
+
+def test_route_accepts_gzip_upload(client, plain):
+    data, expected, snapshot = plain
+    invalidate_dataset_cache()
+
+    files = {"file": ("upload.csv.gz", gzip.compress(data), "application/gzip")}
+    response = client.post("/database/import-csv", files=files)
+    assert response.status_code == 200, response.text
+    assert {k: response.json()[k] for k in expected} == expected
+    assert _snapshot(client) == snapshot
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        gzip.compress(b"dhemi;uf\n" * 1000)[:-20],  # gzip truncado
+        b"PK\x03\x04" + b"\x00" * 64,  # zip inválido
+        _zip({"a.csv": b"x", "b.csv": b"y"}),  # mais de um CSV no zip
+    ],
+)
+def test_invalid_archives_keep_dataset(client, plain, payload):
+    _, _, snapshot = plain
+    with pytest.raises(ValueError):
+        import_csv_stream(io.BytesIO(payload))
+    assert _snapshot(client) == snapshot
+
+
+def test_supported_upload_names():
+    for name in ("base.csv", "BASE.CSV.GZ", "base.gz", "base.zip", "base.csv.zst", "base.zstd"):
+        assert is_supported_upload(name), name
+    for name in ("base.xlsx", "base.csv.bz2", "", None):
+        assert not is_supported_upload(name), name
@@ -0,0 +1,69 @@
+# backend/tests/test_dashboard_bundle.py
+"""/dashboard/bundle: cada seção igual à do endpoint correspondente."""
+from __future__ import annotations
+
+import pytest
+
+from app.core.settings import settings
+from app.services.database_service import import_csv_stream
+from conftest import assert_same
+
+FILTERS = (
+    {},
+    {"uf_origem": "pr"},
+    {"periodo_inicio": "2023-03-10", "periodo_fim": "2024-06-20", "uf_destino": "SP"},
+    {"ncm": "30049099", "cfop": "5102"},
+    {"produto": "café"},
+    {"periodo_inicio": "2023-05-01", "periodo_fim": "2023-05-31", "ncm": "00000000"},
+)
+
+INCLUDES = (None, "overview", "timeseries,compare", "breakdowns", "compare, OVERVIEW ,breakdowns")
+
+
+def _individual(client, params: dict, ano_reforma: int, limit: int) -> dict:
+    overview = client.get("/dashboard/overview", params=params).json()
+    timeseries = overview.pop("timeseries")
+    return {
+        "overview": overview,
+        "timeseries": timeseries,
+        "breakdowns": client.get("/dashboard/breakdowns", params={**params, "limit": limit}).json(),
+        "compare": client.get("/dashboard/compare", params={**params, "ano_reforma": ano_reforma}).json(),
+    }
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_bundle_matches_individual_endpoints(client, sample_csv, monkeypatch, chunked):
+    if chunked:
+        monkeypatch.setattr(settings, "dataset_in_memory_max_mb", 0)
+        monkeypatch.setattr(settings, "dataset_batch_rows", 257)
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+
+    for params in FILTERS:
+        expected = _individual(client, params, ano_reforma=2029, limit=7)
+        for include in INCLUDES:
+            query = {**params, "ano_reforma": 2029, "limit": 7}
+            if include is not None:
+                query["include"] = include
+            response = client.get("/dashboard/bundle", params=query)
+            assert response.status_code == 200, response.text
+            got = response.json()
+
+            sections = [s.strip().lower() for s in include.split(",")] if include else list(expected)
+            assert sorted(got) == sorted(sections), include
+            # com breakdowns os totais saem das linhas (sem cubo): somas com tolerância
+            assert_same(got, {s: expected[s] for s in sections})
+
+
+def test_bundle_rejects_unknown_section(client, sample_csv):
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+    response = client.get("/dashboard/bundle", params={"include": "overview,grafico"})
+    assert response.status_code == 400
+    assert "grafico" in response.json()["detail"]
+
+
+def test_bundle_without_dataset(client):
+    got = client.get("/dashboard/bundle").json()
+    assert sorted(got) == ["breakdowns", "compare", "overview", "timeseries"]
+    assert got["timeseries"] == [] and got["breakdowns"]["top_produtos"] == []
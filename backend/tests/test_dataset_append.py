@@ -0,0 +1,116 @@
+# backend/tests/test_dataset_append.py
+"""Import incremental (append): reenviar linhas já importadas não altera a base."""
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core.settings import settings
+from app.services.database_service import get_quality, import_csv_stream
+
+
+def _version(data_dir: Path) -> str:
+    meta = json.loads((data_dir / "dataset_nfe_itens.csv.meta.json").read_text(encoding="utf-8"))
+    return meta["version"]
+
+
+def _csv(lines) -> io.BytesIO:
+    return io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def test_append_same_file_is_idempotent(client, dataset_dir, sample_csv):
+    with open(sample_csv, "rb") as f:
+        first = import_csv_stream(f)
+    assert first["rejected_rows"] > 0 and first["bad_lines"] > 0
+
+    version = _version(dataset_dir)
+    summary = client.get("/database/summary").json()
+    quality = get_quality()
+    overview = client.get("/dashboard/overview").json()
+
+    for _ in range(3):
+        result = import_csv_stream(io.BytesIO(sample_csv.read_bytes()), append=True)
+        assert result == {
+            "imported_rows": 0,
+            "duplicate_rows": first["imported_rows"] + first["rejected_rows"],
+            "rejected_rows": 0,
+            "bad_lines": 0,
+        }
+
+        # nada de novo: nem republica (mesma versão), nem recontagem no manifesto
+        assert _version(dataset_dir) == version
+        assert client.get("/database/summary").json() == summary
+        assert get_quality() == quality
+        assert client.get("/dashboard/overview").json() == overview
+
+
+def test_append_counts_only_new_rows(client, dataset_dir, sample_csv, sample_lines):
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+    quality = get_quality()
+
+    header, rows = sample_lines[0], sample_lines[1:]
+    fields = header.count(";")
+    valid = next(line for line in rows if not line.startswith("lixo;") and line.count(";") == fields)
+    rejected = next(line for line in rows if line.startswith("lixo;"))
+    bad = next(line for line in rows if line.count(";") > fields)
+    new = "2025-01-15;AM;SP;100.00;18.00;1.65;7.60;30049099;Produto novo;5102;SAIDA"
+    new_rejected = "2025-13-45;AM;SP;1.00;0;0;0;30049099;Data ruim nova;5102;SAIDA"
+    upload = [header, valid, rejected, bad, new, new_rejected]
+
+    result = import_csv_stream(_csv(upload), append=True)
+    assert result == {"imported_rows": 1, "duplicate_rows": 2, "rejected_rows": 1, "bad_lines": 0}
+
+    after = get_quality()
+    assert after["rows"] == quality["rows"] + 2
+    assert after["valid_rows"] == quality["valid_rows"] + 1
+    assert after["rejected_rows"] == quality["rejected_rows"] + 1
+    assert after["bad_lines"] == quality["bad_lines"]
+
+    # o mesmo arquivo de novo: tudo já visto
+    again = import_csv_stream(_csv(upload), append=True)
+    assert again == {"imported_rows": 0, "duplicate_rows": 4, "rejected_rows": 0, "bad_lines": 0}
+    assert get_quality() == after
+
+
+@pytest.mark.parametrize("keep_csv", [False, True])
+def test_append_only_rejected_updates_quality(client, dataset_dir, sample_csv, sample_lines, monkeypatch, keep_csv):
+    """Sem linha nova no cache, as rejeitadas/malformadas inéditas ainda entram no
+    manifesto (mesma versão) e não são contadas de novo no próximo append."""
+    monkeypatch.setattr(settings, "dataset_keep_csv", keep_csv)
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+    version = _version(dataset_dir)
+    quality = get_quality()
+    overview = client.get("/dashboard/overview").json()
+    overview.pop("status")
+
+    header = sample_lines[0]
+    new_rejected = "2025-13-45;AM;SP;1.00;0;0;0;30049099;Data ruim nova;5102;SAIDA"
+    new_bad = "2025-01-15;AM;SP;1.00;0;0;0;30049099;Campo a mais;5102;SAIDA;sobra;sobra"
+    upload = [header, new_rejected, new_bad]
+
+    result = import_csv_stream(_csv(upload), append=True)
+    assert result == {"imported_rows": 0, "duplicate_rows": 0, "rejected_rows": 1, "bad_lines": 1}
+
+    after = get_quality()
+    assert _version(dataset_dir) == version
+    assert after["rows"] == quality["rows"] + 1
+    assert after["valid_rows"] == quality["valid_rows"]
+    assert after["rejected_rows"] == quality["rejected_rows"] + 1
+    assert after["bad_lines"] == quality["bad_lines"] + 1
+    # status.rows segue o manifesto (linhas lidas); os números do cache não mudam
+    assert client.get("/dashboard/overview").json()["status"]["rows"] == after["rows"]
+    assert {k: v for k, v in client.get("/dashboard/overview").json().items() if k != "status"} == overview
+    if keep_csv:
+        # o CSV mantido recebeu a linha e o cache continua valendo para ele
+        assert "Data ruim nova" in (dataset_dir / "dataset_nfe_itens.csv").read_text(encoding="utf-8")
+        assert client.get("/database/status").json()["cache_ready"] is True
+
+    again = import_csv_stream(_csv(upload), append=True)
+    assert again == {"imported_rows": 0, "duplicate_rows": 1, "rejected_rows": 0, "bad_lines": 0}
+    assert get_quality() == after
+    assert _version(dataset_dir) == version
@@ -0,0 +1,78 @@
+# backend/tests/test_dataset_cube.py
+"""Cubo mensal: células + bordas do período somam o mesmo que a varredura das linhas."""
+from __future__ import annotations
+
+import math
+from datetime import date
+
+import pytest
+
+from app.api.routes.dashboard import _scan
+from app.core.settings import settings
+from app.services.database_service import import_csv_stream
+from app.storage.dataset import MONEY_COLUMNS, Filters, query_cube, query_dataset_frame
+
+FILTERS = (
+    # meses inteiros
+    Filters(date(2023, 1, 1), date(2024, 12, 31)),
+    Filters(date(2000, 1, 1), date(2100, 12, 31), uf_origem="pr"),
+    # bordas parciais dos dois lados
+    Filters(date(2023, 3, 10), date(2024, 6, 20)),
+    Filters(date(2023, 2, 15), date(2023, 9, 1), uf_destino="SP", ncm="30049099"),
+    Filters(date(2023, 12, 31), date(2024, 1, 1), cfop="5102"),
+    # período dentro de um mês só
+    Filters(date(2024, 4, 5), date(2024, 4, 25), uf_origem="AM"),
+    # nada no recorte
+    Filters(date(2023, 5, 1), date(2023, 5, 31), ncm="00000000"),
+)
+
+
+def _close(a: float, b: float) -> bool:
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_cube_totals_match_row_scan(client, sample_csv, monkeypatch, chunked):
+    if chunked:
+        monkeypatch.setattr(settings, "dataset_in_memory_max_mb", 0)
+        monkeypatch.setattr(settings, "dataset_batch_rows", 257)
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+
+    for filters in FILTERS:
+        plan = query_cube(filters)
+        assert plan is not None, filters
+        cells, ranges = plan
+
+        # só os meses cortados pelo período vão às linhas, cada um reduzido ao mês
+        assert len(ranges) <= 2
+        for r in ranges:
+            assert (r.periodo_inicio.year, r.periodo_inicio.month) == (r.periodo_fim.year, r.periodo_fim.month)
+            assert filters.periodo_inicio <= r.periodo_inicio <= r.periodo_fim <= filters.periodo_fim
+
+        rows = query_dataset_frame(filters)
+        totals = _scan(filters)
+        assert totals.rows == len(rows), filters
+        for col in MONEY_COLUMNS:
+            assert _close(totals.money[col], float(rows[col].sum())), (filters, col)
+
+        if len(rows):
+            assert totals.min_dt == rows["__dt"].min() and totals.max_dt == rows["__dt"].max()
+        assert totals.ufs_origem == set(rows["uf"].dropna().astype(str))
+        assert totals.ufs_destino == set(rows["uf_dest"].dropna().astype(str))
+
+        monthly = totals.monthly()
+        expected = rows.groupby("__month", observed=True, sort=True)[list(MONEY_COLUMNS)].sum()
+        assert monthly.index.astype(str).tolist() == expected.index.astype(str).tolist()
+        for col in MONEY_COLUMNS:
+            assert all(_close(a, b) for a, b in zip(monthly[col], expected[col])), (filters, col)
+
+    # meses inteiros: só células do cubo, sem linhas
+    cells, ranges = query_cube(FILTERS[0])
+    assert len(cells) and not ranges
+
+
+def test_cube_skips_produto_filter(client, sample_csv):
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+    assert query_cube(Filters(date(2023, 1, 1), date(2024, 12, 31), produto="dipirona")) is None
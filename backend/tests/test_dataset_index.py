@@ -0,0 +1,101 @@
+# backend/tests/test_dataset_index.py
+"""Índices secundários: o planejador devolve as mesmas linhas que a varredura completa."""
+from __future__ import annotations
+
+import itertools
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.settings import settings
+from app.services.database_service import import_csv_stream
+from app.storage import dataset as storage
+from app.storage.dataset import Filters, query_dataset_frame
+from app.storage.dataset_index import build_index, load_index, plan_positions, save_index
+
+EQUALS = {
+    "uf": ("AM", "SP", "PR", "XX"),
+    "uf_dest": ("MG", "RJ"),
+    "ncm": ("30049099", "22021000", "00000000"),
+    "cfop": ("5102", "2556"),
+}
+
+
+def _frame(rows: int = 5000, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "uf": pd.Categorical(rng.choice(["AM", "SP", "MG", "RJ", "PR"], rows, p=[0.6, 0.3, 0.05, 0.04, 0.01])),
+            "uf_dest": pd.Categorical(rng.choice(["SP", "MG", "RJ"], rows)),
+            "ncm": pd.Categorical(rng.choice(["30049099", "84716000", "22021000"], rows, p=[0.9, 0.08, 0.02])),
+            "cfop": pd.Categorical(rng.choice(["5102", "6102", "2556"], rows)),
+        }
+    )
+
+
+def _combos():
+    cols = list(EQUALS)
+    for n in (1, 2, 3):
+        for chosen in itertools.combinations(cols, n):
+            for values in itertools.product(*(EQUALS[c] for c in chosen)):
+                yield list(zip(chosen, values))
+
+
+@pytest.mark.parametrize("max_selectivity", [0.0, 0.02, 0.05, 0.5, 1.0])
+def test_plan_positions_matches_full_scan(tmp_path, max_selectivity):
+    df = _frame()
+    index = build_index(df)
+    save_index(tmp_path / "x.idx", index)
+    loaded = load_index(tmp_path / "x.idx")
+
+    for equals in _combos():
+        mask = np.ones(len(df), dtype=bool)
+        for col, value in equals:
+            mask &= df[col].eq(value).to_numpy()
+        expected = np.flatnonzero(mask)
+
+        for idx in (index, loaded):
+            positions = plan_positions(idx, equals, max_selectivity=max_selectivity)
+            if positions is None:
+                # nenhum filtro seletivo: o chamador varre com a máscara
+                assert all(len(idx.columns[c].postings(v)) > max_selectivity * len(df) for c, v in equals)
+                continue
+            # superconjunto crescente das linhas finais, exato quando todos os filtros entram
+            assert np.all(np.diff(positions) > 0)
+            assert np.isin(expected, positions).all(), equals
+            if max_selectivity >= 1.0:
+                assert positions.tolist() == expected.tolist(), equals
+
+
+FILTERS = (
+    Filters(date(2000, 1, 1), date(2100, 12, 31), uf_origem="pr"),
+    Filters(date(2023, 3, 10), date(2024, 6, 20), uf_destino="sp", ncm="30049099"),
+    Filters(date(2024, 1, 1), date(2024, 3, 31), ncm="22021000", cfop="1551"),
+    Filters(date(2023, 1, 1), date(2024, 12, 31), uf_origem="AM", produto="cafe"),
+    Filters(date(2023, 6, 1), date(2023, 6, 30), ncm="00000000"),
+)
+
+
+def test_query_with_index_matches_mask(client, sample_csv, monkeypatch):
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+
+    found = 0
+    for filters in FILTERS:
+        monkeypatch.setattr(settings, "dataset_index_max_selectivity", 1.0)
+        storage._RESULTS.clear()
+        df, offset = storage._load_dataset_slice(period=(filters.periodo_inicio, filters.periodo_fim))
+        assert storage._index_positions(filters, offset, len(df)) is not None
+        indexed = query_dataset_frame(filters)
+
+        # limite 0: o planejador recusa todo filtro com linhas e a consulta usa a máscara
+        monkeypatch.setattr(settings, "dataset_index_max_selectivity", 0.0)
+        storage._RESULTS.clear()
+        scanned = query_dataset_frame(filters)
+
+        assert indexed.index.tolist() == scanned.index.tolist(), filters
+        pd.testing.assert_frame_equal(indexed, scanned)
+        found += len(scanned)
+    assert found
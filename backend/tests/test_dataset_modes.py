@@ -0,0 +1,88 @@
+# backend/tests/test_dataset_modes.py
+"""Os modos de armazenamento/parse do dataset respondem igual ao caminho em memória."""
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core.settings import settings
+from app.services.database_service import import_csv_stream
+from app.storage.dataset import invalidate_dataset_cache
+from conftest import assert_same
+
+FILTERS = (
+    {},
+    {"uf_origem": "pr"},
+    {"periodo_inicio": "2023-03-10", "periodo_fim": "2024-06-20"},
+    {"ncm": "30049099", "cfop": "5102"},
+    {"produto": "dipirona"},
+    {"uf_destino": "SP", "produto": "café"},
+)
+
+# settings de cada modo (o de referência é o padrão: base em memória, parse serial)
+MODES = {
+    # out-of-core: consultas agregadas em lotes lidos das partições
+    "chunked": {"dataset_in_memory_max_mb": 0, "dataset_batch_rows": 257},
+    # upload em arquivo: parse por intervalos de bytes no pool de processos
+    "parallel": {"dataset_parallel_min_mb": 0, "dataset_parse_workers": 2},
+    # CSV canônico mantido no import
+    "keep_csv": {"dataset_keep_csv": True},
+}
+
+
+def _meta(data_dir: Path) -> dict:
+    return json.loads((data_dir / "dataset_nfe_itens.csv.meta.json").read_text(encoding="utf-8"))
+
+
+def _assert_mode(mode: str, data_dir: Path) -> None:
+    """O import/cache realmente seguiu o caminho do modo."""
+    if mode == "chunked":
+        assert _meta(data_dir)["mode"] == "chunked"
+    elif mode == "parallel":
+        # arquivos do 2º intervalo de bytes: part-00001-<bloco>
+        assert list(data_dir.glob("*.parts/*/part-00001-*.parquet"))
+    elif mode == "keep_csv":
+        assert (data_dir / "dataset_nfe_itens.csv").exists()
+
+
+def _snapshot(client) -> dict:
+    out = {"summary": client.get("/database/summary").json()}
+    for i, params in enumerate(FILTERS):
+        out[f"overview{i}"] = client.get("/dashboard/overview", params=params).json()
+        out[f"breakdowns{i}"] = client.get("/dashboard/breakdowns", params=params).json()
+        out[f"compare{i}"] = client.get("/dashboard/compare", params={**params, "ano_reforma": 2027}).json()
+    return out
+
+
+def _import(csv_path: Path) -> dict:
+    invalidate_dataset_cache()
+    with open(csv_path, "rb") as f:
+        return import_csv_stream(f)
+
+
+@pytest.mark.parametrize("mode", sorted(MODES))
+def test_mode_matches_memory(mode, client, dataset_dir, sample_csv, monkeypatch):
+    expected_import = _import(sample_csv)
+    expected = _snapshot(client)
+    assert _meta(dataset_dir)["mode"] == "memory"
+    assert expected["overview0"]["kpis"]["receita_total"] > 0
+
+    for key, value in MODES[mode].items():
+        monkeypatch.setattr(settings, key, value)
+
+    assert _import(sample_csv) == expected_import
+    _assert_mode(mode, dataset_dir)
+    assert_same(_snapshot(client), expected)
+
+
+def test_streaming_import_matches_file_import(client, sample_csv):
+    """Upload sem arquivo nomeado (ex.: UploadFile síncrono) segue o parse em streaming."""
+    expected_import = _import(sample_csv)
+    expected = _snapshot(client)
+
+    invalidate_dataset_cache()
+    assert import_csv_stream(io.BytesIO(sample_csv.read_bytes())) == expected_import
+    assert_same(_snapshot(client), expected)
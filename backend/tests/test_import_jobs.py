@@ -0,0 +1,100 @@
+# backend/tests/test_import_jobs.py
+"""Jobs de import em background: status, falha e retomada após restart."""
+from __future__ import annotations
+
+import io
+import shutil
+
+from app.services import import_job_service
+from app.services.database_service import import_csv_stream
+from app.services.import_job_service import resume_import_jobs, submit_import_job
+from app.storage.file_lock import FileLock
+from app.storage.import_jobs import create_job, get_job, job_lock_path, new_job_id, update_job, upload_path
+
+_RESULT_FIELDS = ("imported_rows", "duplicate_rows", "rejected_rows", "bad_lines")
+
+
+def _wait() -> None:
+    import_job_service._QUEUE.join()
+
+
+def _status(client, job_id: str) -> dict:
+    response = client.get(f"/database/import-jobs/{job_id}")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_job_runs_like_sync_import(client, sample_csv):
+    with open(sample_csv, "rb") as f:
+        expected = import_csv_stream(f)
+    summary = client.get("/database/summary").json()
+
+    with open(sample_csv, "rb") as f:
+        job = submit_import_job(f, "upload.csv")
+    assert job["status"] == "queued" and job["bytes_total"] == sample_csv.stat().st_size
+    _wait()
+
+    status = _status(client, job["id"])
+    assert status["status"] == "done" and status["error"] is None
+    assert {k: status[k] for k in _RESULT_FIELDS} == expected
+    assert status["progress"] == 1.0 and status["bytes_read"] == status["bytes_total"]
+    assert status["rows_processed"] >= expected["imported_rows"] + expected["rejected_rows"]
+    assert status["eta_seconds"] is None and status["finished_at"] >= status["started_at"]
+    assert not upload_path(job["id"]).exists()
+    assert client.get("/database/summary").json() == summary
+
+
+def test_job_failure_is_reported(client):
+    job = submit_import_job(io.BytesIO(b""), "vazio.csv")
+    _wait()
+
+    status = _status(client, job["id"])
+    assert status["status"] == "failed" and status["error"]
+    assert not upload_path(job["id"]).exists()
+
+
+def test_unknown_job(client):
+    assert client.get("/database/import-jobs/naoexiste").status_code == 404
+    assert client.get("/database/import-jobs/..%2Fsegredo").status_code == 404
+
+
+def test_resume_requeues_unfinished_jobs(client, dataset_dir, sample_csv):
+    """Jobs "queued"/"running" no disco (processo reiniciado) voltam à fila e terminam."""
+    ids = []
+    for status in ("queued", "running"):
+        job_id = new_job_id()
+        create_job(job_id, kind="csv", filename="upload.csv", bytes_total=sample_csv.stat().st_size)
+        shutil.copyfile(sample_csv, upload_path(job_id))
+        update_job(job_id, status=status, bytes_read=123)
+        ids.append(job_id)
+
+    finished = new_job_id()
+    create_job(finished, kind="csv", filename="ok.csv")
+    update_job(finished, status="done")
+
+    resume_import_jobs()
+    _wait()
+
+    for job_id in ids:
+        status = _status(client, job_id)
+        assert status["status"] == "done" and status["imported_rows"] > 0
+        assert not upload_path(job_id).exists()
+    assert get_job(finished)["status"] == "done" and get_job(finished)["started_at"] is None
+
+
+def test_job_locked_elsewhere_is_skipped(client, sample_csv):
+    """O lock do job evita execução dupla entre processos."""
+    job_id = new_job_id()
+    create_job(job_id, kind="csv", filename="upload.csv")
+    shutil.copyfile(sample_csv, upload_path(job_id))
+
+    lock = FileLock(job_lock_path(job_id))
+    assert lock.acquire(blocking=False)
+    try:
+        import_job_service._run_job(job_id)
+        assert get_job(job_id)["status"] == "queued"
+    finally:
+        lock.release()
+
+    import_job_service._run_job(job_id)
+    assert get_job(job_id)["status"] == "done"
@@ -0,0 +1,142 @@
+# backend/tests/test_nfe_xml.py
+"""Import de NF-e em XML (procNFe) direto no cache colunar."""
+from __future__ import annotations
+
+import io
+import math
+import zipfile
+
+import pytest
+
+from app.core.nfe_xml import parse_nfe_xml
+from app.core.settings import settings
+from app.services import database_service
+from app.services.database_service import import_nfe_xml_dir, import_nfe_xml_stream
+
+_NS = "http://www.portalfiscal.inf.br/nfe"
+
+
+def _nfe(chave: str, dhemi: str, items: list[tuple], uf: str = "AM", uf_dest: str = "SP", tp_nf: str = "1", cstat: str = "100") -> bytes:
+    """procNFe mínimo; items: (xProd, NCM, CFOP, vProd, vICMS, vPIS, vCOFINS)."""
+    dets = "".join(
+        f'<det nItem="{n}"><prod><xProd>{x}</xProd><NCM>{ncm}</NCM><CFOP>{cfop}</CFOP><vProd>{vprod}</vProd></prod>'
+        f"<imposto><ICMS><ICMS00><vICMS>{icms}</vICMS></ICMS00></ICMS>"
+        f"<PIS><PISAliq><vPIS>{pis}</vPIS></PISAliq></PIS>"
+        f"<COFINS><COFINSAliq><vCOFINS>{cofins}</vCOFINS></COFINSAliq></COFINS></imposto></det>"
+        for n, (x, ncm, cfop, vprod, icms, pis, cofins) in enumerate(items, start=1)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><nfeProc xmlns="{_NS}" versao="4.00"><NFe><infNFe Id="NFe{chave}" versao="4.00">'
+        f"<ide><dhEmi>{dhemi}T10:00:00-03:00</dhEmi><tpNF>{tp_nf}</tpNF></ide>"
+        f"<emit><enderEmit><UF>{uf}</UF></enderEmit></emit><dest><enderDest><UF>{uf_dest}</UF></enderDest></dest>"
+        f"{dets}<total><ICMSTot><vProd>0</vProd></ICMSTot></total></infNFe></NFe>"
+        f"<protNFe><infProt><cStat>{cstat}</cStat></infProt></protNFe></nfeProc>"
+    ).encode("utf-8")
+
+
+NOTES = {
+    "a.xml": _nfe("1" * 44, "2024-01-10", [("Café torrado", "21069090", "5102", "100.00", "18.00", "1.65", "7.60"),
+                                         ("Dipirona 500mg", "30049099", "5102", "50.50", "0", "0.83", "3.84")]),
+    "b.xml": _nfe("2" * 44, "2024-02-03", [("Material de escritório", "84716000", "1551", "200.00", "36.00", "3.30", "15.20")],
+                  uf="PR", uf_dest="AM", tp_nf="0"),
+    "nested/c.xml": _nfe("3" * 44, "2024-02-20", [("Peças de manutenção", "84716000", "6102", "10.25", "1.23", "0.17", "0.78")] * 3),
+    # ignorados: cancelada, evento (não é NF-e), XML inválido, não-XML
+    "cancelada.xml": _nfe("4" * 44, "2024-01-15", [("Cancelado", "30049099", "5102", "999.00", "0", "0", "0")], cstat="101"),
+    "evento.xml": b'<?xml version="1.0"?><procEventoNFe xmlns="http://www.portalfiscal.inf.br/nfe"><evento/></procEventoNFe>',
+    "quebrado.xml": b"<nfeProc><NFe>",
+    "leiame.txt": b"nada",
+}
+
+ITEMS = 6
+VPROD = 100.00 + 50.50 + 200.00 + 3 * 10.25
+
+
+def _zip(notes: dict) -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in notes.items():
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+def test_parse_nfe_xml_items():
+    rows = parse_nfe_xml(NOTES["a.xml"])
+    assert [r["n_item"] for r in rows] == ["1", "2"]
+    assert rows[0] == {
+        "dhemi": "2024-01-10",
+        "uf": "AM",
+        "uf_dest": "SP",
+        "vprod": "100.00",
+        "vicms_icms": "18.00",
+        "vpis": "1.65",
+        "vcofins": "7.60",
+        "ncm": "21069090",
+        "produto": "Café torrado",
+        "cfop": "5102",
+        "movimento": "SAIDA",
+        "chave_nfe": "1" * 44,
+        "n_item": "1",
+    }
+    assert parse_nfe_xml(NOTES["b.xml"])[0]["movimento"] == "ENTRADA"
+    assert parse_nfe_xml(NOTES["cancelada.xml"]) == []
+    assert parse_nfe_xml(NOTES["evento.xml"]) == []
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_import_zip(client, monkeypatch, parallel):
+    if parallel:
+        # um XML por lote e 2 processos: exercita o pool de parse
+        monkeypatch.setattr(database_service, "_XML_BATCH_FILES", 1)
+        monkeypatch.setattr(settings, "dataset_parse_workers", 2)
+
+    result = import_nfe_xml_stream(_zip(NOTES))
+    assert result == {"imported_rows": ITEMS, "duplicate_rows": 0, "rejected_rows": 0, "files": 6, "skipped_files": 3}
+
+    kpis = client.get("/dashboard/overview").json()["kpis"]
+    assert math.isclose(kpis["receita_total"], VPROD)
+    feb = client.get("/dashboard/overview", params={"periodo_inicio": "2024-02-01", "periodo_fim": "2024-02-29"}).json()
+    assert math.isclose(feb["kpis"]["receita_total"], 200.00 + 3 * 10.25)
+
+    summary = client.get("/database/summary").json()
+    assert summary["rows"] == ITEMS
+    assert (summary["min_date"], summary["max_date"]) == ("2024-01-10", "2024-02-20")
+    assert summary["ufs_origem"] == ["AM", "PR"]
+
+    top = client.get("/dashboard/breakdowns").json()["top_produtos"]
+    assert top[0] == {"key": "Material de escritório", "value": 200.0}
+
+
+def test_append_skips_imported_items(client):
+    import_nfe_xml_stream(_zip(NOTES))
+
+    again = import_nfe_xml_stream(_zip(NOTES), append=True)
+    assert again["imported_rows"] == 0 and again["duplicate_rows"] == ITEMS
+
+    new = _nfe("5" * 44, "2024-03-01", [("Dipirona 500mg", "30049099", "5102", "7.00", "0", "0", "0")])
+    result = import_nfe_xml_stream(_zip({"a.xml": NOTES["a.xml"], "d.xml": new}), append=True)
+    assert result["imported_rows"] == 1 and result["duplicate_rows"] == 2
+
+    kpis = client.get("/dashboard/overview").json()["kpis"]
+    assert math.isclose(kpis["receita_total"], VPROD + 7.00)
+
+
+def test_import_single_xml_and_dir(client, tmp_path):
+    assert import_nfe_xml_stream(io.BytesIO(NOTES["b.xml"]))["imported_rows"] == 1
+
+    src = tmp_path / "xmls"
+    for name, data in NOTES.items():
+        (src / name).parent.mkdir(parents=True, exist_ok=True)
+        (src / name).write_bytes(data)
+    result = import_nfe_xml_dir(src)
+    assert result["imported_rows"] == ITEMS and result["files"] == 6
+    assert client.get("/database/summary").json()["rows"] == ITEMS
+
+
+def test_import_without_items_keeps_dataset(client):
+    import_nfe_xml_stream(_zip(NOTES))
+    with pytest.raises(ValueError):
+        import_nfe_xml_stream(_zip({"cancelada.xml": NOTES["cancelada.xml"]}))
+    with pytest.raises(ValueError):
+        import_nfe_xml_stream(io.BytesIO(b"PK\x03\x04truncado"))
+    assert client.get("/database/summary").json()["rows"] == ITEMS
@@ -0,0 +1,102 @@
+# backend/tests/test_suggest.py
+"""Autocomplete (/dashboard/suggest) contra uma varredura das linhas do recorte."""
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from app.core.formatters import normalize_search_text
+from app.services.database_service import import_csv_stream
+from app.storage import dataset as storage
+from app.storage.dataset import Filters, query_dataset_frame
+
+SCOPES = (
+    {"periodo_inicio": "2000-01-01", "periodo_fim": "2100-12-31"},
+    {"periodo_inicio": "2023-03-10", "periodo_fim": "2023-11-05"},
+    {"periodo_inicio": "2023-01-01", "periodo_fim": "2024-12-31", "uf_origem": "pr", "uf_destino": "sp"},
+)
+
+QUERIES = {
+    "produto": ("", "d", "ca", "cafe", "CAFÉ", "500", "mg 1", " 3", "escritorio", "zzz"),
+    "ncm": ("", "3", "0049", "90"),
+    "cfop": ("", "5", "55", "02"),
+}
+
+
+@pytest.fixture
+def imported(client, sample_csv):
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+    return client
+
+
+def _expected(field: str, q: str, scope: dict, limit: int, rank: str) -> list[str]:
+    """Sugestões esperadas, varrendo as linhas do recorte (sem índice de termos)."""
+    frame = query_dataset_frame(
+        Filters(
+            periodo_inicio=date.fromisoformat(scope["periodo_inicio"]),
+            periodo_fim=date.fromisoformat(scope["periodo_fim"]),
+            uf_origem=scope.get("uf_origem"),
+            uf_destino=scope.get("uf_destino"),
+        ),
+        columns=(field, "vprod"),
+    )
+    values = frame[field].astype(object).fillna("").astype(str).str.strip()
+    rows = frame.assign(value=values)[values != ""]
+    terms = rows.groupby("value").agg(count=("vprod", "size"), revenue=("vprod", "sum"))
+
+    q = normalize_search_text(q)
+    out = []
+    for term, row in terms.iterrows():
+        norm = normalize_search_text(term)
+        if q in norm:
+            metric = row["revenue"] if rank == "receita" else row["count"]
+            out.append((not norm.startswith(q), -metric, norm, term.lower(), term))
+    return [t[-1] for t in sorted(out)[:limit]]
+
+
+def _suggest(client, field: str, q: str, scope: dict, limit: int = 10, rank: str = "receita") -> list[str]:
+    params = {"field": field, "q": q, "limit": limit, "rank": rank, **scope}
+    response = client.get("/dashboard/suggest", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["items"]
+
+
+@pytest.mark.parametrize("rank", ["receita", "ocorrencias"])
+@pytest.mark.parametrize("scope", SCOPES)
+def test_suggest_matches_row_scan(imported, scope, rank):
+    for field, queries in QUERIES.items():
+        for q in queries:
+            for limit in (3, 50):
+                expected = _expected(field, q, scope, limit, rank)
+                assert _suggest(imported, field, q, scope, limit, rank) == expected, (field, q, limit)
+
+
+def test_suggest_typing_reuses_prefix_cache(imported):
+    """Digitando tecla a tecla (candidatos do prefixo anterior) = consulta direta."""
+    scope = SCOPES[1]
+    typed = [_suggest(imported, "produto", "dipirona 500mg 1"[:n], scope, limit=50) for n in range(1, 17)]
+
+    storage.invalidate_dataset_cache()
+    direct = [_suggest(imported, "produto", "dipirona 500mg 1"[:n], scope, limit=50) for n in range(1, 17)]
+    assert typed == direct
+    assert typed[-1] and all(t.upper().startswith("DIPIRONA 500MG 1") for t in typed[-1])
+
+
+def test_suggest_scope_metrics_one_pass(imported):
+    """As métricas de um recorte saem numa passada para todos os campos e ficam em cache."""
+    scope = SCOPES[2]
+    storage.invalidate_dataset_cache()
+
+    _suggest(imported, "produto", "a", scope)
+    stats = storage._SCOPE_METRICS.stats()
+    assert stats["entries"] == len(QUERIES)
+
+    _suggest(imported, "ncm", "3", scope)
+    _suggest(imported, "cfop", "5", scope)
+    after = storage._SCOPE_METRICS.stats()
+    assert after["entries"] == len(QUERIES) and after["misses"] == stats["misses"]
+
+    # filtros fora do recorte período/UF não mudam as sugestões
+    assert _suggest(imported, "produto", "a", {**scope, "produto": "cafe", "ncm": "1"}) == _suggest(imported, "produto", "a", scope)
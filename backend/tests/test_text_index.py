@@ -0,0 +1,63 @@
+# backend/tests/test_text_index.py
+"""Índice de trigramas: filtro produto "contém" igual a str.contains sobre o texto normalizado."""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.core.formatters import normalize_search_text
+from app.services.database_service import import_csv_stream
+from app.storage import dataset as storage
+from app.storage.dataset import Filters, query_dataset_frame
+from app.storage.text_index import build_trigram_index, load_trigram_index, save_trigram_index
+
+TERMS = (
+    "Café torrado",
+    "CAFÉ TORRADO",
+    "Cafeteira elétrica",
+    "Dipirona 500mg",
+    "Dipirona sódica 1g",
+    "Peças de manutenção",
+    "Pé de cabra",
+    "ab",
+    "Água mineral 500ml",
+    "  espaços  nas pontas  ",
+)
+
+NEEDLES = ("", "c", "ca", "caf", "café", "CAFE", "torr", "ona 5", "500m", "pe", "peça", "agua", "ab", "zzz", "s  n", " ")
+
+
+def _contains(terms, needle: str) -> list[str]:
+    q = normalize_search_text(needle)
+    norm = pd.Series([normalize_search_text(t) for t in terms], dtype=object)
+    return [t for t, hit in zip(terms, norm.str.contains(q, regex=False)) if hit]
+
+
+def test_trigram_match_equals_str_contains(tmp_path):
+    index = build_trigram_index(TERMS)
+    save_trigram_index(tmp_path / "x.trgm", index)
+    loaded = load_trigram_index(tmp_path / "x.trgm")
+
+    for needle in NEEDLES:
+        expected = _contains(TERMS, needle)
+        assert index.match(needle) == expected, needle
+        assert loaded.match(needle) == expected, needle
+
+
+@pytest.mark.parametrize("needle", ["dipirona", "DIPIRONA 500", "cafe", "café torrado 1", "escritorio", "ça", "mg 3", "zzz"])
+def test_produto_filter_matches_str_contains(client, sample_csv, needle):
+    with open(sample_csv, "rb") as f:
+        import_csv_stream(f)
+
+    filters = Filters(date(2023, 2, 1), date(2024, 10, 31), produto=needle)
+    assert storage.match_produto(needle) is not None  # trigramas em uso (modo memória)
+    got = query_dataset_frame(filters)
+
+    # varredura das linhas do período, sem índice
+    period = query_dataset_frame(Filters(filters.periodo_inicio, filters.periodo_fim))
+    text = period["produto"].astype(str).map(normalize_search_text)
+    expected = period[text.str.contains(normalize_search_text(needle), regex=False).to_numpy()]
+
+    assert got.index.tolist() == expected.index.tolist()
@@ -473,7 +473,7 @@ export const Dashboard: React.FC<DashboardPageProps> = ({
     setFilters((prev) => ({ ...prev, [name]: value }));
   }
 
-  // ✅ Centraliza e paraleliza overview + compare + breakdowns, com cancelamento
+  // ✅ Centraliza overview + compare + breakdowns (/dashboard/bundle), com cancelamento
   async function loadAll(year: number, f: DashboardFilters) {
     // cancela requests anteriores
     abortRef.current?.abort();
@@ -490,9 +490,8 @@ export const Dashboard: React.FC<DashboardPageProps> = ({
       cfop: f.cfop || undefined,
     };
 
-    const qsOverview = buildQuery(qsBase);
-    const qsCompare = buildQuery({ ...qsBase, ano_reforma: year });
-    const qsBreakdowns = buildQuery({ ...qsBase, limit: 10 });
+    // overview + compare + breakdowns numa resposta (filtro avaliado uma vez no backend)
+    const qs = buildQuery({ ...qsBase, ano_reforma: year, limit: 10 });
 
     setLoading(true);
     setCompareLoading(true);
@@ -503,21 +502,14 @@ export const Dashboard: React.FC<DashboardPageProps> = ({
     setBdErr(null);
 
     try {
-      const [r1, r2, r3] = await Promise.all([
-        fetch(`${API}/dashboard/overview${qsOverview}`, { signal }),
-        fetch(`${API}/dashboard/compare${qsCompare}`, { signal }),
-        fetch(`${API}/dashboard/breakdowns${qsBreakdowns}`, { signal }),
-      ]);
+      const r = await fetch(`${API}/dashboard/bundle${qs}`, { signal });
+      if (!r.ok) throw new Error(`Falha dashboard: ${r.status} ${await r.text()}`);
 
-      if (!r1.ok) throw new Error(`Falha overview: ${r1.status} ${await r1.text()}`);
-      if (!r2.ok) throw new Error(`Falha compare: ${r2.status} ${await r2.text()}`);
-      if (!r3.ok) throw new Error(`Falha breakdowns: ${r3.status} ${await r3.text()}`);
+      const j = await r.json();
 
-      const [j1, j2, j3] = await Promise.all([r1.json(), r2.json(), r3.json()]);
-
-      setData(j1 as DashboardOverview);
-      setCompare(j2 as DashboardCompare);
-      setBreakdowns(j3 as DashboardBreakdowns);
+      setData({ ...j.overview, timeseries: j.timeseries } as DashboardOverview);
+      setCompare(j.compare as DashboardCompare);
+      setBreakdowns(j.breakdowns as DashboardBreakdowns);
     } catch (e: any) {
       // Abort não é erro real
       if (e?.name === "AbortError") return;